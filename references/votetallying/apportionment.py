@@ -0,0 +1,219 @@
+from collections import OrderedDict
+from fractions import Fraction
+import heapq
+
+'''
+    Seat apportionment for party-list and mixed-member elections. The methods
+    are named after the APPORTIONMENT_* control codes: the divisor methods
+    HUNTINGTON (Huntington-Hill), WEBSTER (Sainte-Lague), JEFFERSON (D'Hondt)
+    and ADAM, and the largest remainder methods HAMILTON (Hare quota) and
+    LOWNDES (remainder relative to the seats already earned). All comparisons
+    are exact; ties go to the party listed first.
+'''
+
+'''
+    Arguments: method str, votes int, seats int
+
+    The priority of a party with votes votes holding seats seats for the next
+    seat under a divisor method. A priority of None means the party gets the
+    next seat before any finite priority (Adam and Huntington-Hill give every
+    party with votes a first seat).
+
+    Output: Fraction or None
+'''
+def divisor_priority (method, votes, seats):
+    if method == 'JEFFERSON':
+        return Fraction(votes, seats + 1)
+    if method == 'WEBSTER':
+        return Fraction(2 * votes, 2 * seats + 1)
+    if method == 'ADAM':
+        return Fraction(votes, seats) if seats else None
+    if method == 'HUNTINGTON':
+        # compare squared priorities to stay rational
+        return Fraction(votes * votes, seats * (seats + 1)) if seats else None
+    raise ValueError('Unknown divisor method ' + str(method) + '.')
+
+'''
+    Arguments: votes [int,...], seats int, method str, initial [int,...]
+
+    Hands out seats one at a time to the party with the highest priority,
+    starting from the initial seats. A heap keeps the parties ordered by
+    priority, so each seat costs O(log P) and the whole allocation
+    O(S log P) instead of rescanning every party per seat.
+
+    Output: list [int,...]; seats per party including the initial seats
+'''
+def divisor_apportion (votes, seats, method, initial):
+    allocated = list(initial)
+    heap = []
+    for i in range(0, len(votes)):
+        if votes[i] > 0:
+            priority = divisor_priority(method, votes[i], allocated[i])
+            heap.append((0 if priority is None else 1, -(priority or 0), i))
+    heapq.heapify(heap)
+
+    for s in range(0, seats):
+        if not heap:
+            break
+        k, p, i = heapq.heappop(heap)
+        allocated[i] += 1
+        priority = divisor_priority(method, votes[i], allocated[i])
+        heapq.heappush(heap, (0 if priority is None else 1, -(priority or 0), i))
+
+    return allocated
+
+'''
+    Arguments: votes [int,...], seats int, method str
+
+    Gives every party the whole part of its quota share votes*seats/total and
+    the remaining seats to the largest remainders. Hamilton compares the
+    remainders themselves; Lowndes compares each remainder relative to the
+    whole seats already earned, so parties with no whole seat come first.
+
+    Output: list [int,...]
+'''
+def largest_remainder_apportion (votes, seats, method):
+    total = sum(votes)
+    if total == 0:
+        return [0] * len(votes)
+
+    allocated = [v * seats // total for v in votes]
+    remainders = [v * seats % total for v in votes]
+
+    if method == 'HAMILTON':
+        key = lambda i: (remainders[i], -i)
+    elif method == 'LOWNDES':
+        key = lambda i: (allocated[i] == 0 and remainders[i] > 0, Fraction(remainders[i], max(1, allocated[i])), -i)
+    else:
+        raise ValueError('Unknown largest remainder method ' + str(method) + '.')
+
+    leftover = seats - sum(allocated)
+    for i in heapq.nlargest(leftover, range(0, len(votes)), key=key):
+        allocated[i] += 1
+
+    return allocated
+
+'''
+    Arguments: votes dict {party:votes int}, seats int, method str, initial dict {party:seats int}
+
+    Apportions seats among the parties with the given method. For divisor
+    methods, initial seats (e.g. constituency seats) are counted before the
+    first of the seats is handed out; largest remainder methods ignore them.
+
+    Output: OrderedDict {party:seats int} (in votes order)
+'''
+def apportion (votes, seats, method='WEBSTER', initial=None):
+    parties = list(votes)
+    counts = [votes[p] for p in parties]
+    initial = initial or {}
+
+    if method in ('HAMILTON', 'LOWNDES'):
+        allocated = largest_remainder_apportion(counts, seats, method)
+    else:
+        allocated = divisor_apportion(counts, seats, method, [initial.get(p, 0) for p in parties])
+
+    return OrderedDict((parties[i], allocated[i]) for i in range(0, len(parties)))
+
+'''
+    Arguments:  seats dict {party:seats int}, party_lists dict {party:[candidate_hash bytes,...]},
+                elected [candidate_hash bytes,...]
+
+    Fills list seats from the party lists in list order, skipping candidates
+    already elected (e.g. in a constituency).
+
+    Output: list [candidate_hash bytes,...]
+'''
+def fill_list_seats (seats, party_lists, elected):
+    taken = set(elected)
+    filled = []
+    for party, n in seats.items():
+        for c in party_lists.get(party, []):
+            if n < 1:
+                break
+            if c not in taken:
+                filled.append(c)
+                taken.add(c)
+                n -= 1
+    return filled
+
+'''
+    Arguments:  party_votes dict {party:votes int},
+                constituency_winners [(candidate_hash bytes, party),...],
+                seats int, party_lists dict {party:[candidate_hash bytes,...]},
+                method str, threshold int
+
+    Combines constituency winners (e.g. the winners of tally.irv in each
+    constituency) with party-list top-up seats. In MMP the seats are
+    apportioned among the parties with at least threshold party votes; each
+    party gets its entitlement minus the constituencies it won as list seats.
+    A party that won more constituencies than its entitlement keeps them
+    (overhang), which grows the chamber. In AVP the number of top-up seats is
+    fixed instead and they are apportioned with the constituency seats
+    counted as initial seats, so the method must be a divisor method.
+
+    Output: dict {
+        seats:OrderedDict {party:seats int},
+        constituency_seats:OrderedDict {party:seats int},
+        list_seats:OrderedDict {party:seats int},
+        elected:[candidate_hash bytes,...],
+        overhang:int
+    }
+'''
+def mixed_member (party_votes, constituency_winners, seats, party_lists, method, threshold, avp):
+    parties = list(OrderedDict.fromkeys(list(party_votes) + [party for c, party in constituency_winners]))
+
+    constituency_seats = OrderedDict((p, 0) for p in parties)
+    for c, party in constituency_winners:
+        constituency_seats[party] += 1
+
+    # only parties over the threshold share in the list seats
+    eligible = OrderedDict((p, party_votes[p]) for p in party_votes if party_votes[p] >= threshold)
+
+    if avp:
+        if method in ('HAMILTON', 'LOWNDES'):
+            raise ValueError('AVP top-up seats need a divisor method.')
+        totals = apportion(eligible, seats, method, constituency_seats)
+        list_seats = OrderedDict((p, totals.get(p, constituency_seats[p]) - constituency_seats[p]) for p in parties)
+        overhang = 0
+    else:
+        entitlement = apportion(eligible, seats, method)
+        list_seats = OrderedDict((p, max(0, entitlement.get(p, 0) - constituency_seats[p])) for p in parties)
+        overhang = sum(max(0, constituency_seats[p] - entitlement.get(p, 0)) for p in parties)
+
+    elected = [c for c, party in constituency_winners]
+    elected += fill_list_seats(list_seats, party_lists, elected)
+
+    return {
+        'seats': OrderedDict((p, constituency_seats[p] + list_seats[p]) for p in parties),
+        'constituency_seats': constituency_seats,
+        'list_seats': list_seats,
+        'elected': elected,
+        'overhang': overhang
+    }
+
+'''
+    Arguments:  party_votes dict {party:votes int},
+                constituency_winners [(candidate_hash bytes, party),...],
+                total_seats int, party_lists dict {party:[candidate_hash bytes,...]},
+                method str, threshold int
+
+    Mixed-member proportional tally (see mixed_member).
+
+    Output: same as mixed_member
+'''
+def mmp (party_votes, constituency_winners, total_seats, party_lists, method='WEBSTER', threshold=0):
+    return mixed_member(party_votes, constituency_winners, total_seats, party_lists, method, threshold, False)
+
+'''
+    Arguments:  party_votes dict {party:votes int},
+                constituency_winners [(candidate_hash bytes, party),...],
+                top_up_seats int, party_lists dict {party:[candidate_hash bytes,...]},
+                method str, threshold int
+
+    Alternative Vote Plus tally (see mixed_member): constituencies are won by
+    instant run-off and the top_up_seats are allocated by D'Hondt by default.
+
+    Output: same as mixed_member
+'''
+def avp (party_votes, constituency_winners, top_up_seats, party_lists, method='JEFFERSON', threshold=0):
+    return mixed_member(party_votes, constituency_winners, top_up_seats, party_lists, method, threshold, True)
@@ -0,0 +1,200 @@
+from collections import OrderedDict
+import numpy as np
+from scored import score
+from tally import sort_candidates
+
+'''
+    Arguments: masks [int,...], n_candidates int
+
+    Packs Python int bitmasks (bit i set for candidate i) into little-endian
+    uint64 words, one row per mask. 255 candidates fit in 4 words.
+
+    Output: ndarray uint64 (masks x words)
+'''
+def pack_masks (masks, n_candidates):
+    n_words = max(1, (n_candidates + 63) // 64)
+    buffer = b''.join(m.to_bytes(n_words * 8, byteorder='little') for m in masks)
+    return np.frombuffer(buffer, dtype='<u8').reshape(len(masks), n_words)
+
+'''
+    Arguments: words ndarray uint64 (ballots x words), counts ndarray int64, n_candidates int, chunk_size int
+
+    Counts how many ballots have each candidate's bit set, weighting each ballot
+    by its count. The words are unpacked to bits a chunk at a time and summed
+    per column with one matrix product.
+
+    Output: ndarray int64 (candidates)
+'''
+def count_bits (words, counts, n_candidates, chunk_size=None):
+    if chunk_size is None:
+        chunk_size = max(1, 2**24 // max(1, words.shape[1] * 64))
+
+    totals = np.zeros(n_candidates, dtype=np.int64)
+    for start in range(0, len(words), chunk_size):
+        chunk = words[start:start+chunk_size].astype('<u8').view(np.uint8)
+        bits = np.unpackbits(chunk, axis=1, bitorder='little')[:, :n_candidates]
+        totals += counts[start:start+chunk_size] @ bits.astype(np.int64)
+    return totals
+
+'''
+    Arguments: candidates [hash bytes,...], ballots [[hash bytes,...],...], weighted bool
+
+    Compiles approval ballots (the subset of candidates each voter approves)
+    into one bitmask per ballot. A ballot is invalid if it approves nobody or
+    approves a candidate not on the proposal. If weighted is True, ballots must
+    be a list of (ballot, count) pairs.
+
+    Output: dict {
+        candidates:[hash bytes,...],
+        approve:ndarray uint64 (ballots x words),
+        counts:ndarray int64 (ballots),
+        invalid_ballots:int
+    }
+'''
+def compile_approval_ballots (candidates, ballots, weighted=False):
+    candidates = list(OrderedDict.fromkeys(candidates))
+    index = {c: 1 << i for i, c in enumerate(candidates)}
+    masks, counts = [], []
+    invalid_ballots = 0
+
+    # treat plain ballots as ballots with a count of 1
+    if not weighted:
+        ballots = ((b, 1) for b in ballots)
+
+    for b, count in ballots:
+        # a lone hash is a ballot approving one candidate
+        if type(b) is bytes:
+            b = [b]
+
+        mask = 0
+        for c in b:
+            if c not in index:
+                mask = 0
+                break
+            mask |= index[c]
+
+        if mask:
+            masks.append(mask)
+            counts.append(count)
+        else:
+            invalid_ballots += count
+
+    return {
+        'candidates': candidates,
+        'approve': pack_masks(masks, len(candidates)),
+        'counts': np.array(counts, dtype=np.int64),
+        'invalid_ballots': invalid_ballots
+    }
+
+'''
+    Arguments: candidates [hash bytes,...], ballots [{hash bytes:+1 or -1 or 0},...], weighted bool
+
+    Compiles combined approval ballots into two bitmasks per ballot: one for
+    the candidates the voter approves (+1) and one for those the voter
+    disapproves (-1). Candidates left off the ballot or marked 0 are neutral.
+    A ballot is invalid if it marks nobody, marks a candidate not on the
+    proposal, or uses any other mark.
+
+    Output: dict {
+        candidates:[hash bytes,...],
+        approve:ndarray uint64 (ballots x words),
+        disapprove:ndarray uint64 (ballots x words),
+        counts:ndarray int64 (ballots),
+        invalid_ballots:int
+    }
+'''
+def compile_cav_ballots (candidates, ballots, weighted=False):
+    candidates = list(OrderedDict.fromkeys(candidates))
+    index = {c: 1 << i for i, c in enumerate(candidates)}
+    approve, disapprove, counts = [], [], []
+    invalid_ballots = 0
+
+    # treat plain ballots as ballots with a count of 1
+    if not weighted:
+        ballots = ((b, 1) for b in ballots)
+
+    for b, count in ballots:
+        plus, minus = 0, 0
+        valid = len(b) > 0
+        for c, mark in b.items():
+            if c not in index or mark not in (1, 0, -1) or type(mark) is not int:
+                valid = False
+                break
+            if mark == 1:
+                plus |= index[c]
+            elif mark == -1:
+                minus |= index[c]
+
+        if valid:
+            approve.append(plus)
+            disapprove.append(minus)
+            counts.append(count)
+        else:
+            invalid_ballots += count
+
+    return {
+        'candidates': candidates,
+        'approve': pack_masks(approve, len(candidates)),
+        'disapprove': pack_masks(disapprove, len(candidates)),
+        'counts': np.array(counts, dtype=np.int64),
+        'invalid_ballots': invalid_ballots
+    }
+
+'''
+    Arguments: number_of_winners int, compiled dict (see compile_approval_ballots), quorum_requirement int
+
+    Approval voting. The number_of_winners most approved candidates win;
+    candidates tied with the first loser are dropped from the winners and
+    counted in ties, as in tally.plurality.
+
+    Output: dict {
+        tally:OrderedDict {candidate_hash:approvals int},
+        winners:[winner_hash bytes,...],
+        invalid_ballots:int,
+        valid_ballots:int,
+        ties:int,
+        meets_quorum:bool
+    }
+'''
+def approval (number_of_winners, compiled, quorum_requirement):
+    candidates, counts = compiled['candidates'], compiled['counts']
+    totals = {
+        'candidates': candidates,
+        'totals': count_bits(compiled['approve'], counts, len(candidates)),
+        'valid_ballots': int(counts.sum()),
+        'invalid_ballots': compiled['invalid_ballots']
+    }
+    return score(number_of_winners, totals, quorum_requirement)
+
+'''
+    Arguments: number_of_winners int, compiled dict (see compile_cav_ballots), quorum_requirement int
+
+    Combined approval voting. Each candidate's score is their approvals minus
+    their disapprovals; winners and ties are picked as in approval.
+
+    Output: dict {
+        tally:OrderedDict {candidate_hash:net_approvals int},
+        approvals:OrderedDict {candidate_hash:approvals int},
+        disapprovals:OrderedDict {candidate_hash:disapprovals int},
+        winners:[winner_hash bytes,...],
+        invalid_ballots:int,
+        valid_ballots:int,
+        ties:int,
+        meets_quorum:bool
+    }
+'''
+def cav (number_of_winners, compiled, quorum_requirement):
+    candidates, counts = compiled['candidates'], compiled['counts']
+    approvals = count_bits(compiled['approve'], counts, len(candidates))
+    disapprovals = count_bits(compiled['disapprove'], counts, len(candidates))
+    totals = {
+        'candidates': candidates,
+        'totals': approvals - disapprovals,
+        'valid_ballots': int(counts.sum()),
+        'invalid_ballots': compiled['invalid_ballots']
+    }
+
+    result = score(number_of_winners, totals, quorum_requirement)
+    result['approvals'] = sort_candidates({candidates[i]: int(approvals[i]) for i in range(0, len(candidates))})
+    result['disapprovals'] = sort_candidates({candidates[i]: int(disapprovals[i]) for i in range(0, len(candidates))})
+    return result
@@ -0,0 +1,263 @@
+import numpy as np
+
+'''
+    Synthetic ballots for load testing and benchmarks. The models generate
+    complete rankings of candidate indices for all ballots at once with NumPy;
+    generate_ballots then adds truncation, write-ins and ties and returns the
+    ballots in the compiled form of ballotmatrix.compile_ranked_ballots, so the
+    compiled engines can run on them directly. python_ballots and
+    plurality_ballots turn them into ballots for tally.py and pack_ballots into
+    packed ballot bodies. The same seed always gives the same ballots.
+'''
+
+# stands in for a write-in candidate in python and packed ballots
+WRITE_IN = b'\xff' * 32
+
+'''
+    Arguments: rng numpy Generator, n_ballots int, n_candidates int, parameter (unused)
+
+    Impartial culture: every ranking is equally likely.
+
+    Output: ndarray int16 (ballots x candidates); candidate indices in order of preference
+'''
+def impartial_culture (rng, n_ballots, n_candidates, parameter=None):
+    rankings = np.tile(np.arange(n_candidates, dtype=np.int16), (n_ballots, 1))
+    return rng.permuted(rankings, axis=1)
+
+'''
+    Arguments: rng numpy Generator, n_ballots int, n_candidates int, phi float
+
+    Mallows model around the ranking 0, 1, 2, ...: the probability of a
+    ranking falls by a factor of phi for every pair of candidates it swaps
+    (phi = 1 is impartial culture, phi close to 0 makes every voter agree).
+    Each ranking is built by repeated insertion: candidate i is inserted v
+    places ahead of its place at the end, with P(v) proportional to phi**v for
+    v = 0..i. The insertion is done for all ballots at once.
+
+    Output: ndarray int16 (ballots x candidates)
+'''
+def mallows (rng, n_ballots, n_candidates, phi=0.5):
+    if not 0 < phi <= 1:
+        raise ValueError('phi must be in (0, 1].')
+
+    rankings = np.zeros((n_ballots, n_candidates), dtype=np.int16)
+    for i in range(1, n_candidates):
+        # draw the number of places to move ahead from a truncated geometric distribution
+        if phi == 1:
+            ahead = rng.integers(0, i + 1, size=n_ballots)
+        else:
+            u = rng.random(n_ballots)
+            ahead = np.minimum(np.floor(np.log1p(-u * (1 - phi**(i + 1))) / np.log(phi)), i).astype(np.int64)
+
+        # shift everything from the insertion point one place back and insert i
+        position = i - ahead
+        cols = np.arange(i + 1)
+        source = cols - (cols > position[:, None])
+        inserted = np.take_along_axis(rankings[:, :i + 1], source, axis=1)
+        inserted[cols == position[:, None]] = i
+        rankings[:, :i + 1] = inserted
+
+    return rankings
+
+'''
+    Arguments: rng numpy Generator, n_ballots int, n_candidates int, dimensions int
+
+    Spatial (Euclidean) model: voters and candidates are placed in a standard
+    normal cloud with the given number of dimensions, and every voter ranks
+    the candidates by distance.
+
+    Output: ndarray int16 (ballots x candidates)
+'''
+def spatial (rng, n_ballots, n_candidates, dimensions=2):
+    candidates = rng.standard_normal((n_candidates, dimensions))
+    voters = rng.standard_normal((n_ballots, dimensions))
+
+    # squared distance minus the voter's own squared norm, which does not change the order
+    distances = (candidates ** 2).sum(axis=1) - 2 * voters @ candidates.T
+    return np.argsort(distances, axis=1, kind='stable').astype(np.int16)
+
+'''
+    Arguments: rng numpy Generator, n_ballots int, n_candidates int, alpha float
+
+    Polya-Eggenberger urn: the urn starts with every ranking once, and after
+    each draw alpha times as many copies of the drawn ranking as there are
+    rankings are put back (alpha = 0 is impartial culture). Equivalently,
+    ballot i is a fresh random ranking with probability 1 / (1 + i * alpha)
+    and otherwise a copy of one of the earlier ballots picked uniformly. The
+    copy chains are resolved by pointer jumping, so no ballot is drawn one at
+    a time.
+
+    Output: ndarray int16 (ballots x candidates)
+'''
+def polya_urn (rng, n_ballots, n_candidates, alpha=0.1):
+    if alpha < 0:
+        raise ValueError('alpha cannot be negative.')
+
+    index = np.arange(n_ballots)
+    fresh = rng.random(n_ballots) * (1 + index * alpha) < 1
+    parent = np.where(fresh, index, np.floor(rng.random(n_ballots) * index).astype(np.int64))
+
+    # follow the copies back to the fresh ballot they started from
+    while True:
+        root = parent[parent]
+        if (root == parent).all():
+            break
+        parent = root
+
+    return impartial_culture(rng, n_ballots, n_candidates)[parent]
+
+MODELS = {
+    'IMPARTIAL_CULTURE': impartial_culture,
+    'MALLOWS': mallows,
+    'SPATIAL': spatial,
+    'POLYA_URN': polya_urn
+}
+
+'''
+    Arguments:  model str, candidates [hash bytes,...], n_ballots int,
+                seed int, parameter (see the model), tie_rate float,
+                truncation_rate float, write_in_rate float
+
+    Generates n_ballots ballots from the model (IMPARTIAL_CULTURE, MALLOWS,
+    SPATIAL or POLYA_URN; parameter is phi, dimensions or alpha). A ballot is
+    truncated after a uniformly drawn number of candidates with probability
+    truncation_rate, gets one of its candidates replaced by a write-in with
+    probability write_in_rate, and every two neighbouring candidates on it are
+    tied with probability tie_rate.
+
+    Output: dict (see ballotmatrix.compile_ranked_ballots); write-ins compile
+            to the index len(candidates)
+'''
+def generate_ballots (model, candidates, n_ballots, seed=None, parameter=None, tie_rate=0.0, truncation_rate=0.0, write_in_rate=0.0):
+    if model not in MODELS:
+        raise ValueError('Unknown ballot model ' + str(model) + '.')
+
+    rng = np.random.default_rng(seed)
+    n_candidates = len(candidates)
+    if parameter is None:
+        matrix = MODELS[model](rng, n_ballots, n_candidates)
+    else:
+        matrix = MODELS[model](rng, n_ballots, n_candidates, parameter)
+    cols = np.arange(n_candidates)
+
+    # truncate ballots after at least one candidate
+    lengths = np.full(n_ballots, n_candidates, dtype=np.int16)
+    if n_candidates > 1 and truncation_rate > 0:
+        truncated = rng.random(n_ballots) < truncation_rate
+        lengths[truncated] = rng.integers(1, n_candidates, size=int(truncated.sum()))
+
+    # replace one candidate with a write-in
+    if write_in_rate > 0:
+        written_in = np.flatnonzero(rng.random(n_ballots) < write_in_rate)
+        matrix[written_in, np.floor(rng.random(len(written_in)) * lengths[written_in]).astype(np.int64)] = n_candidates
+
+    # a rank group ends wherever the next candidate is not tied or the ballot ends
+    ranked = cols < lengths[:, None]
+    ends_group = np.ones((n_ballots, n_candidates), dtype=bool)
+    if tie_rate > 0:
+        ends_group[:, :-1] = rng.random((n_ballots, n_candidates - 1)) >= tie_rate
+    ends_group |= cols == (lengths[:, None] - 1)
+    group_ends = np.where(ends_group, cols + 1, n_candidates + 1)
+    group_ends = np.minimum.accumulate(group_ends[:, ::-1], axis=1)[:, ::-1].astype(np.int16)
+
+    matrix[~ranked] = -1
+    group_ends[~ranked] = -1
+
+    return {
+        'candidates': list(candidates),
+        'matrix': matrix,
+        'group_ends': group_ends,
+        'lengths': lengths,
+        'counts': np.ones(n_ballots, dtype=np.int64)
+    }
+
+'''
+    Arguments: compiled dict (see generate_ballots), write_in bytes
+
+    Turns generated ballots into ranked ballots for tally.py: lists of
+    candidate hashes with tied candidates in nested lists. Write-ins become the
+    write_in hash. Ballots without ties are converted a whole batch of equal
+    length at a time.
+
+    Output: list [[hash bytes or [hash bytes,...],...],...]
+'''
+def python_ballots (compiled, write_in=WRITE_IN):
+    matrix, group_ends, lengths = compiled['matrix'], compiled['group_ends'], compiled['lengths']
+    table = np.array(list(compiled['candidates']) + [write_in, None], dtype=object)
+    cols = np.arange(matrix.shape[1])
+    tied = ((group_ends - cols - 1 > 0) & (matrix >= 0)).any(axis=1)
+    ballots = [None] * len(lengths)
+
+    # ballots without ties, one batch per length
+    for n in np.unique(lengths[~tied]):
+        rows = np.flatnonzero(~tied & (lengths == n))
+        for i, ballot in zip(rows.tolist(), table[matrix[rows, :n]].tolist()):
+            ballots[i] = ballot
+
+    # ballots with ties, one at a time
+    for i in np.flatnonzero(tied).tolist():
+        hashes = table[matrix[i, :lengths[i]]].tolist()
+        ends = group_ends[i, :lengths[i]].tolist()
+        ballot = []
+        position = 0
+        while position < len(hashes):
+            end = ends[position]
+            ballot.append(hashes[position] if end - position == 1 else hashes[position:end])
+            position = end
+        ballots[i] = ballot
+
+    return ballots
+
+'''
+    Arguments: compiled dict (see generate_ballots), number_of_winners int, write_in bytes
+
+    Turns generated ballots into plurality ballots for tally.plurality: the
+    first number_of_winners candidates on each ballot, as a bare hash if
+    number_of_winners is 1. Ties are read in the order generated.
+
+    Output: list [hash bytes or [hash bytes,...],...]
+'''
+def plurality_ballots (compiled, number_of_winners=1, write_in=WRITE_IN):
+    table = np.array(list(compiled['candidates']) + [write_in], dtype=object)
+    if number_of_winners == 1:
+        return table[compiled['matrix'][:, 0]].tolist()
+    return python_ballots({
+        'candidates': compiled['candidates'],
+        'matrix': compiled['matrix'][:, :number_of_winners],
+        'group_ends': np.arange(1, number_of_winners + 1, dtype=np.int16)[None, :].repeat(len(compiled['lengths']), axis=0),
+        'lengths': np.minimum(compiled['lengths'], number_of_winners)
+    }, write_in)
+
+'''
+    Arguments:  compiled dict (see generate_ballots), proposal_ref_hash bytes,
+                control_char bytes, write_in bytes
+
+    Packs generated ballots into ballot bodies with the layout of
+    blockformat.pack_ranked_ballot: control_char (e.g. const.VOTE_RANKED or
+    const.VOTE_PLURALITY) + proposal_ref_hash + the 32-byte hash of every
+    candidate on the ballot in order. The packed format has no ties, so tied
+    candidates are packed in the order generated. The bodies of all ballots
+    of equal length are laid out in one byte array.
+
+    Output: list [bytes,...]
+'''
+def pack_ballots (compiled, proposal_ref_hash, control_char, write_in=WRITE_IN):
+    hashes = list(compiled['candidates']) + [write_in]
+    for i in range(0, len(hashes)):
+        if len(hashes[i]) != 32:
+            raise ValueError('Candidate hash must be 32 bytes long. Candidate hash ' + str(i) + ' was ' + str(len(hashes[i])) + ' bytes long.')
+
+    table = np.frombuffer(b''.join(hashes), dtype=np.uint8).reshape(len(hashes), 32)
+    prefix = np.frombuffer(control_char + proposal_ref_hash, dtype=np.uint8)
+    matrix, lengths = compiled['matrix'], compiled['lengths']
+    bodies = [None] * len(lengths)
+
+    for n in np.unique(lengths):
+        rows = np.flatnonzero(lengths == n)
+        packed = np.empty((len(rows), len(prefix) + 32 * n), dtype=np.uint8)
+        packed[:, :len(prefix)] = prefix
+        packed[:, len(prefix):] = table[matrix[rows, :n]].reshape(len(rows), 32 * n)
+        for i, body in zip(rows.tolist(), packed):
+            bodies[i] = body.tobytes()
+
+    return bodies
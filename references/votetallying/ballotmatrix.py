@@ -0,0 +1,303 @@
+from collections import OrderedDict
+import math
+import numpy as np
+from roundhistory import RoundHistory
+from tally import defeated_candidates, sort_candidates
+
+'''
+    Arguments:  candidates [hash bytes,...],
+                ballots [[hash bytes or [hash bytes,...],...],...],
+                weighted bool
+
+    Compiles ranked ballots once into a dense matrix of candidate indices: one
+    row per ballot, one column per rank position. Tied candidates occupy
+    consecutive columns and share the same group end. Candidates that are not
+    in candidates (e.g. write-ins) compile to the index len(candidates), and
+    unused positions are padded with -1. If weighted is True, ballots must be a
+    list of (ballot, count) pairs (see tally.compress_ballots).
+
+    Output: dict {
+        candidates:[hash bytes,...],
+        matrix:ndarray int16 (ballots x positions),
+        group_ends:ndarray int16 (ballots x positions),
+        lengths:ndarray int16 (ballots),
+        counts:ndarray int64 (ballots)
+    }
+'''
+def compile_ranked_ballots (candidates, ballots, weighted=False):
+    # treat plain ballots as ballots with a count of 1
+    if weighted:
+        counts = np.array([count for b, count in ballots], dtype=np.int64)
+        ballots = [b for b, count in ballots]
+    else:
+        counts = np.ones(len(ballots), dtype=np.int64)
+
+    candidates = list(OrderedDict.fromkeys(candidates))
+    index = {c: i for i, c in enumerate(candidates)}
+    unknown = len(candidates)
+    flat, flat_ends, lengths = [], [], []
+
+    # flatten each ballot, recording where each rank group ends
+    for b in ballots:
+        position = 0
+        for rank in b:
+            # handle ties
+            if type(rank) is list:
+                if len(rank) == 0:
+                    continue
+                end = position + len(rank)
+                for c in rank:
+                    flat.append(index.get(c, unknown))
+                    flat_ends.append(end)
+                position = end
+            else:
+                position += 1
+                flat.append(index.get(rank, unknown))
+                flat_ends.append(position)
+        lengths.append(position)
+
+    # scatter the flat lists into the padded matrices
+    lengths = np.array(lengths, dtype=np.int16)
+    width = int(lengths.max()) if len(lengths) else 0
+    matrix = np.full((len(lengths), width), -1, dtype=np.int16)
+    group_ends = np.full((len(lengths), width), -1, dtype=np.int16)
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    offsets = np.repeat(np.cumsum(lengths, dtype=np.int64) - lengths, lengths)
+    cols = np.arange(len(flat)) - offsets
+    matrix[rows, cols] = flat
+    group_ends[rows, cols] = flat_ends
+
+    return {'candidates': candidates, 'matrix': matrix, 'group_ends': group_ends, 'lengths': lengths, 'counts': counts}
+
+'''
+    Argument: compiled dict (see compile_ranked_ballots)
+
+    Output: ndarray bool (ballots); True for ballots that rank at least one
+            candidate, only rank candidates on the proposal and rank no
+            candidate twice
+'''
+def well_formed (compiled):
+    # reuse the flags of a compiled ballot set (see ballotset.compile_ballot_set)
+    if 'well_formed' in compiled:
+        return compiled['well_formed']
+
+    matrix = compiled['matrix']
+    ordered = np.sort(matrix, axis=1)
+    repeated = ((ordered[:, 1:] == ordered[:, :-1]) & (ordered[:, 1:] >= 0)).any(axis=1)
+    return (compiled['lengths'] > 0) & ~(matrix == len(compiled['candidates'])).any(axis=1) & ~repeated
+
+'''
+    Argument: compiled dict (see compile_ranked_ballots)
+
+    Output: (group_starts ndarray int64 (ballots x positions), group_numbers ndarray int64 (ballots x positions));
+            the position where the rank group of every position starts and
+            the number of that rank group on the ballot, counting from 0
+'''
+def rank_groups (compiled):
+    # reuse the groups of a compiled ballot set (see ballotset.compile_ballot_set)
+    if 'rank_groups' in compiled:
+        return compiled['rank_groups']
+
+    group_ends = compiled['group_ends']
+    starts_group = np.ones(group_ends.shape, dtype=bool)
+    starts_group[:, 1:] = group_ends[:, 1:] != group_ends[:, :-1]
+    cols = np.arange(group_ends.shape[1])
+    group_starts = np.maximum.accumulate(np.where(starts_group, cols, 0), axis=1)
+    return group_starts, np.cumsum(starts_group, axis=1) - 1
+
+'''
+    Arguments:  compiled dict (see compile_ranked_ballots), rows ndarray,
+                pointer ndarray
+
+    Finds the members of the tied rank groups that the given ballots currently
+    point at.
+
+    Output: (in_group ndarray bool (rows x positions), members ndarray int16 (rows x positions))
+'''
+def _tie_members (compiled, rows, pointer):
+    members = compiled['matrix'][rows]
+    cols = np.arange(members.shape[1])
+    ends = compiled['group_ends'][rows, pointer]
+    in_group = (cols >= pointer[:, None]) & (cols < ends[:, None])
+    return in_group, members
+
+'''
+    Arguments:  compiled dict (see compile_ranked_ballots), rows ndarray,
+                pointer ndarray, live ndarray bool
+
+    Output: ndarray bool; True where the current rank group of the ballot still
+            holds a live candidate
+'''
+def _group_is_live (compiled, rows, pointer, live):
+    current = compiled['matrix'][rows, pointer]
+    sizes = compiled['group_ends'][rows, pointer] - pointer
+    result = live[current]
+
+    # ties need every member of the group inspected
+    tied = sizes > 1
+    if tied.any():
+        in_group, members = _tie_members(compiled, rows[tied], pointer[tied])
+        result[tied] = (in_group & live[members]).any(axis=1)
+
+    return result
+
+'''
+    Arguments:  compiled dict (see compile_ranked_ballots),
+                quorum_requirement int,
+                batch_elimination bool,
+                compact bool
+
+    Same algorithm as tally.irv, but run over the compiled ballot matrix. Each
+    ballot keeps a pointer to its current preference; every round is one
+    bincount over the pointed-at candidates followed by a pointer advance for
+    the ballots whose current preference was eliminated. Tied ranks are split
+    evenly and counted exactly in units of a common denominator, so the round
+    tallies match tally.irv. batch_elimination and compact work as in tally.irv.
+
+    Output: dict {
+        tally:list [OrderedDict {candidate_hash:votes int}, ...],
+        denominators:list [int, ...],
+        eliminated:list [[candidate_hash bytes,...], ...],
+        winner:winner_hash bytes,
+        invalid_ballots:int,
+        valid_ballots:int,
+        exhausted_ballots:int,
+        meets_quorum:bool
+    }
+'''
+def irv_compiled (compiled, quorum_requirement, batch_elimination=False, compact=False):
+    candidates = compiled['candidates']
+    lengths = compiled['lengths']
+    matrix = compiled['matrix']
+    counts = compiled['counts']
+    unknown = len(candidates)
+    total_ballots = int(counts.sum())
+    rows = np.arange(len(lengths))
+    pointer = np.zeros(len(lengths), dtype=np.int16)
+    position = {candidates[i]: i for i in range(0, unknown)}
+
+    # the extra slot stands for candidates not on the proposal; it never dies
+    live = np.ones(unknown + 1, dtype=bool)
+    remaining = list(range(unknown))
+    active = lengths > 0
+    tally = []
+    denominators = []
+    eliminated_candidates = []
+    if compact:
+        tally = RoundHistory(candidates, denominators)
+    invalid_ballots = int(counts[~active].sum())
+    exhausted_ballots = 0
+    winner = ''
+    winner_found = False
+
+    # until a winner is found
+    while not winner_found:
+        idx = rows[active]
+        p = pointer[idx]
+        current = matrix[idx, p]
+        sizes = compiled['group_ends'][idx, p] - p
+        tied = sizes > 1
+
+        # ballots pointing at a candidate not on the proposal are invalid
+        invalid = ~tied & (current == unknown)
+        if tied.any():
+            in_group, members = _tie_members(compiled, idx[tied], p[tied])
+            in_group &= live[members]
+            invalid[tied] = (in_group & (members == unknown)).any(axis=1)
+        invalid_ballots += int(counts[idx[invalid]].sum())
+        active[idx[invalid]] = False
+
+        # tally highest-preference candidates: whole votes plus tie shares per tie size
+        single = ~tied & ~invalid
+        whole = np.bincount(current[single], weights=counts[idx[single]], minlength=unknown + 1)
+        shares = {}
+        if tied.any():
+            valid_ties = ~invalid[tied]
+            in_group, members = in_group[valid_ties], members[valid_ties]
+            tie_rows, tie_cols = np.nonzero(in_group)
+            tie_sizes = in_group.sum(axis=1)[tie_rows]
+            tie_counts = counts[idx[tied][valid_ties][tie_rows]]
+            voted = members[tie_rows, tie_cols]
+            for k in np.unique(tie_sizes):
+                of_size = tie_sizes == k
+                shares[int(k)] = np.bincount(voted[of_size], weights=tie_counts[of_size], minlength=unknown + 1)
+
+        # count exactly in units of the round's common denominator, as tally.irv does
+        denominator = math.lcm(1, *shares)
+        round_tally = {}
+        for c in remaining:
+            round_tally[candidates[c]] = int(whole[c]) * denominator + sum(int(v[c]) * (denominator // k) for k, v in shares.items())
+        round_tally = sort_candidates(round_tally)
+
+        # add round_tally to full tally
+        tally.append(round_tally)
+        denominators.append(denominator)
+
+        # get total and set up for elimination
+        total_votes = 0
+        for k in round_tally:
+            total_votes += round_tally[k]
+        worst_candidate = ['total', total_votes]
+
+        # inspect each candidate's tally
+        for c in round_tally:
+            # see if someone has a majority of highest-preference votes
+            if round_tally[c] > total_votes // 2:
+                winner_found = True
+                winner = c
+                break
+
+            # also find the candidate with fewest highest-preference votes
+            if round_tally[c] < worst_candidate[1]:
+                worst_candidate = [c, round_tally[c]]
+
+        # stop if winner found
+        if winner_found:
+            break
+
+        # eliminate worst_candidate and ties_for_worst, or every defeated candidate
+        eliminated = [position[c] for c in round_tally if round_tally[c] == worst_candidate[1]]
+        if batch_elimination:
+            eliminated = [position[c] for c in defeated_candidates(round_tally)] or eliminated
+        eliminated_candidates.append([candidates[i] for i in eliminated])
+        live[eliminated] = False
+        remaining = [i for i in remaining if live[i]]
+
+        # stop if all candidates eliminated due to tie
+        if len(remaining) == 0:
+            break
+
+        # advance the pointers of ballots whose current preference was eliminated
+        idx = rows[active]
+        while len(idx):
+            idx = idx[~_group_is_live(compiled, idx, pointer[idx], live)]
+            pointer[idx] = compiled['group_ends'][idx, pointer[idx]]
+            exhausted = pointer[idx] >= lengths[idx]
+            exhausted_ballots += int(counts[idx[exhausted]].sum())
+            active[idx[exhausted]] = False
+            idx = idx[~exhausted]
+
+    # final tabulations
+    valid_ballots = total_ballots - invalid_ballots
+    meets_quorum = valid_ballots - exhausted_ballots > quorum_requirement
+    if not winner_found:
+        winner = 'b\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'
+
+    # return statement
+    return {'tally': tally, 'denominators': denominators, 'eliminated': eliminated_candidates, 'winner': winner, 'invalid_ballots': invalid_ballots, 'valid_ballots': valid_ballots, 'exhausted_ballots': exhausted_ballots, 'meets_quorum': meets_quorum}
+
+'''
+    Arguments:  candidates [hash bytes, ...],
+                ballots [[hash bytes, ...], ...],
+                quorum_requirement int,
+                weighted bool,
+                batch_elimination bool,
+                compact bool
+
+    Drop-in replacement for tally.irv that compiles the ballots into a matrix
+    first. Unlike tally.irv, neither candidates nor ballots are modified.
+
+    Output: same as tally.irv
+'''
+def irv (candidates, ballots, quorum_requirement, weighted=False, batch_elimination=False, compact=False):
+    return irv_compiled(compile_ranked_ballots(candidates, ballots, weighted), quorum_requirement, batch_elimination, compact)
@@ -0,0 +1,207 @@
+import numpy as np
+import tally
+from approval import approval, cav, compile_approval_ballots, compile_cav_ballots
+from ballotmatrix import compile_ranked_ballots, irv_compiled, rank_groups, well_formed
+from bucklin import bucklin_rounds, rank_histogram
+from condorcet import candidate_ranks, copeland, pairwise_matrix, schulze
+from contingent import contingent_compiled
+from positional import DOWDALL_SCALE, borda_weights, dowdall_weights, positional_compiled
+from scored import compile_score_ballots, count_scores, score, star
+
+'''
+    A ballot set is the ballots of one COLLECT_BALLOTS set compiled once, so an
+    inconclusive TALLY_OF_VOTES can be re-run under another algorithm
+    (TALLY_NEW_ALG) without decoding the ballots again. Identical ballots are
+    merged first, every candidate is interned as its index in candidates, and
+    the tie groups, validity flags and weights of the compiled engines are
+    computed up front. Counts that several methods share (the pairwise matrix,
+    the score totals, the CAV ballots) are computed on first use and kept in
+    the ballot set.
+
+    Only the compiled engines skip validating the ballots again. PLURALITY,
+    IRV_COOMBS, STV_DROOP and STV_HARE run the engines of tally on the merged
+    ballots, which check each unique ballot again every time (see
+    tally_ballot_set).
+'''
+
+# the election methods that can tally each kind of ballot
+BALLOT_METHODS = {
+    'PLURALITY': ('PLURALITY',),
+    'RANKED': ('IRV', 'IRV_COOMBS', 'CONTINGENT', 'STV_DROOP', 'STV_HARE', 'BORDA', 'DOWDAL', 'BUCKLIN', 'COPELAND', 'SCHULZE'),
+    'APPROVAL': ('APPROVAL',),
+    'SCORE': ('CAV', 'SCORE', 'STAR')
+}
+
+'''
+    Arguments: compiled dict (see ballotmatrix.compile_ranked_ballots)
+
+    Adds the rank groups (see ballotmatrix.rank_groups), well-formed flags (see
+    ballotmatrix.well_formed) and candidate ranks (see condorcet.candidate_ranks)
+    to the compiled ballots, where those functions pick them up instead of
+    computing them again, and the per-method validity flags:
+    first_known marks ballots whose first rank group only holds candidates on
+    the proposal (IRV and STV), complete marks ballots that also rank at least
+    every candidate and whose last rank group only holds candidates on the
+    proposal (Coombs). The arrays are made read-only since every tally shares
+    them.
+
+    Output: compiled dict
+'''
+def precompute_ranked_ballots (compiled):
+    matrix, lengths = compiled['matrix'], compiled['lengths']
+    n_candidates = len(compiled['candidates'])
+    groups = rank_groups(compiled)
+    group_numbers = groups[1]
+    unknown = matrix == n_candidates
+
+    # number of the last rank group of each ballot
+    rows = np.arange(len(lengths))
+    last_group = np.full(len(lengths), -1, dtype=np.int64)
+    ranked = lengths > 0
+    last_group[ranked] = group_numbers[rows[ranked], lengths[ranked] - 1]
+
+    first_known = ranked & ~(unknown & (group_numbers == 0)).any(axis=1)
+    last_known = ~(unknown & (group_numbers == last_group[:, None])).any(axis=1)
+
+    compiled['rank_groups'] = groups
+    compiled['well_formed'] = well_formed(compiled)
+    compiled['ranks'] = candidate_ranks(compiled, keep_unknown=True)
+    compiled['first_known'] = first_known
+    compiled['complete'] = first_known & last_known & (lengths >= n_candidates)
+
+    for array in list(compiled['rank_groups']) + [compiled[k] for k in ('matrix', 'group_ends', 'lengths', 'counts', 'well_formed', 'ranks', 'first_known', 'complete')]:
+        array.setflags(write=False)
+
+    return compiled
+
+'''
+    Arguments:  ballot_type str, candidates [hash bytes,...],
+                ballots [ballot,...], weighted bool, max_score int
+
+    Compiles the ballots of one COLLECT_BALLOTS set. ballot_type names the kind
+    of ballot as in the BALLOT_* control codes: PLURALITY ballots are counted
+    as they are, RANKED ballots are compiled into a ballot matrix (see
+    ballotmatrix.compile_ranked_ballots and precompute_ranked_ballots),
+    APPROVAL ballots into bitmasks (see approval.compile_approval_ballots) and
+    SCORE ballots into a score matrix (see scored.compile_score_ballots). If
+    weighted is True, ballots must be a list of (ballot, count) pairs.
+
+    Output: dict {
+        ballot_type:str,
+        candidates:[hash bytes,...],
+        ballots:list [(ballot, count int),...]; the unique ballots,
+        compiled:dict or None,
+        total_ballots:int
+    }
+'''
+def compile_ballot_set (ballot_type, candidates, ballots, weighted=False, max_score=5):
+    if ballot_type not in BALLOT_METHODS:
+        raise ValueError('Unknown ballot type ' + str(ballot_type) + '.')
+
+    # merge identical ballots
+    ballots = tally.compress_ballots(ballots, weighted)
+
+    compiled = None
+    if ballot_type == 'RANKED':
+        compiled = precompute_ranked_ballots(compile_ranked_ballots(candidates, ballots, weighted=True))
+    elif ballot_type == 'APPROVAL':
+        compiled = compile_approval_ballots(candidates, ballots, weighted=True)
+    elif ballot_type == 'SCORE':
+        compiled = compile_score_ballots(candidates, ballots, max_score, weighted=True)
+
+    return {
+        'ballot_type': ballot_type,
+        'candidates': list(candidates),
+        'ballots': ballots,
+        'compiled': compiled,
+        'total_ballots': sum(count for b, count in ballots)
+    }
+
+'''
+    Arguments: ballot_set dict (see compile_ballot_set), valid ndarray bool
+
+    Output: list [(ballot, count int),...]; the unique ballots flagged valid
+'''
+def select_ballots (ballot_set, valid):
+    ballots = ballot_set['ballots']
+    return [ballots[i] for i in np.flatnonzero(valid)]
+
+'''
+    Arguments: ballot_set dict (see compile_ballot_set), key str, function, *args
+
+    Output: function(*args), computed on the first call for key and kept in
+            the ballot set for later calls
+'''
+def shared_count (ballot_set, key, function, *args):
+    if key not in ballot_set:
+        ballot_set[key] = function(*args)
+    return ballot_set[key]
+
+'''
+    Arguments:  election_method str, ballot_set dict (see compile_ballot_set),
+                number_of_winners int, quorum_requirement int
+
+    Tallies a compiled ballot set with the election method named as in the
+    PROPOSAL_* control codes (e.g. IRV, SCHULZE). The ballot set is never
+    modified except for the shared counts it caches, so it can be tallied any
+    number of times. PLURALITY is run by tally.plurality on the merged
+    ballots, which validates them on every call. IRV_COOMBS and STV are run
+    by tally.irv_coombs_piles and tally.stv on the ballots that passed the
+    precomputed validity checks only; those engines still check the ballots
+    they are given, and the rejected ballots are added back into the
+    statistics. Every other method runs on the compiled arrays alone.
+
+    Output: same as the tally function of the election method
+'''
+def tally_ballot_set (election_method, ballot_set, number_of_winners, quorum_requirement):
+    ballot_type = ballot_set['ballot_type']
+    if election_method not in BALLOT_METHODS[ballot_type]:
+        raise ValueError(str(election_method) + ' cannot tally ' + ballot_type + ' ballots.')
+
+    candidates = ballot_set['candidates']
+    compiled = ballot_set['compiled']
+
+    if election_method == 'PLURALITY':
+        return tally.plurality(number_of_winners, candidates, ballot_set['ballots'], quorum_requirement, weighted=True)
+
+    if election_method == 'IRV':
+        return irv_compiled(compiled, quorum_requirement)
+
+    if election_method in ('IRV_COOMBS', 'STV_DROOP', 'STV_HARE'):
+        valid = compiled['complete'] if election_method == 'IRV_COOMBS' else compiled['first_known']
+        ballots = select_ballots(ballot_set, valid)
+        if election_method == 'IRV_COOMBS':
+            result = tally.irv_coombs_piles(list(candidates), ballots, quorum_requirement, weighted=True)
+        else:
+            result = tally.stv(list(candidates), ballots, number_of_winners, quorum_requirement, election_method[4:], weighted=True)
+        result['invalid_ballots'] += int(compiled['counts'][~valid].sum())
+        return result
+
+    if election_method == 'CONTINGENT':
+        return contingent_compiled(compiled, quorum_requirement)
+
+    if election_method == 'BORDA':
+        return positional_compiled(number_of_winners, compiled, borda_weights(len(compiled['candidates'])), quorum_requirement)
+
+    if election_method == 'DOWDAL':
+        return positional_compiled(number_of_winners, compiled, dowdall_weights(len(compiled['candidates'])), quorum_requirement, DOWDALL_SCALE)
+
+    if election_method == 'BUCKLIN':
+        return bucklin_rounds(shared_count(ballot_set, 'histogram', rank_histogram, compiled), quorum_requirement)
+
+    if election_method == 'COPELAND':
+        return copeland(shared_count(ballot_set, 'pairwise', pairwise_matrix, compiled), quorum_requirement)
+
+    if election_method == 'SCHULZE':
+        return schulze(shared_count(ballot_set, 'pairwise', pairwise_matrix, compiled), quorum_requirement)
+
+    if election_method == 'APPROVAL':
+        return approval(number_of_winners, compiled, quorum_requirement)
+
+    if election_method == 'CAV':
+        return cav(number_of_winners, shared_count(ballot_set, 'cav', compile_cav_ballots, candidates, ballot_set['ballots'], True), quorum_requirement)
+
+    if election_method == 'SCORE':
+        return score(number_of_winners, shared_count(ballot_set, 'totals', count_scores, compiled), quorum_requirement)
+
+    return star(shared_count(ballot_set, 'totals', count_scores, compiled), quorum_requirement)
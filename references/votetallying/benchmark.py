@@ -0,0 +1,371 @@
+import argparse
+import gc
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+import tally
+from ballotgen import generate_ballots, plurality_ballots, python_ballots
+
+'''
+    Benchmarks of tally.plurality, tally.irv and tally.irv_coombs over
+    synthetic ballots (see ballotgen). Every case runs one method on one
+    ballot count and candidate count and records the best wall time of a few
+    runs, the peak memory allocated while tallying (measured with tracemalloc
+    in a separate run, since tracing slows the tally down) and the number of
+    rounds. Results are written as JSON so runs can be compared:
+
+        python benchmark.py run --output baseline.json
+        python benchmark.py run --output current.json --baseline baseline.json
+        python benchmark.py compare baseline.json current.json --threshold 0.1
+
+    Both run --baseline and compare exit with status 1 if a case of the
+    baseline got slower or used more memory than the threshold allows, found
+    another winner, or was not run.
+'''
+
+BALLOT_COUNTS = (1000, 10000, 100000, 1000000, 10000000)
+CANDIDATE_COUNTS = (3, 10, 50, 255)
+
+# the settings that decide which ballots a case is run on
+BALLOT_SETTINGS = ('seed', 'model', 'parameter', 'tie_rate', 'truncation_rate', 'write_in_rate')
+
+'''
+    Arguments: candidates [hash bytes,...], ballots [hash bytes,...]
+
+    Output: same as tally.plurality
+'''
+def run_plurality (candidates, ballots):
+    return tally.plurality(1, candidates, ballots, 0)
+
+'''
+    Arguments: candidates [hash bytes,...], ballots [[hash bytes,...],...]
+
+    Output: same as tally.irv
+'''
+def run_irv (candidates, ballots):
+    return tally.irv(candidates, ballots, 0)
+
+'''
+    Arguments: candidates [hash bytes,...], ballots [[hash bytes,...],...]
+
+    Output: same as tally.irv_coombs
+'''
+def run_irv_coombs (candidates, ballots):
+    return tally.irv_coombs(candidates, ballots, 0)
+
+# election method: (conversion of the generated ballots, tally)
+METHODS = {
+    'PLURALITY': (plurality_ballots, run_plurality),
+    'IRV': (python_ballots, run_irv),
+    'IRV_COOMBS': (python_ballots, run_irv_coombs)
+}
+
+'''
+    Arguments: n_candidates int
+
+    Output: list [hash bytes,...]; n_candidates distinct 32-byte hashes
+'''
+def benchmark_candidates (n_candidates):
+    return [(i + 1).to_bytes(32, 'big') for i in range(0, n_candidates)]
+
+'''
+    Arguments: case dict (see measure_case)
+
+    Output: str; e.g. IRV/100000/10
+'''
+def case_key (case):
+    return case['method'] + '/' + str(case['ballots']) + '/' + str(case['candidates'])
+
+'''
+    Arguments:  method str, n_ballots int, n_candidates int, repeat int,
+                memory bool, settings dict {seed, model, parameter, tie_rate,
+                truncation_rate, write_in_rate}
+
+    Runs one case. The ballots are generated and converted before the clock
+    starts, and again before every run since irv and irv_coombs change the
+    ballots and candidates they are given.
+
+    Output: dict {
+        method:str,
+        ballots:int,
+        candidates:int,
+        seconds:float; the best of repeat runs,
+        runs:[float,...],
+        peak_bytes:int or None,
+        rounds:int,
+        winners:[str,...]; hex, or the no-winner marker as it is
+    }
+'''
+def measure_case (method, n_ballots, n_candidates, repeat, memory, settings):
+    convert, run = METHODS[method]
+    candidates = benchmark_candidates(n_candidates)
+    compiled = generate_ballots(settings['model'], candidates, n_ballots, settings['seed'], settings['parameter'], settings['tie_rate'], settings['truncation_rate'], settings['write_in_rate'])
+
+    runs = []
+    for i in range(0, repeat):
+        ballots = convert(compiled)
+        gc.collect()
+        started = time.perf_counter()
+        result = run(list(candidates), ballots)
+        runs.append(time.perf_counter() - started)
+        del ballots
+
+    # measure memory in a run of its own
+    peak_bytes = None
+    if memory:
+        ballots = convert(compiled)
+        gc.collect()
+        tracemalloc.start()
+        run(list(candidates), ballots)
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del ballots
+
+    winners = result['winners'] if 'winners' in result else [result['winner']]
+
+    return {
+        'method': method,
+        'ballots': n_ballots,
+        'candidates': n_candidates,
+        'seconds': min(runs),
+        'runs': runs,
+        'peak_bytes': peak_bytes,
+        'rounds': len(result['tally']) if type(result['tally']) is list else 1,
+        'winners': [tally.tohex(w).decode() if type(w) is bytes else w for w in winners]
+    }
+
+'''
+    Arguments:  methods [str,...], ballot_counts [int,...],
+                candidate_counts [int,...], repeat int, memory bool,
+                seed int, model str, parameter, tie_rate float,
+                truncation_rate float, write_in_rate float, max_cells int,
+                max_seconds float, log function or None
+
+    Runs every method on every ballot count and candidate count, from the
+    fewest ballots up. Cases with more than max_cells ballots x candidates
+    are skipped, and so are the larger ballot counts of a method and
+    candidate count once a run takes longer than max_seconds. log is called
+    with every finished case.
+
+    Output: dict {
+        environment:dict {python, numpy, platform},
+        settings:dict,
+        results:[dict,...] (see measure_case),
+        skipped:[str,...] (see case_key)
+    }
+'''
+def run_suite (methods=tuple(METHODS), ballot_counts=BALLOT_COUNTS, candidate_counts=CANDIDATE_COUNTS, repeat=3, memory=True, seed=0, model='IMPARTIAL_CULTURE', parameter=None, tie_rate=0.0, truncation_rate=0.0, write_in_rate=0.0, max_cells=10**8, max_seconds=60.0, log=None):
+    for method in methods:
+        if method not in METHODS:
+            raise ValueError('Unknown benchmark method ' + str(method) + '.')
+
+    settings = {
+        'seed': seed,
+        'model': model,
+        'parameter': parameter,
+        'tie_rate': tie_rate,
+        'truncation_rate': truncation_rate,
+        'write_in_rate': write_in_rate,
+        'repeat': repeat,
+        'max_cells': max_cells,
+        'max_seconds': max_seconds
+    }
+    results, skipped = [], []
+
+    for method in methods:
+        for n_candidates in candidate_counts:
+            too_slow = False
+            for n_ballots in sorted(ballot_counts):
+                key = case_key({'method': method, 'ballots': n_ballots, 'candidates': n_candidates})
+                if too_slow or n_ballots * n_candidates > max_cells:
+                    skipped.append(key)
+                    continue
+
+                case = measure_case(method, n_ballots, n_candidates, repeat, memory, settings)
+                results.append(case)
+                too_slow = case['seconds'] > max_seconds
+                if log is not None:
+                    log(case)
+
+    return {
+        'environment': {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform()},
+        'settings': settings,
+        'results': results,
+        'skipped': skipped
+    }
+
+'''
+    Arguments: report dict (see run_suite)
+
+    Fits how the wall time of every method and candidate count grows with the
+    number of ballots: the slope of log seconds over log ballots between the
+    fewest and the most ballots run (1 is linear).
+
+    Output: dict {method/candidates str:exponent float}
+'''
+def scaling_exponents (report):
+    curves = {}
+    for case in report['results']:
+        curves.setdefault(case['method'] + '/' + str(case['candidates']), []).append((case['ballots'], case['seconds']))
+
+    exponents = {}
+    for key in curves:
+        points = sorted(curves[key])
+        (b0, s0), (b1, s1) = points[0], points[-1]
+        if b1 > b0 and s0 > 0 and s1 > 0:
+            exponents[key] = math.log(s1 / s0) / math.log(b1 / b0)
+
+    return exponents
+
+'''
+    Arguments:  baseline dict, current dict (see run_suite), threshold float,
+                min_seconds float
+
+    Compares every case of the baseline with the same case of the current
+    run. A case regresses if its wall time grew by more than threshold (a
+    fraction, 0.1 is 10%) and by more than min_seconds, which keeps timer
+    noise on tiny cases out, if its peak memory grew by more than threshold,
+    if it found other winners or if the current run does not have it. The
+    runs must have used the same ballots (see BALLOT_SETTINGS).
+
+    Output: dict {
+        compared:int,
+        regressions:[dict {case, metric, baseline, current},...],
+        passed:bool
+    }
+'''
+def compare_reports (baseline, current, threshold=0.1, min_seconds=0.005):
+    for k in BALLOT_SETTINGS:
+        if baseline['settings'].get(k) != current['settings'].get(k):
+            raise ValueError('Benchmarks ran on different ballots: ' + k + ' was ' + str(baseline['settings'].get(k)) + ' and is ' + str(current['settings'].get(k)) + '.')
+
+    cases = {case_key(case): case for case in current['results']}
+    regressions = []
+    compared = 0
+
+    for old in baseline['results']:
+        key = case_key(old)
+        if key not in cases:
+            regressions.append({'case': key, 'metric': 'missing', 'baseline': old['seconds'], 'current': None})
+            continue
+
+        new = cases[key]
+        compared += 1
+        if new['seconds'] > old['seconds'] * (1 + threshold) and new['seconds'] - old['seconds'] > min_seconds:
+            regressions.append({'case': key, 'metric': 'seconds', 'baseline': old['seconds'], 'current': new['seconds']})
+        if old['peak_bytes'] is not None and new['peak_bytes'] is not None and new['peak_bytes'] > old['peak_bytes'] * (1 + threshold):
+            regressions.append({'case': key, 'metric': 'peak_bytes', 'baseline': old['peak_bytes'], 'current': new['peak_bytes']})
+        if new['winners'] != old['winners']:
+            regressions.append({'case': key, 'metric': 'winners', 'baseline': old['winners'], 'current': new['winners']})
+
+    return {'compared': compared, 'regressions': regressions, 'passed': not regressions}
+
+'''
+    Argument: case dict (see measure_case)
+
+    Prints one finished case on a line: its key, best wall time, peak memory
+    if it was measured and number of rounds.
+
+    Output: None
+'''
+def print_case (case):
+    memory = '' if case['peak_bytes'] is None else '  %10.1f MiB' % (case['peak_bytes'] / 2**20)
+    print('%-24s %10.4f s%s  %4d rounds' % (case_key(case), case['seconds'], memory, case['rounds']))
+
+'''
+    Argument: comparison dict (see compare_reports)
+
+    Prints every regression on a line of its own, then the totals.
+
+    Output: None
+'''
+def print_comparison (comparison):
+    for r in comparison['regressions']:
+        print('REGRESSION %-24s %-10s %s -> %s' % (r['case'], r['metric'], r['baseline'], r['current']))
+    print('%d cases compared, %d regressions' % (comparison['compared'], len(comparison['regressions'])))
+
+'''
+    Arguments: text str, cast function
+
+    Parses a comma-separated command line value, e.g. 1000,10000.
+
+    Output: list [cast(item),...]
+'''
+def parse_list (text, cast):
+    return [cast(x) for x in text.split(',') if x]
+
+'''
+    Argument: text str
+
+    Parses --parameter, which is an int for some models (e.g. the SPATIAL
+    dimensions) and a float for others (e.g. the MALLOWS dispersion).
+
+    Output: int or float
+'''
+def parse_parameter (text):
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+'''
+    Argument: argv [str,...]; the command line without the program name
+
+    Output: int; the exit status, 1 if compare_reports found a regression
+'''
+def main (argv):
+    parser = argparse.ArgumentParser(description='Benchmark the tally functions.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='run the benchmark suite')
+    run.add_argument('--methods', type=lambda t: parse_list(t, str), default=list(METHODS))
+    run.add_argument('--ballots', type=lambda t: parse_list(t, int), default=list(BALLOT_COUNTS))
+    run.add_argument('--candidates', type=lambda t: parse_list(t, int), default=list(CANDIDATE_COUNTS))
+    run.add_argument('--repeat', type=int, default=3)
+    run.add_argument('--no-memory', action='store_true', help='skip the peak memory runs')
+    run.add_argument('--seed', type=int, default=0)
+    run.add_argument('--model', default='IMPARTIAL_CULTURE')
+    run.add_argument('--parameter', type=parse_parameter, default=None)
+    run.add_argument('--tie-rate', type=float, default=0.0)
+    run.add_argument('--truncation-rate', type=float, default=0.0)
+    run.add_argument('--write-in-rate', type=float, default=0.0)
+    run.add_argument('--max-cells', type=int, default=10**8, help='skip cases with more ballots x candidates')
+    run.add_argument('--max-seconds', type=float, default=60.0, help='skip larger ballot counts after a slower run')
+    run.add_argument('--output', help='write the results to this JSON file')
+    run.add_argument('--baseline', help='compare the results with this JSON file')
+    run.add_argument('--threshold', type=float, default=0.1)
+    run.add_argument('--min-seconds', type=float, default=0.005)
+
+    compare = commands.add_parser('compare', help='compare two result files')
+    compare.add_argument('baseline')
+    compare.add_argument('current')
+    compare.add_argument('--threshold', type=float, default=0.1)
+    compare.add_argument('--min-seconds', type=float, default=0.005)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        report = run_suite(args.methods, args.ballots, args.candidates, args.repeat, not args.no_memory, args.seed, args.model, args.parameter, args.tie_rate, args.truncation_rate, args.write_in_rate, args.max_cells, args.max_seconds, print_case)
+        for key, exponent in sorted(scaling_exponents(report).items()):
+            print('%-24s time ~ ballots^%.2f' % (key, exponent))
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=2)
+        if not args.baseline:
+            return 0
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            report = json.load(f)
+
+    comparison = compare_reports(baseline, report, args.threshold, args.min_seconds)
+    print_comparison(comparison)
+    return 0 if comparison['passed'] else 1
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -4,10 +4,12 @@ from nacl.encoding import RawEncoder
 from nacl.hash import sha256
 from nacl.public import PrivateKey
 from nacl.signing import SigningKey, VerifyKey
+import math
 import nacl
 import os.path
 import sys
 import tally
+import candidateregistry
 # add lib folder
 sys.path.insert(1, '/home/sithlord/Documents/programming/python/votebadge/lib')
 import blockchain
@@ -20,7 +22,7 @@ from utils import tohex, fromhex, b2a, a2b
     by the first byte of the body being one of these control characters.
 '''
 def define_consts ():
-    conST.PROTOCOL_VERSION      = b'\x00'
+    const.PROTOCOL_VERSION      = b'\x00'
     const.PROPOSAL_PLURALITY    = b'\x00' # First-past-the-post/bloc voting
     const.PROPOSAL_IRV          = b'\x01' # Instant Run-off Vote/Alternative Vote
     const.PROPOSAL_IRV_COOMBS   = b'\x02' # IRV with Coomb's Method
@@ -176,7 +178,6 @@ def get_control_code (char):
         b'\x24' :   'CREATE',
         b'\x25' :   'TRANSFER',
         b'\x26' :   'DELEGATE',
-        b'\x2' :   '',
         b'\x30' :   'OTHER',
         b'\x31' :   'INFORMATIONAL',
         b'\x32' :   'ADVISORY',
@@ -331,7 +332,10 @@ def pack_proposal (election_method, intro, number_of_winners, quorum_requirement
 '''
     Arguments: body bytes (stripped of control character)
 
-    Output: dict {start_time:datetime, end_time:datetime, quorum_requirement:int, number_of_candidates:int, number_of_winners:int, intro:bytes, candidates:[[hash, candidate_bytes],...]}
+    The raw candidate hashes are interned into a registry (see
+    candidateregistry.new_registry) so ballots can be decoded straight into ids.
+
+    Output: dict {start_time:datetime, end_time:datetime, quorum_requirement:int, number_of_candidates:int, number_of_winners:int, intro:bytes, candidates:[[hash, candidate_bytes],...], registry:dict}
 '''
 def unpack_proposal (body):
     # parse metadata
@@ -346,10 +350,11 @@ def unpack_proposal (body):
     intro = body[14:14+intro_size]
 
     # parse candidates
-    candidates_bytes, candidates_list = body[14+intro_size:len(body)], []
+    candidates_bytes, candidates_list, candidate_hashes = body[14+intro_size:len(body)], [], []
     i, j = 0, len(candidates_bytes)
     while i < j:
         # first 32 bytes are hash
+        candidate_hashes.append(candidates_bytes[i:i+32])
         candidate_hash = tohex(candidates_bytes[i:i+32])
         i += 32
         # next 2 bytes define length of candidate data
@@ -359,7 +364,7 @@ def unpack_proposal (body):
         candidates_list.append((candidate_hash, candidates_bytes[i:i+candidate_length]))
         i += candidate_length
 
-    return {'start_time': start_time, 'end_time': end_time, 'quorum_requirement': quorum_requirement, 'number_of_candidates': number_of_candidates, 'number_of_winners': number_of_winners, 'intro': intro, 'candidates': candidates_list}
+    return {'start_time': start_time, 'end_time': end_time, 'quorum_requirement': quorum_requirement, 'number_of_candidates': number_of_candidates, 'number_of_winners': number_of_winners, 'intro': intro, 'candidates': candidates_list, 'registry': candidateregistry.new_registry(candidate_hashes)}
 
 '''
     Arguments: intro bytes, number_of_winners int, quorum_requirement int,
@@ -421,7 +426,7 @@ def pack_plurality_proposal (intro, number_of_winners, quorum_requirement, candi
 '''
     Arguments: body bytes (stripped of control character)
 
-    Output: dict {start_time:datetime, end_time:datetime, quorum_requirement:int, number_of_candidates:int, number_of_winners:int, intro:bytes, candidates:[[hash, candidate_bytes],...]}
+    Output: dict {start_time:datetime, end_time:datetime, quorum_requirement:int, number_of_candidates:int, number_of_winners:int, intro:bytes, candidates:[[hash, candidate_bytes],...], registry:dict}
 '''
 def unpack_plurality_proposal (body):
     # parse metadata
@@ -436,10 +441,11 @@ def unpack_plurality_proposal (body):
     intro = body[14:14+intro_size]
 
     # parse candidates
-    candidates_bytes, candidates_list = body[14+intro_size:len(body)], []
+    candidates_bytes, candidates_list, candidate_hashes = body[14+intro_size:len(body)], [], []
     i, j = 0, len(candidates_bytes)
     while i < j:
         # first 32 bytes are hash
+        candidate_hashes.append(candidates_bytes[i:i+32])
         candidate_hash = tohex(candidates_bytes[i:i+32])
         i += 32
         # next 2 bytes define length of candidate data
@@ -449,7 +455,7 @@ def unpack_plurality_proposal (body):
         candidates_list.append((candidate_hash, candidates_bytes[i:i+candidate_length]))
         i += candidate_length
 
-    return {'start_time': start_time, 'end_time': end_time, 'quorum_requirement': quorum_requirement, 'number_of_candidates': number_of_candidates, 'number_of_winners': number_of_winners, 'intro': intro, 'candidates': candidates_list}
+    return {'start_time': start_time, 'end_time': end_time, 'quorum_requirement': quorum_requirement, 'number_of_candidates': number_of_candidates, 'number_of_winners': number_of_winners, 'intro': intro, 'candidates': candidates_list, 'registry': candidateregistry.new_registry(candidate_hashes)}
 
 '''
     Arguments: intro bytes, quorum_requirement int, candidates [bytes,...],
@@ -499,7 +505,7 @@ def pack_irv_proposal (intro, quorum_requirement, candidates, start_time, end_ti
 '''
     Arguments: body bytes (stripped of control character)
 
-    Output: dict {start_time:datetime, end_time:datetime, quorum_requirement:int, number_of_candidates:int, intro:bytes, candidates:[[hash, candidate_bytes],...]}
+    Output: dict {start_time:datetime, end_time:datetime, quorum_requirement:int, number_of_candidates:int, intro:bytes, candidates:[[hash, candidate_bytes],...], registry:dict}
 '''
 def unpack_irv_proposal (body):
     # parse metadata
@@ -513,10 +519,11 @@ def unpack_irv_proposal (body):
     intro = body[13:13+intro_size]
 
     # parse candidates
-    candidates_bytes, candidates_list = body[13+intro_size:len(body)], []
+    candidates_bytes, candidates_list, candidate_hashes = body[13+intro_size:len(body)], [], []
     i, j = 0, len(candidates_bytes)
     while i < j:
         # first 32 bytes are hash
+        candidate_hashes.append(candidates_bytes[i:i+32])
         candidate_hash = tohex(candidates_bytes[i:i+32])
         i += 32
         # next 2 bytes define length of candidate data
@@ -526,7 +533,7 @@ def unpack_irv_proposal (body):
         candidates_list.append((candidate_hash, candidates_bytes[i:i+candidate_length]))
         i += candidate_length
 
-    return {'start_time': start_time, 'end_time': end_time, 'quorum_requirement': quorum_requirement, 'number_of_candidates': number_of_candidates, 'intro': intro, 'candidates': candidates_list}
+    return {'start_time': start_time, 'end_time': end_time, 'quorum_requirement': quorum_requirement, 'number_of_candidates': number_of_candidates, 'intro': intro, 'candidates': candidates_list, 'registry': candidateregistry.new_registry(candidate_hashes)}
 
 '''
     Arguments: intro bytes, quorum_requirement int, candidates [bytes,...],
@@ -549,7 +556,7 @@ def pack_irv_coombs_proposal (intro, quorum_requirement, candidates, start_time,
 '''
     Arguments: body bytes (stripped of control characters)
 
-    Output: dict {start_time:datetime, end_time:datetime, quorum_requirement:int, number_of_candidates:int, intro:bytes, candidates:[[hash, candidate_bytes],...]}
+    Output: dict {start_time:datetime, end_time:datetime, quorum_requirement:int, number_of_candidates:int, intro:bytes, candidates:[[hash, candidate_bytes],...], registry:dict}
 '''
 def unpack_irv_coombs_proposal (body):
     # same as regular IRV serialization
@@ -588,20 +595,16 @@ def pack_plurality_ballot (proposal_ref_hash, candidate_hashes):
     return body
 
 '''
-    Arguments: body bytes (stripped of control characters)
+    Arguments: body bytes (stripped of control characters), registry dict (optional)
 
-    Output: dict {proposal_ref_hash:bytes, candidate_hashes:[bytes,...]}
-'''
-def unpack_plurality_ballot (body):
-    proposal_ref_hash = body[0:32]
-    candidate_hashes_bytes = body[32:len(body)]
-    candidate_hashes = []
-    i, j = 0, len(candidate_hashes_bytes)
-    while i < j:
-        candidate_hashes.append(candidate_hashes_bytes[i:i+32])
-        i += 32
+    If the registry of the proposal is given (see unpack_proposal), the hashes
+    are decoded straight into candidate ids as well.
 
-    return {'proposal_ref_hash': proposal_ref_hash, 'candidate_hashes': candidate_hashes}
+    Output: dict {proposal_ref_hash:bytes, candidate_hashes:[bytes,...], candidate_ids:[int,...] (with registry)}
+'''
+def unpack_plurality_ballot (body, registry=None):
+    # same layout as a ranked ballot
+    return unpack_ranked_ballot(body, registry)
 
 '''
     Arguments: proposal_ref_hashbytes, candidate_hashes [bytes,...]
@@ -618,11 +621,16 @@ def pack_ranked_ballot (proposal_ref_hash, candidate_hashes):
     return body
 
 '''
-    Argument: body bytes (stripped of control characters)
+    Arguments: body bytes (stripped of control characters), registry dict (optional)
+
+    If the registry of the proposal is given (see unpack_proposal), the hashes
+    are decoded straight into candidate ids as well; hashes that are not on the
+    proposal get write-in ids local to the ballot (see
+    candidateregistry.intern_ballot), and the registry is left unchanged.
 
-    Output: dict {proposal_ref_hash:bytes, candidate_hashes:[bytes,...]}
+    Output: dict {proposal_ref_hash:bytes, candidate_hashes:[bytes,...], candidate_ids:[int,...] (with registry)}
 '''
-def unpack_ranked_ballot (body):
+def unpack_ranked_ballot (body, registry=None):
     proposal_ref_hash = body[0:32]
     candidate_hashes_bytes = body[32:len(body)]
     candidate_hashes = []
@@ -631,7 +639,11 @@ def unpack_ranked_ballot (body):
         candidate_hashes.append(candidate_hashes_bytes[i:i+32])
         i += 32
 
-    return {'proposal_ref_hash': proposal_ref_hash, 'candidate_hashes': candidate_hashes}
+    ballot = {'proposal_ref_hash': proposal_ref_hash, 'candidate_hashes': candidate_hashes}
+    if registry is not None:
+        ballot['candidate_ids'] = candidateregistry.intern_ballot(registry, candidate_hashes)
+
+    return ballot
 
 '''
     Arguments: proposal_ref_hash bytes, candidate_hashes [bytes,...]
@@ -642,12 +654,12 @@ def pack_irv_ballot (proposal_ref_hash, candidate_hashes):
     return pack_ranked_ballot(proposal_ref_hash, candidate_hashes)
 
 '''
-    Argument: body bytes (stripped of control characters)
+    Arguments: body bytes (stripped of control characters), registry dict (optional)
 
-    Output: dict {proposal_ref_hash:bytes, candidate_hashes:[bytes,...]}
+    Output: dict {proposal_ref_hash:bytes, candidate_hashes:[bytes,...], candidate_ids:[int,...] (with registry)}
 '''
-def unpack_irv_ballot(body):
-    return unpack_ranked_ballot(body)
+def unpack_irv_ballot(body, registry=None):
+    return unpack_ranked_ballot(body, registry)
 
 
 '''
@@ -757,10 +769,46 @@ def unpack_plurality_tally (body):
     }
 
 
+'''
+    Argument: n int (not negative)
+
+    Packs n in as few bytes as it needs: 7 bits per byte, lowest bits first,
+    with the high bit set on every byte but the last.
+
+    Output: bytes
+'''
+def pack_varint (n):
+    if n < 0:
+        raise ValueError('Cannot pack a negative varint.')
+
+    packed = bytearray()
+    while n > 0x7f:
+        packed.append((n & 0x7f) | 0x80)
+        n >>= 7
+    packed.append(n)
+
+    return bytes(packed)
+
+'''
+    Argument: body bytes starting with a varint (see pack_varint)
+
+    Output: tuple (n int, rest of body bytes)
+'''
+def unpack_varint (body):
+    n, shift = 0, 0
+    for i in range(0, len(body)):
+        n |= (body[i] & 0x7f) << shift
+        shift += 7
+        if body[i] & 0x80 == 0:
+            return n, body[i+1:]
+
+    raise ValueError('Truncated varint.')
+
 '''
     Arguments:  collection_ref_hash bytes,
         result dict {
             tally:[OrderedDict {candidate_hash:highest_preference_votes int, ...}, ...],
+            denominators:[int, ...] (optional),
             winner:winner_hash bytes,
             valid_ballots:int,
             invalid_ballots:int,
@@ -769,19 +817,29 @@ def unpack_plurality_tally (body):
         }
 
     Output: const.TALLY_OF_VOTES + const.PROPOSAL_IRV + collection_ref_hash +
-        meets_quorum (\x00 or \x01) +
+        flags (1 byte: \x01 meets_quorum | \x02 fractional) +
         valid_ballots (2 bytes) + invalid_ballots (2 bytes) + exhausted_ballots (2 bytes) +
         winner (32 bytes) +
         n_rounds (1 byte) +
         (for round in tally:
             n_candidates (2 bytes) +
-            (for ch, v in round: ch (32 bytes) + v (2 bytes))
+            (if fractional: denominator (varint)) +
+            (for ch, v in round: ch (32 bytes) + v (2 bytes, or varint if fractional))
         )
+
+    The fractional flag is only set if a round split votes between tied ranks
+    (i.e. has a denominator above 1); otherwise the legacy layout is used. In
+    the fractional layout each round is reduced by the gcd of its denominator
+    and votes before packing (see pack_varint), so unpacking may give a smaller
+    denominator for the same shares.
 '''
 def pack_irv_tally (collection_ref_hash, result):
     # metadata
     body = const.TALLY_OF_VOTES + const.PROPOSAL_IRV + collection_ref_hash
-    body += (b'\x01' if result['meets_quorum'] else b'\x00')
+    denominators = result.get('denominators', [1] * len(result['tally']))
+    fractional = max(denominators, default=1) > 1
+    flags = (0x01 if result['meets_quorum'] else 0x00) | (0x02 if fractional else 0x00)
+    body += flags.to_bytes(1, byteorder='big')
     body += result['valid_ballots'].to_bytes(2, byteorder='big')
     body += result['invalid_ballots'].to_bytes(2, byteorder='big')
     body += result['exhausted_ballots'].to_bytes(2, byteorder='big')
@@ -795,9 +853,18 @@ def pack_irv_tally (collection_ref_hash, result):
         # n_candidates
         body += len(result['tally'][i]).to_bytes(2, byteorder='big')
 
+        if not fractional:
+            for candidate_hash, votes in result['tally'][i].items():
+                body += candidate_hash + votes.to_bytes(2, byteorder='big')
+            continue
+
+        # denominator of the scaled votes, reduced with the votes of the round
+        divisor = math.gcd(denominators[i], *result['tally'][i].values())
+        body += pack_varint(denominators[i] // divisor)
+
         # each one
         for candidate_hash, votes in result['tally'][i].items():
-            body += candidate_hash + votes.to_bytes(2, byteorder='big')
+            body += candidate_hash + pack_varint(votes // divisor)
 
     return body
 
@@ -812,12 +879,15 @@ def pack_irv_tally (collection_ref_hash, result):
         invalid_ballots:int,
         exhausted_ballots:int,
         tally:[OrderedDict {candidate_hash:highest_preference_votes int, ...}, ...],
+        denominators:[int, ...]
     }
 '''
 def unpack_irv_tally (body):
     # metadata
     collection_ref_hash = body[0:32]
-    meets_quorum = (body[32:33] == b'\x01')
+    flags = body[32]
+    meets_quorum = (flags & 0x01) == 0x01
+    fractional = (flags & 0x02) == 0x02
     valid_ballots = int.from_bytes(body[33:35], byteorder='big')
     invalid_ballots = int.from_bytes(body[35:37], byteorder='big')
     exhausted_ballots = int.from_bytes(body[37:39], byteorder='big')
@@ -827,6 +897,7 @@ def unpack_irv_tally (body):
     n_rounds = int.from_bytes(body[71:72], byteorder='big')
     tally_bytes = body[72:]
     tally = []
+    denominators = []
 
     # for each round
     for r in range(0, n_rounds):
@@ -834,26 +905,33 @@ def unpack_irv_tally (body):
         round_tally = OrderedDict({})
         # parse number of candidates
         n_candidates = int.from_bytes(tally_bytes[0:2], byteorder='big')
-        # get the bytes for the current round
-        round_bytes = tally_bytes[2:2+n_candidates*34]
-        # trim the remainder
-        tally_bytes = tally_bytes[2+n_candidates*34:]
+        tally_bytes = tally_bytes[2:]
+        # parse the denominator of the scaled votes
+        if fractional:
+            denominator, tally_bytes = unpack_varint(tally_bytes)
+            denominators.append(denominator)
+        else:
+            denominators.append(1)
 
         # get the hash of each candidate and set its vote count
         for c in range(0, n_candidates):
-            hash_begin, hash_end, votes_end = c*34, c*34+32, c*34+34
-            candidate_hash = round_bytes[hash_begin:hash_end]
-            round_tally[candidate_hash] = int.from_bytes(round_bytes[hash_end:votes_end], byteorder='big')
+            candidate_hash = tally_bytes[0:32]
+            if fractional:
+                round_tally[candidate_hash], tally_bytes = unpack_varint(tally_bytes[32:])
+            else:
+                round_tally[candidate_hash] = int.from_bytes(tally_bytes[32:34], byteorder='big')
+                tally_bytes = tally_bytes[34:]
 
         # add to the total tally
         tally.append(round_tally)
 
-    return {'collection_ref_hash': collection_ref_hash, 'winner': winner, 'meets_quorum': meets_quorum, 'valid_ballots': valid_ballots, 'invalid_ballots': invalid_ballots, 'exhausted_ballots': exhausted_ballots, 'tally': tally}
+    return {'collection_ref_hash': collection_ref_hash, 'winner': winner, 'meets_quorum': meets_quorum, 'valid_ballots': valid_ballots, 'invalid_ballots': invalid_ballots, 'exhausted_ballots': exhausted_ballots, 'tally': tally, 'denominators': denominators}
 
 '''
     Arguments:  collection_ref_hash bytes,
         result dict {
             tally:[OrderedDict {candidate_hash:highest_preference_votes int, ...}, ...],
+            denominators:[int, ...] (optional),
             winner:winner_hash bytes,
             valid_ballots:int,
             invalid_ballots:int,
@@ -862,14 +940,7 @@ def unpack_irv_tally (body):
         }
 
     Output: const.TALLY_OF_VOTES + const.PROPOSAL_IRV_COOMBS + collection_ref_hash +
-        meets_quorum (\x00 or \x01) +
-        valid_ballots (2 bytes) + invalid_ballots (2 bytes) + exhausted_ballots (2 bytes) +
-        winner (32 bytes) +
-        n_rounds (1 byte) +
-        (for round in tally:
-            n_candidates (2 bytes) +
-            (for ch, v in round: ch (32 bytes) + v (2 bytes))
-        )
+        (same layout as pack_irv_tally)
 '''
 def pack_irv_coombs_tally (collection_ref_hash, result):
     # same as normal IRV tally but with different control character
@@ -886,6 +957,7 @@ def pack_irv_coombs_tally (collection_ref_hash, result):
         invalid_ballots:int,
         exhausted_ballots:int,
         tally:[OrderedDict {candidate_hash:highest_preference_votes int, ...}, ...],
+        denominators:[int, ...]
     }
 '''
 def unpack_irv_coombs_tally (body):
@@ -0,0 +1,111 @@
+import numpy as np
+from ballotmatrix import compile_ranked_ballots, rank_groups, well_formed
+from tally import sort_candidates
+
+'''
+    Argument: compiled dict (see ballotmatrix.compile_ranked_ballots)
+
+    Counts every rank position once into a candidates x ranks histogram:
+    histogram[c][r] is the number of voters ranking candidate c at rank r.
+    Tied candidates share a rank and each receive a full vote there. Invalid
+    ballots (see ballotmatrix.well_formed) are left out. The counts for every
+    Bucklin round follow from prefix sums over the ranks.
+
+    Output: dict {
+        candidates:[hash bytes,...],
+        histogram:ndarray int64 (candidates x ranks),
+        exhausted:ndarray int64 (ranks),
+        invalid_ballots:int,
+        valid_ballots:int
+    }
+'''
+def rank_histogram (compiled):
+    matrix, counts = compiled['matrix'], compiled['counts']
+    n_candidates = len(compiled['candidates'])
+    valid = well_formed(compiled)
+    group_numbers = rank_groups(compiled)[1]
+    cells = (matrix >= 0) & valid[:, None]
+    n_ranks = int(group_numbers[cells].max()) + 1 if cells.any() else 0
+
+    # one scatter-add over all ranked positions
+    histogram = np.zeros((n_candidates, n_ranks), dtype=np.int64)
+    np.add.at(histogram, (matrix[cells], group_numbers[cells]), np.broadcast_to(counts[:, None], matrix.shape)[cells])
+
+    # exhausted[r] is the number of valid ballots with fewer than r+1 ranks
+    if cells.any():
+        last_rank = np.where(cells, group_numbers, -1).max(axis=1)
+        ranked = np.bincount(last_rank[valid] + 1, weights=counts[valid], minlength=n_ranks + 1).astype(np.int64)
+        exhausted = np.cumsum(ranked)[:n_ranks]
+    else:
+        exhausted = np.zeros(0, dtype=np.int64)
+
+    return {
+        'candidates': compiled['candidates'],
+        'histogram': histogram,
+        'exhausted': exhausted,
+        'invalid_ballots': int(counts[~valid].sum()),
+        'valid_ballots': int(counts[valid].sum())
+    }
+
+'''
+    Arguments: histogram dict (see rank_histogram), quorum_requirement int
+
+    Bucklin/Grand Junction system. In round r every candidate has the votes of
+    the voters ranking them anywhere in the first r ranks, i.e. the prefix sum
+    of their histogram row. As soon as a round gives a candidate more votes than
+    half the valid ballots, the candidate with the most votes wins. If the
+    ranks run out first, the candidate with the most votes in the last round
+    wins. A tie for the most votes moves on to the next round; a tie in the
+    last round has no winner.
+
+    Output: dict {
+        tally:list [OrderedDict {candidate_hash:votes int}, ...],
+        winner:winner_hash bytes,
+        invalid_ballots:int,
+        valid_ballots:int,
+        exhausted_ballots:int,
+        meets_quorum:bool
+    }
+'''
+def bucklin_rounds (histogram, quorum_requirement):
+    candidates = histogram['candidates']
+    valid_ballots = histogram['valid_ballots']
+    cumulative = np.cumsum(histogram['histogram'], axis=1)
+    n_ranks = cumulative.shape[1]
+    tally = []
+    exhausted_ballots = 0
+    winner = 'b\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'
+
+    for r in range(0, n_ranks):
+        votes = cumulative[:, r]
+        tally.append(sort_candidates({candidates[i]: int(votes[i]) for i in range(0, len(candidates))}))
+        exhausted_ballots = int(histogram['exhausted'][r])
+
+        # see if the leader is unique and has a majority or there are no more rounds
+        leaders = np.flatnonzero(votes == votes.max())
+        if len(leaders) == 1 and (votes[leaders[0]] > valid_ballots // 2 or r == n_ranks - 1):
+            winner = candidates[leaders[0]]
+            break
+
+    return {
+        'tally': tally,
+        'winner': winner,
+        'invalid_ballots': histogram['invalid_ballots'],
+        'valid_ballots': valid_ballots,
+        'exhausted_ballots': exhausted_ballots,
+        'meets_quorum': valid_ballots - exhausted_ballots > quorum_requirement
+    }
+
+'''
+    Arguments:  candidates [hash bytes,...],
+                ballots [[hash bytes or [hash bytes,...],...],...],
+                quorum_requirement int, weighted bool
+
+    Compiles the ballots, builds the rank histogram in one pass and runs the
+    Bucklin rounds on it. The result has the same shape as tally.irv, so it
+    can be packed with blockformat.pack_irv_tally.
+
+    Output: same as bucklin_rounds
+'''
+def bucklin (candidates, ballots, quorum_requirement, weighted=False):
+    return bucklin_rounds(rank_histogram(compile_ranked_ballots(candidates, ballots, weighted)), quorum_requirement)
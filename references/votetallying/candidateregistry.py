@@ -0,0 +1,143 @@
+from collections import OrderedDict
+from tally import single_vote
+
+'''
+    Candidate interning. A registry maps every 32-byte candidate hash of a
+    proposal to a dense id (0, 1, 2, ...) in proposal order, so that ballots
+    can be decoded straight into ids and the tally functions never have to
+    hash or compare 32-byte keys. Results are mapped back to hashes with
+    resolve_result just before they are packed or displayed.
+'''
+
+'''
+    Argument: candidate_hashes [hash bytes,...]
+
+    Creates a registry for the candidates of one proposal. Repeated hashes are
+    interned once. The registry is never changed after this, so decoding
+    ballots does not depend on their order.
+
+    Output: dict {
+        hashes:[hash bytes,...],
+        ids:dict {hash bytes:id int},
+        proposed:int
+    }
+'''
+def new_registry (candidate_hashes):
+    registry = {'hashes': [], 'ids': {}, 'proposed': 0}
+    for h in candidate_hashes:
+        if h not in registry['ids']:
+            registry['ids'][h] = len(registry['hashes'])
+            registry['hashes'].append(h)
+    registry['proposed'] = len(registry['hashes'])
+    return registry
+
+'''
+    Arguments: registry dict (see new_registry), candidate_hash bytes, write_ins dict {hash bytes:id int}
+
+    Returns the id of candidate_hash. Hashes that were not on the proposal
+    (write-ins) get ids from proposed upwards, numbered per ballot in the order
+    they appear and kept in write_ins, so they are never mistaken for a proposed
+    candidate and a repeated write-in keeps its id within the ballot.
+
+    Output: int
+'''
+def candidate_id (registry, candidate_hash, write_ins):
+    ids = registry['ids']
+    if candidate_hash in ids:
+        return ids[candidate_hash]
+    if candidate_hash not in write_ins:
+        write_ins[candidate_hash] = registry['proposed'] + len(write_ins)
+    return write_ins[candidate_hash]
+
+'''
+    Argument: registry dict (see new_registry)
+
+    Output: list [id int,...] of the proposed candidates, to be passed to the
+            tally functions in place of the candidate hashes
+'''
+def candidate_ids (registry):
+    return list(range(0, registry['proposed']))
+
+'''
+    Arguments: registry dict (see new_registry), ballot hash bytes or [hash bytes or [hash bytes,...],...]
+
+    A bare hash (an FPTP vote, see tally.single_vote) is a single choice; any
+    other sequence, list or tuple, is a ranked or MNTV ballot. Write-ins get
+    ids local to the ballot (see candidate_id); the registry is not changed.
+
+    Output: id int, or list [id int or [id int,...],...]
+'''
+def intern_ballot (registry, ballot):
+    write_ins = {}
+    if single_vote(ballot):
+        return candidate_id(registry, ballot, write_ins)
+
+    interned = []
+    for rank in ballot:
+        # handle ties
+        if type(rank) is list:
+            interned.append([candidate_id(registry, c, write_ins) for c in rank])
+        else:
+            interned.append(candidate_id(registry, rank, write_ins))
+    return interned
+
+'''
+    Arguments: registry dict (see new_registry), ballots [ballot,...], weighted bool
+
+    Interns every ballot (see intern_ballot). If weighted is True, ballots must
+    be (ballot, count) pairs and the counts are kept.
+
+    Output: list [ballot,...] or [(ballot, count int),...]
+'''
+def intern_ballots (registry, ballots, weighted=False):
+    if weighted:
+        return [(intern_ballot(registry, b), count) for b, count in ballots]
+    return [intern_ballot(registry, b) for b in ballots]
+
+'''
+    Arguments: registry dict (see new_registry), candidate id int
+
+    Output: hash bytes, or candidate unchanged if it is not the id of a
+            proposed candidate (e.g. the no-winner placeholder or a write-in)
+'''
+def resolve_candidate (registry, candidate):
+    if type(candidate) is int and 0 <= candidate < registry['proposed']:
+        return registry['hashes'][candidate]
+    return candidate
+
+'''
+    Arguments: registry dict (see new_registry), tally OrderedDict or list or RoundHistory
+
+    Maps the keys of a tally back to hashes, keeping their order. Lists of
+    rounds (and the [highest, lowest] pairs of irv_coombs) are mapped
+    recursively; a RoundHistory only has its candidates mapped.
+
+    Output: same shape as tally
+'''
+def resolve_tally (registry, tally):
+    # a RoundHistory (see roundhistory), told apart without importing numpy
+    if hasattr(tally, 'with_candidates'):
+        return tally.with_candidates([resolve_candidate(registry, c) for c in tally.candidates])
+    if type(tally) is list:
+        return [resolve_tally(registry, t) for t in tally]
+    return OrderedDict((resolve_candidate(registry, c), votes) for c, votes in tally.items())
+
+'''
+    Arguments: registry dict (see new_registry), result dict from any tally function
+
+    Returns a copy of result with the winner, winners, eliminated and tally
+    keyed by candidate hash again, ready for blockformat to pack.
+
+    Output: dict
+'''
+def resolve_result (registry, result):
+    resolved = dict(result)
+    if 'winner' in result:
+        resolved['winner'] = resolve_candidate(registry, result['winner'])
+    if 'winners' in result:
+        resolved['winners'] = [resolve_candidate(registry, c) for c in result['winners']]
+    if 'eliminated' in result:
+        resolved['eliminated'] = [[resolve_candidate(registry, c) for c in round] for round in result['eliminated']]
+    if 'tally' in result:
+        resolved['tally'] = resolve_tally(registry, result['tally'])
+    return resolved
@@ -0,0 +1,185 @@
+import numpy as np
+from tally import sort_candidates
+
+'''
+    Arguments: compiled dict (see ballotmatrix.compile_ranked_ballots), keep_unknown bool
+
+    Turns each compiled ballot into the rank of every candidate on it. Tied
+    candidates share a rank and candidates left off the ballot share the rank
+    after the last one, so every ranked candidate beats every unranked one. If a
+    candidate is ranked more than once, their highest rank counts. If
+    keep_unknown is True, an extra last column holds the highest rank of any
+    candidate not on the proposal.
+
+    Output: ndarray int16 (ballots x candidates, or candidates + 1)
+'''
+def candidate_ranks (compiled, keep_unknown=False):
+    matrix, group_ends = compiled['matrix'], compiled['group_ends']
+    n_candidates = len(compiled['candidates'])
+
+    # reuse the ranks of a compiled ballot set (see ballotset.compile_ballot_set)
+    if 'ranks' in compiled:
+        return compiled['ranks'] if keep_unknown else compiled['ranks'][:, :n_candidates]
+
+    rows = np.arange(len(matrix))
+    ranks = np.full((len(matrix), n_candidates + 1), matrix.shape[1] + 1, dtype=np.int16)
+
+    # walk the columns backwards so the highest rank of a repeated candidate wins
+    for col in range(matrix.shape[1] - 1, -1, -1):
+        filled = matrix[:, col] >= 0
+        ranks[rows[filled], matrix[filled, col]] = group_ends[filled, col]
+
+    # drop the slot for candidates not on the proposal
+    if keep_unknown:
+        return ranks
+    return ranks[:, :n_candidates]
+
+'''
+    Arguments: compiled dict (see ballotmatrix.compile_ranked_ballots), chunk_size int
+
+    Builds the candidate x candidate pairwise preference matrix in one pass over
+    the compiled ballots: pairwise[i][j] is the number of voters ranking
+    candidate i strictly above candidate j. Ties count for neither side. The
+    ballots are processed in chunks of chunk_size to bound memory use. Ballots
+    that rank no candidate on the proposal are invalid. The result can be used
+    for both copeland and schulze without touching the ballots again.
+
+    Output: dict {
+        candidates:[hash bytes,...],
+        pairwise:ndarray int64 (candidates x candidates),
+        valid_ballots:int,
+        invalid_ballots:int
+    }
+'''
+def pairwise_matrix (compiled, chunk_size=None):
+    candidates = compiled['candidates']
+    n = len(candidates)
+    counts = compiled['counts']
+    ranks = candidate_ranks(compiled)
+    unranked = compiled['matrix'].shape[1] + 1
+    valid = (ranks < unranked).any(axis=1)
+    pairwise = np.zeros((n, n), dtype=np.int64)
+
+    if chunk_size is None:
+        chunk_size = max(1, 2**24 // max(1, n * n))
+
+    for start in range(0, len(ranks), chunk_size):
+        chunk = ranks[start:start+chunk_size]
+        weights = counts[start:start+chunk_size] * valid[start:start+chunk_size]
+        beats = chunk[:, :, None] < chunk[:, None, :]
+        pairwise += np.einsum('k,kij->ij', weights, beats.astype(np.int64))
+
+    return {
+        'candidates': candidates,
+        'pairwise': pairwise,
+        'valid_ballots': int(counts[valid].sum()),
+        'invalid_ballots': int(counts[~valid].sum())
+    }
+
+'''
+    Arguments: candidates [hash bytes,...], scores ndarray, tie_breakers ndarray
+
+    Output: (OrderedDict {candidate_hash:score int}, winners [hash bytes,...], ties int)
+'''
+def _rank_by_score (candidates, scores, tie_breakers):
+    tally = sort_candidates({candidates[i]: int(scores[i]) for i in range(0, len(candidates))})
+    if not len(candidates):
+        return tally, [], 0
+
+    best = max((int(scores[i]), int(tie_breakers[i])) for i in range(0, len(candidates)))
+    winners = [candidates[i] for i in range(0, len(candidates)) if (int(scores[i]), int(tie_breakers[i])) == best]
+    return tally, winners, len(winners) - 1
+
+'''
+    Arguments: pairwise dict (see pairwise_matrix), quorum_requirement int
+
+    Copeland's pairwise aggregation. Each candidate scores 2 points for every
+    pairwise win and 1 point for every pairwise tie (i.e. half points doubled to
+    stay integral). Ties on score are broken with the second-order Copeland
+    score: the sum of the scores of every candidate the candidate beats. Any
+    candidates still tied are all returned as winners.
+
+    Output: dict {
+        tally:OrderedDict {candidate_hash:score int},
+        second_order:OrderedDict {candidate_hash:score int},
+        winners:[winner_hash bytes,...],
+        ties:int,
+        invalid_ballots:int,
+        valid_ballots:int,
+        meets_quorum:bool
+    }
+'''
+def copeland (pairwise, quorum_requirement):
+    candidates = pairwise['candidates']
+    d = pairwise['pairwise']
+    wins = d > d.T
+    ties = (d == d.T) & ~np.eye(len(candidates), dtype=bool)
+    scores = 2 * wins.sum(axis=1) + ties.sum(axis=1)
+    second_order = wins.astype(np.int64) @ scores
+
+    tally, winners, n_ties = _rank_by_score(candidates, scores, second_order)
+
+    return {
+        'tally': tally,
+        'second_order': sort_candidates({candidates[i]: int(second_order[i]) for i in range(0, len(candidates))}),
+        'winners': winners,
+        'ties': n_ties,
+        'invalid_ballots': pairwise['invalid_ballots'],
+        'valid_ballots': pairwise['valid_ballots'],
+        'meets_quorum': pairwise['valid_ballots'] >= quorum_requirement
+    }
+
+'''
+    Argument: d ndarray (candidates x candidates) of pairwise preferences
+
+    Computes the strength of the strongest path between every pair of candidates
+    with a Floyd-Warshall style widest-path search. Each step relaxes all pairs
+    through one intermediate candidate at once.
+
+    Output: ndarray int64 (candidates x candidates)
+'''
+def strongest_paths (d):
+    p = np.where(d > d.T, d, 0)
+    np.fill_diagonal(p, 0)
+    for k in range(0, len(p)):
+        through_k = np.minimum(p[:, k:k+1], p[k:k+1, :])
+        np.maximum(p, through_k, out=p)
+        np.fill_diagonal(p, 0)
+    return p
+
+'''
+    Arguments: pairwise dict (see pairwise_matrix), quorum_requirement int
+
+    Schulze (beatpath) method. A candidate is a winner if the strongest path
+    from them to every other candidate is at least as strong as the strongest
+    path back. The tally counts how many candidates each one beats by strongest
+    path, which orders the full Schulze ranking.
+
+    Output: dict {
+        tally:OrderedDict {candidate_hash:beatpath_wins int},
+        strongest_paths:ndarray int64 (candidates x candidates),
+        winners:[winner_hash bytes,...],
+        ties:int,
+        invalid_ballots:int,
+        valid_ballots:int,
+        meets_quorum:bool
+    }
+'''
+def schulze (pairwise, quorum_requirement):
+    candidates = pairwise['candidates']
+    p = strongest_paths(pairwise['pairwise'])
+    beatpath_wins = (p > p.T).sum(axis=1)
+    unbeaten = (p >= p.T).all(axis=1)
+
+    tally = sort_candidates({candidates[i]: int(beatpath_wins[i]) for i in range(0, len(candidates))})
+    winners = [candidates[i] for i in range(0, len(candidates)) if unbeaten[i]]
+
+    return {
+        'tally': tally,
+        'strongest_paths': p,
+        'winners': winners,
+        'ties': max(0, len(winners) - 1),
+        'invalid_ballots': pairwise['invalid_ballots'],
+        'valid_ballots': pairwise['valid_ballots'],
+        'meets_quorum': pairwise['valid_ballots'] >= quorum_requirement
+    }
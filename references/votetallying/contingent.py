@@ -0,0 +1,97 @@
+import math
+import numpy as np
+from ballotmatrix import compile_ranked_ballots
+from condorcet import candidate_ranks
+from tally import sort_candidates
+
+'''
+    Arguments: members ndarray bool (ballots x candidates), counts ndarray int64
+
+    Counts votes split evenly between the members marked on each ballot, in
+    units of the least common multiple of the number of members.
+
+    Output: (votes ndarray int64 (candidates), denominator int)
+'''
+def _split_votes (members, counts):
+    sizes = members.sum(axis=1)
+    denominator = math.lcm(1, *(int(k) for k in np.unique(sizes[sizes > 0])))
+    shares = np.zeros(len(sizes), dtype=np.int64)
+    shares[sizes > 0] = denominator // sizes[sizes > 0]
+    return (counts * shares) @ members.astype(np.int64), denominator
+
+'''
+    Arguments: compiled dict (see ballotmatrix.compile_ranked_ballots), quorum_requirement int
+
+    Contingent vote (top-two instant run-off). Both rounds are read off the
+    same candidate ranks (see condorcet.candidate_ranks), so no IRV rounds are
+    run. If no candidate has a majority of the first preferences, every
+    candidate but the top two is eliminated at once and each ballot goes to
+    whichever finalist it ranks higher. Ballots ranking neither finalist are
+    exhausted. As in tally.irv, tied ranks split the vote exactly (see
+    tally.common_denominator), and a ballot is invalid once its highest
+    remaining rank holds a candidate not on the proposal. A tie for second
+    place goes to the earlier candidate; a tied run-off has no winner.
+
+    Output: same as tally.irv
+'''
+def contingent_compiled (compiled, quorum_requirement):
+    candidates = compiled['candidates']
+    counts = compiled['counts']
+    n_candidates = len(candidates)
+    ranks = candidate_ranks(compiled, keep_unknown=True)
+    unranked = compiled['matrix'].shape[1] + 1
+    total_ballots = int(counts.sum())
+    winner = 'b\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'
+
+    # first preferences
+    best = ranks.min(axis=1)
+    valid = (best < unranked) & (ranks[:, n_candidates] > best)
+    first = (ranks[:, :n_candidates] == best[:, None]) & valid[:, None]
+    votes, denominator = _split_votes(first, counts)
+    round_tally = sort_candidates({candidates[i]: int(votes[i]) for i in range(0, n_candidates)})
+    tally, denominators, eliminated = [round_tally], [denominator], []
+    invalid_ballots = int(counts[~valid].sum())
+    exhausted_ballots = 0
+
+    leader = next(iter(round_tally), None)
+    if leader is not None and round_tally[leader] > sum(round_tally.values()) // 2:
+        winner = leader
+    elif n_candidates > 1:
+        # head-to-head between the top two
+        finalists = [candidates.index(c) for c in list(round_tally)[:2]]
+        eliminated.append(list(round_tally)[2:])
+        finalist_ranks = ranks[:, finalists]
+        best = finalist_ranks.min(axis=1)
+        invalid = valid & (ranks[:, n_candidates] <= best) & (ranks[:, n_candidates] < unranked)
+        exhausted = valid & ~invalid & (best == unranked)
+        counted = valid & ~exhausted & ~invalid
+        invalid_ballots += int(counts[invalid].sum())
+        exhausted_ballots = int(counts[exhausted].sum())
+
+        members = (finalist_ranks == best[:, None]) & counted[:, None]
+        votes, denominator = _split_votes(members, counts)
+        round_tally = sort_candidates({candidates[finalists[i]]: int(votes[i]) for i in range(0, 2)})
+        tally.append(round_tally)
+        denominators.append(denominator)
+
+        if votes[0] != votes[1]:
+            winner = next(iter(round_tally))
+
+    # final tabulations
+    valid_ballots = total_ballots - invalid_ballots
+    meets_quorum = valid_ballots - exhausted_ballots > quorum_requirement
+
+    return {'tally': tally, 'denominators': denominators, 'eliminated': eliminated, 'winner': winner, 'invalid_ballots': invalid_ballots, 'valid_ballots': valid_ballots, 'exhausted_ballots': exhausted_ballots, 'meets_quorum': meets_quorum}
+
+'''
+    Arguments:  candidates [hash bytes, ...],
+                ballots [[hash bytes, ...], ...],
+                quorum_requirement int,
+                weighted bool
+
+    Compiles the ballots and runs contingent_compiled.
+
+    Output: same as tally.irv
+'''
+def contingent (candidates, ballots, quorum_requirement, weighted=False):
+    return contingent_compiled(compile_ranked_ballots(candidates, ballots, weighted), quorum_requirement)
@@ -0,0 +1,173 @@
+import json
+import sys
+import time
+import tracemalloc
+
+'''
+    Per-round instrumentation for the tally engines. tally.plurality,
+    tally.irv, tally.irv_coombs and tally.stv take an optional observer, a
+    function called with one event dict per round:
+
+        {
+            method:str,
+            round:int,
+            seconds:float; wall time of the round,
+            ballots_touched:int,
+            ballots_transferred:int,
+            exhausted_ballots:int; so far,
+            allocated_blocks:int; change in sys.getallocatedblocks(),
+            allocated_bytes:int or None; change in memory traced by
+                tracemalloc, None when it is not tracing
+        }
+
+    ballots_touched and ballots_transferred count ballot entries (a weighted
+    ballot or an STV parcel is one entry), since they measure work:
+    ballots_touched are the entries the round reads, ballots_transferred the
+    entries that move to another candidate at the end of the round. Without
+    an observer the engines skip all of this, so it costs nothing.
+
+    log_sink and new_aggregator/aggregator_observer are two observers to
+    start from; fan_out sends the events to several observers.
+'''
+
+'''
+    Output: tuple (seconds float, blocks int, traced_bytes int or None); the
+            state a round starts from
+'''
+def start_round ():
+    return (time.perf_counter(), sys.getallocatedblocks(), tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None)
+
+'''
+    Arguments:  observer function, method str, round int,
+                started tuple (see start_round), ballots_touched int,
+                ballots_transferred int, exhausted_ballots int
+
+    Sends the event of a finished round to the observer.
+
+    Output: tuple (see start_round); the start of the next round, taken after
+            the observer returns so its own time is not counted
+'''
+def end_round (observer, method, round, started, ballots_touched, ballots_transferred, exhausted_ballots):
+    seconds = time.perf_counter() - started[0]
+    blocks = sys.getallocatedblocks() - started[1]
+    traced_bytes = None
+    if started[2] is not None and tracemalloc.is_tracing():
+        traced_bytes = tracemalloc.get_traced_memory()[0] - started[2]
+
+    observer({
+        'method': method,
+        'round': round,
+        'seconds': seconds,
+        'ballots_touched': ballots_touched,
+        'ballots_transferred': ballots_transferred,
+        'exhausted_ballots': exhausted_ballots,
+        'allocated_blocks': blocks,
+        'allocated_bytes': traced_bytes
+    })
+    return start_round()
+
+'''
+    Arguments: ballots [(ballot, count),...], positions (int,...), leaving set
+
+    Output: int; the ballots with a candidate in leaving at any of the rank
+            positions (e.g. 0 and -1 for the first and last rank)
+'''
+def count_moved (ballots, positions, leaving):
+    moved = 0
+    for b, count in ballots:
+        for p in positions:
+            rank = b[p]
+            if (type(rank) is list and [c for c in rank if c in leaving]) or (type(rank) is not list and rank in leaving):
+                moved += 1
+                break
+    return moved
+
+'''
+    Arguments: ballots iterable, counter list [int]
+
+    Yields every entry of ballots unchanged and adds 1 to counter[0] for each,
+    so the entries of a generator are counted in the one pass the engine makes
+    over them.
+
+    Output: generator
+'''
+def count_entries (ballots, counter):
+    for b in ballots:
+        counter[0] += 1
+        yield b
+
+'''
+    Arguments: stream file, fields dict
+
+    Structured-log sink: writes every event as one line of JSON to stream,
+    with fields (e.g. a proposal hash) added to each line.
+
+    Output: observer function
+'''
+def log_sink (stream=sys.stderr, fields=None):
+    fields = dict(fields or {})
+    def observe (event):
+        stream.write(json.dumps(dict(fields, **event)) + '\n')
+    return observe
+
+'''
+    Output: dict {
+        events:[dict,...],
+        methods:dict {method str:dict {
+            tallies:int,
+            rounds:int,
+            seconds:float,
+            ballots_touched:int,
+            ballots_transferred:int,
+            allocated_blocks:int,
+            slowest_round:dict; the event of the slowest round
+        }}
+    }
+'''
+def new_aggregator ():
+    return {'events': [], 'methods': {}}
+
+'''
+    Arguments: aggregator dict (see new_aggregator), keep_events bool
+
+    In-memory aggregator: the observer adds every event to the totals of its
+    method and, if keep_events is True, keeps the event itself. A tally is
+    counted whenever a round 0 arrives.
+
+    Output: observer function
+'''
+def aggregator_observer (aggregator, keep_events=True):
+    def observe (event):
+        if keep_events:
+            aggregator['events'].append(event)
+
+        totals = aggregator['methods'].setdefault(event['method'], {
+            'tallies': 0,
+            'rounds': 0,
+            'seconds': 0.0,
+            'ballots_touched': 0,
+            'ballots_transferred': 0,
+            'allocated_blocks': 0,
+            'slowest_round': None
+        })
+        if event['round'] == 0:
+            totals['tallies'] += 1
+        totals['rounds'] += 1
+        totals['seconds'] += event['seconds']
+        totals['ballots_touched'] += event['ballots_touched']
+        totals['ballots_transferred'] += event['ballots_transferred']
+        totals['allocated_blocks'] += event['allocated_blocks']
+        if totals['slowest_round'] is None or event['seconds'] > totals['slowest_round']['seconds']:
+            totals['slowest_round'] = event
+    return observe
+
+'''
+    Arguments: observers function,...
+
+    Output: observer function; passes every event to each of the observers
+'''
+def fan_out (*observers):
+    def observe (event):
+        for o in observers:
+            o(event)
+    return observe
@@ -0,0 +1,282 @@
+import numpy as np
+import tally
+from approval import compile_approval_ballots, count_bits
+from scored import compile_score_ballots, count_scores, merge_scores, score, star
+
+'''
+    A live tally keeps the counts of one proposal up to date while ballot
+    blocks arrive before end_time, so a provisional result can be read at any
+    time without counting every ballot again. Ballots are added and retracted
+    one at a time (or count identical ballots at a time); a retraction is
+    counted as adding the ballot with a negative count, so both go through
+    the same validity checks as the full tallies. Identical ballots are kept
+    once with their count, which also lets a retraction be checked against
+    the ballots actually added.
+
+    For IRV every round of the last provisional result is kept as piles (see
+    tally.new_piles) of the unique ballots. A ballot change updates the piles
+    of every kept round; reading the result replays the eliminations and only
+    rebuilds the rounds after the first one whose elimination changed, each
+    from the round before it by moving the ballots on the eliminated piles.
+'''
+
+'''
+    Arguments:  election_method str, candidates [hash bytes,...],
+                number_of_winners int, max_score int
+
+    Starts an empty live tally for PLURALITY, APPROVAL, SCORE, STAR or IRV.
+
+    Output: dict {
+        election_method:str,
+        candidates:[hash bytes,...],
+        number_of_winners:int,
+        max_score:int,
+        ids:dict {ballot key:id int},
+        ballots:list [ballot,...],
+        groups:list [[(hash bytes,...),...],...]; the rank groups of IRV ballots,
+        counts:list [int,...],
+        total_ballots:int,
+        tally:dict; the running counts (PLURALITY, APPROVAL, SCORE and STAR),
+        rounds:list [dict,...]; the kept rounds (IRV)
+    }
+'''
+def new_live_tally (election_method, candidates, number_of_winners=1, max_score=5):
+    candidates = list(candidates)
+    live = {
+        'election_method': election_method,
+        'candidates': candidates,
+        'number_of_winners': number_of_winners,
+        'max_score': max_score,
+        'ids': {},
+        'ballots': [],
+        'groups': [],
+        'counts': [],
+        'total_ballots': 0,
+        'tally': None,
+        'rounds': []
+    }
+
+    if election_method == 'PLURALITY':
+        live['tally'] = tally.count_plurality(number_of_winners, candidates, [])
+    elif election_method == 'APPROVAL':
+        live['tally'] = {'candidates': candidates, 'totals': np.zeros(len(candidates), dtype=np.int64), 'valid_ballots': 0, 'invalid_ballots': 0}
+    elif election_method in ('SCORE', 'STAR'):
+        live['tally'] = count_scores(compile_score_ballots(candidates, [], max_score))
+    elif election_method == 'IRV':
+        live['rounds'].append(new_round(candidates, set()))
+    else:
+        raise ValueError('Unknown live election method ' + str(election_method) + '.')
+
+    return live
+
+'''
+    Arguments: candidates [hash bytes,...], eliminated set
+
+    Output: dict {
+        eliminated:set; the candidates eliminated before the round,
+        live:set; the other candidates,
+        piles:dict (see tally.new_piles),
+        invalid_ballots:int,
+        exhausted_ballots:int
+    }
+'''
+def new_round (candidates, eliminated):
+    return {'eliminated': eliminated, 'live': set(candidates) - eliminated, 'piles': tally.new_piles(candidates), 'invalid_ballots': 0, 'exhausted_ballots': 0}
+
+'''
+    Arguments: live dict (see new_live_tally), round dict (see new_round), b int
+
+    Finds where unique ballot b counts in the round, as in tally.irv_piles.
+
+    Output: live group (hash bytes,...), or 'invalid' or 'exhausted'
+'''
+def ballot_place (live, round, b):
+    groups = live['groups'][b]
+    if len(groups) < 1:
+        return 'invalid'
+
+    piles = round['piles']
+    group = tally._next_live_group(groups, 0, 1, round['live'], piles)[1]
+    if not group:
+        return 'exhausted'
+    if [c for c in group if c not in piles['ballots']]:
+        return 'invalid'
+    return group
+
+'''
+    Arguments: live dict (see new_live_tally), round dict (see new_round), b int, count int
+
+    Counts count more copies of unique ballot b in the round; a negative count
+    takes copies away. The ballot leaves its piles when no copies are left.
+'''
+def count_in_round (live, round, b, count):
+    place = ballot_place(live, round, b)
+    if place == 'invalid' or place == 'exhausted':
+        round[place + '_ballots'] += count
+    elif live['counts'][b] == 0:
+        tally.unpile_ballot(round['piles'], b, place, -count)
+    else:
+        tally.pile_ballot(round['piles'], b, place, count)
+
+'''
+    Arguments: live dict (see new_live_tally), ballot, count int
+
+    Adds count identical ballots to the live tally. The ballot has the same
+    form as for the full tally of the election method.
+'''
+def add_ballot (live, ballot, count=1):
+    key = tally.ballot_key(ballot)
+    if key not in live['ids']:
+        if count < 0:
+            raise ValueError('Cannot retract a ballot that was not added.')
+        live['ids'][key] = len(live['ballots'])
+        live['ballots'].append(ballot)
+        live['groups'].append(tally.compile_rank_groups([ballot])[0] if live['election_method'] == 'IRV' else None)
+        live['counts'].append(0)
+
+    b = live['ids'][key]
+    if live['counts'][b] + count < 0:
+        raise ValueError('Cannot retract more ballots than were added.')
+    live['counts'][b] += count
+    live['total_ballots'] += count
+
+    method = live['election_method']
+    if method == 'PLURALITY':
+        counts = tally.count_plurality(live['number_of_winners'], live['candidates'], [(ballot, count)], weighted=True)
+        for c in counts['tally']:
+            live['tally']['tally'][c] += counts['tally'][c]
+        for k in ('invalid_ballots', 'invalid_votes', 'valid_ballots', 'valid_votes'):
+            live['tally'][k] += counts[k]
+    elif method == 'APPROVAL':
+        compiled = compile_approval_ballots(live['candidates'], [(ballot, count)], weighted=True)
+        live['tally']['totals'] += count_bits(compiled['approve'], compiled['counts'], len(live['candidates']))
+        live['tally']['valid_ballots'] += int(compiled['counts'].sum())
+        live['tally']['invalid_ballots'] += compiled['invalid_ballots']
+    elif method in ('SCORE', 'STAR'):
+        merge_scores(live['tally'], count_scores(compile_score_ballots(live['candidates'], [(ballot, count)], live['max_score'], weighted=True)))
+    else:
+        for round in live['rounds']:
+            count_in_round(live, round, b, count)
+
+'''
+    Arguments: live dict (see new_live_tally), ballot, count int
+
+    Takes count identical ballots that were added before back out of the live
+    tally, e.g. when a ballot block is replaced.
+'''
+def retract_ballot (live, ballot, count=1):
+    add_ballot(live, ballot, -count)
+
+'''
+    Arguments: live dict (see new_live_tally), round dict (see new_round), eliminated [hash bytes,...]
+
+    Builds the next round from the given one: the piles are copied and only
+    the ballots on the piles of the eliminated candidates are moved on.
+
+    Output: dict (see new_round)
+'''
+def next_round (live, round, eliminated):
+    piles = round['piles']
+    following = new_round(live['candidates'], round['eliminated'] | set(eliminated))
+    following['piles'] = {
+        'ballots': {c: dict(piles['ballots'][c]) for c in piles['ballots']},
+        'whole': dict(piles['whole']),
+        'fractions': {c: dict(piles['fractions'][c]) for c in piles['fractions']}
+    }
+    following['invalid_ballots'] = round['invalid_ballots']
+    following['exhausted_ballots'] = round['exhausted_ballots']
+
+    # transfer only the ballots on the eliminated candidates' piles
+    transfers = {}
+    for c in eliminated:
+        transfers.update(piles['ballots'][c])
+    for b in transfers:
+        tally.unpile_ballot(following['piles'], b, ballot_place(live, round, b), live['counts'][b])
+        place = ballot_place(live, following, b)
+        if place == 'invalid' or place == 'exhausted':
+            following[place + '_ballots'] += live['counts'][b]
+        else:
+            tally.pile_ballot(following['piles'], b, place, live['counts'][b])
+
+    return following
+
+'''
+    Arguments: live dict (see new_live_tally), quorum_requirement int
+
+    Replays the IRV eliminations over the kept rounds. Rounds are only
+    rebuilt after the first round whose elimination differs from the last
+    time the result was read.
+
+    Output: same as tally.irv
+'''
+def live_irv (live, quorum_requirement):
+    rounds = live['rounds']
+    candidates = live['candidates']
+    results, denominators, eliminated = [], [], []
+    winner = 'b\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'
+    r = 0
+
+    while True:
+        round = rounds[r]
+        remaining = [c for c in candidates if c not in round['eliminated']]
+        round_tally, denominator = tally.pile_votes(round['piles'], remaining)
+        round_tally = tally.sort_candidates(round_tally)
+        results.append(round_tally)
+        denominators.append(denominator)
+
+        # see if someone has a majority of highest-preference votes
+        total_votes = sum(round_tally.values())
+        leader = next(iter(round_tally), None)
+        if leader is not None and round_tally[leader] > total_votes // 2:
+            winner = leader
+            break
+
+        # eliminate the candidates with the fewest votes
+        fewest = min(round_tally.values()) if round_tally else 0
+        round_eliminated = [c for c in round_tally if round_tally[c] == fewest]
+        eliminated.append(round_eliminated)
+        if len(round_eliminated) == len(remaining):
+            break
+
+        # keep the next round only if it followed the same elimination
+        if r + 1 < len(rounds) and rounds[r + 1]['eliminated'] != round['eliminated'] | set(round_eliminated):
+            del rounds[r + 1:]
+        if r + 1 == len(rounds):
+            rounds.append(next_round(live, round, round_eliminated))
+        r += 1
+
+    # rounds after the last one are out of date
+    del rounds[r + 1:]
+
+    invalid_ballots = rounds[r]['invalid_ballots']
+    exhausted_ballots = rounds[r]['exhausted_ballots']
+    valid_ballots = live['total_ballots'] - invalid_ballots
+
+    return {
+        'tally': results,
+        'denominators': denominators,
+        'eliminated': eliminated,
+        'winner': winner,
+        'invalid_ballots': invalid_ballots,
+        'valid_ballots': valid_ballots,
+        'exhausted_ballots': exhausted_ballots,
+        'meets_quorum': valid_ballots - exhausted_ballots > quorum_requirement
+    }
+
+'''
+    Arguments: live dict (see new_live_tally), quorum_requirement int
+
+    The provisional result of the ballots added so far.
+
+    Output: same as tally.plurality, approval.approval, scored.score,
+            scored.star or tally.irv
+'''
+def live_result (live, quorum_requirement):
+    method = live['election_method']
+    if method == 'PLURALITY':
+        return tally.rank_plurality(live['number_of_winners'], live['tally'], quorum_requirement)
+    if method == 'APPROVAL' or method == 'SCORE':
+        return score(live['number_of_winners'], live['tally'], quorum_requirement)
+    if method == 'STAR':
+        return star(live['tally'], quorum_requirement)
+    return live_irv(live, quorum_requirement)
@@ -3,6 +3,7 @@ from nacl.encoding import RawEncoder
 from nacl.hash import sha256
 import tally
 import blockformat
+import candidateregistry
 import os.path
 import sys
 # add lib folder
@@ -119,8 +120,10 @@ def test_plurality ():
         print('packed plurality ballot: ', tohex(bb))
         print('unpacked plurality ballot: ', ballot)
 
-    # tally plurality-at-large
-    plurality_result = tally.plurality(number_of_winners, candidate_hashes, mntv_ballots, quorum_requirement)
+    # tally plurality-at-large on interned candidate ids, then map back to hashes
+    registry = proposal['registry']
+    plurality_result = tally.plurality(number_of_winners, candidateregistry.candidate_ids(registry), candidateregistry.intern_ballots(registry, mntv_ballots), quorum_requirement)
+    plurality_result = candidateregistry.resolve_result(registry, plurality_result)
 
     if print_all or print_tally:
         print('candidates:')
@@ -194,8 +197,10 @@ def test_irv ():
         print('packed IRV ballot', tohex(ib))
         print('unpacked IRV ballot', ballot)
 
-    # tally IRV
-    irv_result = tally.irv(candidate_hashes, ranked_ballots, quorum_requirement)
+    # tally IRV on interned candidate ids, then map back to hashes
+    registry = proposal['registry']
+    irv_result = tally.irv(candidateregistry.candidate_ids(registry), candidateregistry.intern_ballots(registry, ranked_ballots), quorum_requirement)
+    irv_result = candidateregistry.resolve_result(registry, irv_result)
 
     if print_all or print_tally:
         print('candidates:')
@@ -259,8 +264,10 @@ def test_irv_coombs ():
         print('packed IRV ballot', tohex(ib))
         print('unpacked IRV ballot', ballot)
 
-    # tally IRV
-    irv_coombs_result = tally.irv_coombs(candidate_hashes, ranked_ballots, quorum_requirement)
+    # tally IRV on interned candidate ids, then map back to hashes
+    registry = proposal['registry']
+    irv_coombs_result = tally.irv_coombs(candidateregistry.candidate_ids(registry), candidateregistry.intern_ballots(registry, ranked_ballots), quorum_requirement)
+    irv_coombs_result = candidateregistry.resolve_result(registry, irv_coombs_result)
 
     if print_all or print_tally:
         print('candidates:')
@@ -0,0 +1,195 @@
+from collections import OrderedDict
+import time
+import numpy as np
+from ballotmatrix import compile_ranked_ballots, rank_groups
+from tally import compress_ballots, sort_candidates
+
+'''
+    Arguments: compiled dict (see ballotmatrix.compile_ranked_ballots), keep ndarray float64 (candidates + 1), rows ndarray
+
+    One vectorized Meek distribution over the given ballots. Walking down each
+    ballot, every candidate keeps their keep factor of the weight that reaches
+    them and passes the rest on; tied candidates share the weight reaching
+    their group evenly. All ballots advance one rank group per step, and a
+    ballot drops out as soon as nothing is passed on (i.e. it reached a
+    hopeful candidate) or it runs out of ranks, so most ballots are done after
+    their first few preferences.
+
+    Output: (votes ndarray float64 (candidates + 1), excess float)
+'''
+def distribute (compiled, keep, rows):
+    matrix, group_ends, lengths = compiled['matrix'], compiled['group_ends'], compiled['lengths']
+    unknown = len(keep) - 1
+    cols = np.arange(matrix.shape[1])
+    weight = compiled['counts'][rows].astype(np.float64)
+    total = float(weight.sum())
+    pointer = np.zeros(len(rows), dtype=np.int16)
+    votes = np.zeros(len(keep))
+
+    while len(rows):
+        current = matrix[rows, pointer]
+        ends = group_ends[rows, pointer]
+        tied = ends - pointer > 1
+        passed = np.empty(len(rows))
+
+        # single candidates keep their factor of the weight
+        single = ~tied
+        kept = keep[current[single]]
+        votes += np.bincount(current[single], weights=weight[single] * kept, minlength=len(keep))
+        passed[single] = 1 - kept
+
+        # tied candidates share the weight reaching their group
+        if tied.any():
+            members = matrix[rows[tied]]
+            in_group = (cols >= pointer[tied, None]) & (cols < ends[tied, None])
+            shares = np.where(in_group, keep[np.where(in_group, members, unknown)], 0) / (ends[tied] - pointer[tied])[:, None]
+            votes += np.bincount(members[in_group], weights=(weight[tied, None] * shares)[in_group], minlength=len(keep))
+            passed[tied] = 1 - shares.sum(axis=1)
+
+        # move on to the next rank group while any weight is left
+        weight *= passed
+        pointer = ends
+        going = (weight > 0) & (pointer < lengths[rows])
+        rows, weight, pointer = rows[going], weight[going], pointer[going]
+
+    return votes, total - float(votes[:-1].sum())
+
+'''
+    Arguments:  compiled dict (see ballotmatrix.compile_ranked_ballots),
+                seats_available int,
+                quorum_requirement int,
+                tolerance float,
+                max_iterations int
+
+    Meek single transferable vote over compiled ballots, so each iteration is
+    a few vectorized passes over the ballot matrix; compiling identical
+    ballots only once (see tally.compress_ballots) keeps the matrix small.
+    Every candidate has a keep factor: 1 while hopeful, 0 once excluded, and
+    for elected candidates the share of each vote reaching them that they
+    keep. The quota is (votes - excess) / (seats_available + 1) and is
+    recomputed after every distribution. The keep factors of elected
+    candidates are scaled by quota / votes until the total surplus is at most
+    tolerance votes; then all hopeful candidates at or above the quota are
+    elected or, if there are none, the hopeful candidate with the fewest votes
+    is excluded (candidates within tolerance of the fewest count as tied, and
+    ties go against the later candidate). As in tally.stv, ballots that are
+    empty or whose first preference is not on the proposal are invalid and
+    later preferences not on the proposal are skipped. seconds is the time
+    spent counting.
+
+    The count stops after max_iterations distributions. If that happens before
+    the keep factors settled or before every seat was filled, converged is
+    False and winners only holds the candidates elected up to then.
+
+    Output: dict {
+        tally:list [OrderedDict {candidate_hash:votes float}, ...],
+        winners:[winner_hash bytes,...],
+        quota:list [float, ...],
+        keep_factors:OrderedDict {candidate_hash:keep_factor float},
+        iterations:int,
+        converged:bool,
+        seconds:float,
+        invalid_ballots:int,
+        valid_ballots:int,
+        excess:float,
+        meets_quorum:bool
+    }
+'''
+def meek_compiled (compiled, seats_available, quorum_requirement, tolerance=1e-6, max_iterations=1000):
+    started = time.perf_counter()
+    candidates = compiled['candidates']
+    n_candidates = len(candidates)
+    counts = compiled['counts']
+
+    # invalid ballots are empty or have a first preference not on the proposal
+    group_numbers = rank_groups(compiled)[1]
+    first_unknown = ((compiled['matrix'] == n_candidates) & (group_numbers == 0)).any(axis=1)
+    valid = (compiled['lengths'] > 0) & ~first_unknown
+    rows = np.flatnonzero(valid)
+
+    # the extra slot stands for candidates not on the proposal; it keeps nothing
+    keep = np.ones(n_candidates + 1)
+    keep[n_candidates] = 0
+    hopeful = list(range(0, n_candidates))
+    elected = []
+    tally, quotas = [], []
+    iterations = 0
+    excess = 0.0
+    converged = True
+
+    while len(elected) < seats_available and hopeful:
+        # elect everyone left if they exactly fill the remaining seats
+        if len(hopeful) + len(elected) <= seats_available:
+            votes, excess = distribute(compiled, keep, rows)
+            iterations += 1
+            elected += sorted(hopeful, key=lambda c: -votes[c])
+            hopeful = []
+            break
+
+        # iterate the keep factors of the elected candidates to convergence
+        while True:
+            votes, excess = distribute(compiled, keep, rows)
+            iterations += 1
+            quota = (float(counts[valid].sum()) - excess) / (seats_available + 1)
+            reached = [c for c in hopeful if votes[c] >= quota]
+            surplus = sum(votes[c] - quota for c in elected)
+            if reached or not elected or surplus <= tolerance:
+                break
+            if iterations >= max_iterations:
+                converged = False
+                break
+            for c in elected:
+                keep[c] *= quota / votes[c]
+
+        tally.append(sort_candidates({candidates[c]: float(votes[c]) for c in elected + hopeful}))
+        quotas.append(quota)
+
+        if reached:
+            reached = sorted(reached, key=lambda c: -votes[c])[:seats_available - len(elected)]
+            elected += reached
+            hopeful = [c for c in hopeful if c not in reached]
+        else:
+            # votes within tolerance of the fewest count as tied
+            fewest = min(votes[c] for c in hopeful)
+            lowest = max(c for c in hopeful if votes[c] <= fewest + tolerance)
+            keep[lowest] = 0
+            hopeful.remove(lowest)
+
+        if iterations >= max_iterations:
+            break
+
+    valid_ballots = int(counts[valid].sum())
+    converged = converged and (len(elected) >= seats_available or not hopeful)
+
+    return {
+        'tally': tally,
+        'winners': [candidates[c] for c in elected],
+        'quota': quotas,
+        'keep_factors': OrderedDict((candidates[c], float(keep[c])) for c in range(0, n_candidates)),
+        'iterations': iterations,
+        'converged': converged,
+        'seconds': time.perf_counter() - started,
+        'invalid_ballots': int(counts[~valid].sum()),
+        'valid_ballots': valid_ballots,
+        'excess': excess,
+        'meets_quorum': valid_ballots >= quorum_requirement
+    }
+
+'''
+    Arguments:  candidates [hash bytes, ...],
+                ballots [[hash bytes, ...], ...],
+                seats_available int,
+                quorum_requirement int,
+                tolerance float,
+                max_iterations int,
+                weighted bool
+
+    Merges identical ballots (see tally.compress_ballots), compiles them and
+    runs meek_compiled.
+
+    Output: same as meek_compiled
+'''
+def meek (candidates, ballots, seats_available, quorum_requirement, tolerance=1e-6, max_iterations=1000, weighted=False):
+    if not weighted:
+        ballots = compress_ballots(ballots)
+    return meek_compiled(compile_ranked_ballots(candidates, ballots, weighted=True), seats_available, quorum_requirement, tolerance, max_iterations)
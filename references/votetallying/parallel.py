@@ -0,0 +1,320 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import os
+import tally
+
+'''
+    Arguments: ballots [ballot,...], n_shards int
+
+    Splits ballots into at most n_shards contiguous slices of nearly equal size.
+    Keeping the slices contiguous keeps the merged results in ballot order.
+
+    Output: list [[ballot,...],...]
+'''
+def shard_ballots (ballots, n_shards):
+    n_shards = max(1, min(n_shards, len(ballots)))
+    size, extra = divmod(len(ballots), n_shards)
+    shards, start = [], 0
+    for i in range(0, n_shards):
+        end = start + size + (1 if i < extra else 0)
+        shards.append(ballots[start:end])
+        start = end
+    return shards
+
+'''
+    Arguments: function, shards [[ballot,...],...], args tuple, workers int
+
+    Runs function(shard, *args) for every shard on a process pool and returns
+    the partial results in shard order. A single shard is run in this process.
+
+    Output: list [partial,...]
+'''
+def map_shards (function, shards, args, workers):
+    if len(shards) < 2:
+        return [function(shard, *args) for shard in shards]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(function, shards, *[repeat(a) for a in args]))
+
+'''
+    Arguments: shard [ballot,...], number_of_winners int, candidates [hash bytes,...], weighted bool
+
+    Worker that counts one shard of plurality ballots.
+
+    Output: dict (see tally.count_plurality)
+'''
+def count_plurality_shard (shard, number_of_winners, candidates, weighted):
+    return tally.count_plurality(number_of_winners, candidates, shard, weighted)
+
+'''
+    Argument: partials [dict (see tally.count_plurality),...]
+
+    Adds up partial plurality counts. Candidates keep the order of the first
+    partial so the merged tally ranks exactly like a single-process count.
+
+    Output: dict (see tally.count_plurality)
+'''
+def merge_plurality_counts (partials):
+    merged = {
+        'tally': dict(partials[0]['tally']),
+        'invalid_ballots': 0,
+        'invalid_votes': 0,
+        'valid_ballots': 0,
+        'valid_votes': 0
+    }
+    for p in partials[1:]:
+        for c, votes in p['tally'].items():
+            merged['tally'][c] += votes
+    for p in partials:
+        for k in ('invalid_ballots', 'invalid_votes', 'valid_ballots', 'valid_votes'):
+            merged[k] += p[k]
+    return merged
+
+'''
+    Arguments:  number_of_winners int, candidates [hash bytes,...],
+                ballots [[hash bytes,...],...], quorum_requirement int,
+                workers int, weighted bool
+
+    Map-reduce version of tally.plurality. The ballots are sharded across a
+    process pool; every worker returns a partial count (see
+    tally.count_plurality) which are added together and ranked once. Since all
+    counts are integers, the result is identical to tally.plurality.
+
+    Output: same as tally.plurality
+'''
+def plurality (number_of_winners, candidates, ballots, quorum_requirement, workers=None, weighted=False):
+    workers = workers or os.cpu_count()
+    shards = shard_ballots(ballots, workers)
+    if not shards:
+        return tally.plurality(number_of_winners, candidates, ballots, quorum_requirement, weighted)
+
+    partials = map_shards(count_plurality_shard, shards, (number_of_winners, candidates, weighted), workers)
+    return tally.rank_plurality(number_of_winners, merge_plurality_counts(partials), quorum_requirement)
+
+'''
+    Arguments:  whole dict {candidate_hash:int},
+                fractions dict {candidate_hash:{tie_size:int}},
+                rank hash bytes or [hash bytes,...], count int
+
+    Adds the votes of count ballots whose current rank is rank, recording tied
+    ranks per tie size like the sequential tally.
+'''
+def _count_rank (whole, fractions, rank, count):
+    if type(rank) is list:
+        for c in rank:
+            tally.add_fraction(fractions, c, count, len(rank))
+    else:
+        whole[rank] += count
+
+'''
+    Arguments:  shard [[hash bytes, ...], ...], candidates [hash bytes,...],
+                weighted bool, coombs bool
+
+    Worker for the first round of irv (or irv_coombs if coombs is True). Checks
+    every ballot of the shard the same way the first round of the sequential
+    tally does and counts highest (and for Coombs lowest) preferences. The
+    ballots that remain in the count are returned compressed (see
+    tally.compress_ballots) so later rounds can run on them directly.
+
+    Output: dict {
+        tally:dict {candidate_hash:whole_votes int},
+        fractions:dict {candidate_hash:{tie_size:int}},
+        lowest:dict {candidate_hash:whole_votes int},
+        lowest_fractions:dict {candidate_hash:{tie_size:int}},
+        ballots:[(ballot, count int),...],
+        invalid_ballots:int,
+        exhausted_ballots:int
+    }
+'''
+def count_first_round (shard, candidates, weighted, coombs):
+    known = set(candidates)
+    highest = {c: 0 for c in candidates}
+    lowest = {c: 0 for c in candidates}
+    fractions = {c: {} for c in candidates}
+    lowest_fractions = {c: {} for c in candidates}
+    counted = {}
+    invalid_ballots = 0
+
+    # treat plain ballots as ballots with a count of 1
+    if not weighted:
+        shard = ((b, 1) for b in shard)
+
+    for b, count in shard:
+        if coombs:
+            # Coombs ballots must rank every candidate
+            if sum(len(rank) if type(rank) is list else 1 for rank in b) < len(candidates):
+                invalid_ballots += count
+                continue
+            ends = (b[0], b[-1])
+        else:
+            if len(b) < 1:
+                invalid_ballots += count
+                continue
+            ends = (b[0],)
+
+        # reject ballots whose first or last choices are not on the proposal
+        if [c for rank in ends for c in (rank if type(rank) is list else [rank]) if c not in known]:
+            invalid_ballots += count
+            continue
+
+        for whole, parts, rank in zip((highest, lowest), (fractions, lowest_fractions), ends):
+            _count_rank(whole, parts, rank, count)
+
+        key = tally.ballot_key(b)
+        if key in counted:
+            counted[key][1] += count
+        else:
+            counted[key] = [b, count]
+
+    return {
+        'tally': highest,
+        'fractions': fractions,
+        'lowest': lowest,
+        'lowest_fractions': lowest_fractions,
+        'ballots': [(b, n) for b, n in counted.values()],
+        'invalid_ballots': invalid_ballots,
+        'exhausted_ballots': 0
+    }
+
+'''
+    Argument: partials [dict (see count_first_round),...]
+
+    Adds up partial first-round counts and merges the compressed ballots of all
+    shards, keeping the order in which they first appeared.
+
+    Output: dict (see count_first_round)
+'''
+def merge_first_rounds (partials):
+    merged = {
+        'tally': dict(partials[0]['tally']),
+        'fractions': {c: dict(f) for c, f in partials[0]['fractions'].items()},
+        'lowest': dict(partials[0]['lowest']),
+        'lowest_fractions': {c: dict(f) for c, f in partials[0]['lowest_fractions'].items()},
+        'ballots': [],
+        'invalid_ballots': 0,
+        'exhausted_ballots': 0
+    }
+    for p in partials[1:]:
+        for c in p['tally']:
+            merged['tally'][c] += p['tally'][c]
+            merged['lowest'][c] += p['lowest'][c]
+            for k, n in p['fractions'][c].items():
+                tally.add_fraction(merged['fractions'], c, n, k)
+            for k, n in p['lowest_fractions'][c].items():
+                tally.add_fraction(merged['lowest_fractions'], c, n, k)
+
+    counted = {}
+    for p in partials:
+        merged['invalid_ballots'] += p['invalid_ballots']
+        merged['exhausted_ballots'] += p['exhausted_ballots']
+        for b, count in p['ballots']:
+            key = tally.ballot_key(b)
+            if key in counted:
+                counted[key][1] += count
+            else:
+                counted[key] = [b, count]
+    merged['ballots'] = [(b, n) for b, n in counted.values()]
+
+    return merged
+
+'''
+    Arguments:  candidates [hash bytes,...], ballots [[hash bytes,...],...],
+                quorum_requirement int, workers int, weighted bool, coombs bool,
+                batch_elimination bool
+
+    Shared driver for irv and irv_coombs. The merged first round is the first
+    round of the result; if it gives no candidate a majority, its candidates
+    are eliminated and its ballots transferred (see tally.transfer_ballots) as
+    in the sequential tally, which then counts only the later rounds. The
+    ballots rejected by the workers are added back into the statistics.
+
+    Output: same as tally.irv or tally.irv_coombs
+'''
+def _first_round_then_sequential (candidates, ballots, quorum_requirement, workers, weighted, coombs, batch_elimination=False):
+    workers = workers or os.cpu_count()
+    total_ballots = sum(count for b, count in ballots) if weighted else len(ballots)
+    shards = shard_ballots(ballots, workers)
+    partials = map_shards(count_first_round, shards, (candidates, weighted, coombs), workers)
+    first_round = merge_first_rounds(partials) if partials else count_first_round([], candidates, weighted, coombs)
+
+    # count exactly in units of the first round's common denominator
+    if coombs:
+        denominator = tally.common_denominator(first_round['fractions'], first_round['lowest_fractions'])
+    else:
+        denominator = tally.common_denominator(first_round['fractions'])
+    round_tally = tally.sort_candidates(tally.scale_votes(first_round['tally'], first_round['fractions'], denominator))
+
+    # see if someone has a majority of highest-preference votes
+    total_votes = 0
+    for k in round_tally:
+        total_votes += round_tally[k]
+    leader = next(iter(round_tally), None)
+
+    if coombs:
+        lowest = tally.sort_candidates(tally.scale_votes(first_round['lowest'], first_round['lowest_fractions'], denominator))
+        first_tally = [round_tally, lowest]
+    else:
+        first_tally = round_tally
+    result = {'tally': [first_tally], 'denominators': [denominator], 'eliminated': [], 'winner': leader, 'invalid_ballots': 0, 'exhausted_ballots': 0}
+
+    if leader is None or round_tally[leader] <= total_votes // 2:
+        # eliminate as the sequential tally would after the merged first round
+        if coombs:
+            round_eliminated = tally.coombs_eliminated(lowest)
+        else:
+            round_eliminated = tally.irv_eliminated(round_tally, batch_elimination)
+        remaining = [c for c in candidates if c not in round_eliminated]
+        result['eliminated'] = [round_eliminated]
+
+        # stop if all candidates eliminated due to tie
+        if len(remaining) == 0:
+            result['winner'] = 'b\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'
+        else:
+            # the sequential tally counts the later rounds on the transferred ballots
+            ballots, exhausted = tally.transfer_ballots(first_round['ballots'], round_eliminated)
+            if coombs:
+                rest = tally.irv_coombs(remaining, ballots, quorum_requirement, weighted=True, checked=True)
+            else:
+                rest = tally.irv(remaining, ballots, quorum_requirement, weighted=True, batch_elimination=batch_elimination)
+            result['tally'] += list(rest['tally'])
+            result['denominators'] += rest['denominators']
+            result['eliminated'] += rest['eliminated']
+            result['winner'] = rest['winner']
+            result['invalid_ballots'] = rest['invalid_ballots']
+            result['exhausted_ballots'] = exhausted + rest['exhausted_ballots']
+
+    result['invalid_ballots'] += first_round['invalid_ballots']
+    result['exhausted_ballots'] += first_round['exhausted_ballots']
+
+    # final tabulations over all ballots
+    result['valid_ballots'] = total_ballots - result['invalid_ballots']
+    result['meets_quorum'] = result['valid_ballots'] - result['exhausted_ballots'] > quorum_requirement
+
+    return {k: result[k] for k in ('tally', 'denominators', 'eliminated', 'winner', 'invalid_ballots', 'valid_ballots', 'exhausted_ballots', 'meets_quorum')}
+
+'''
+    Arguments:  candidates [hash bytes,...], ballots [[hash bytes,...],...],
+                quorum_requirement int, workers int, weighted bool,
+                batch_elimination bool
+
+    Map-reduce version of tally.irv. The first round, which checks and counts
+    every ballot, is sharded across a process pool; later rounds run on the
+    merged, compressed ballots. Since tied ranks are counted exactly (see
+    tally.common_denominator), the result is identical to tally.irv, with or
+    without batch_elimination.
+
+    Output: same as tally.irv
+'''
+def irv (candidates, ballots, quorum_requirement, workers=None, weighted=False, batch_elimination=False):
+    return _first_round_then_sequential(candidates, ballots, quorum_requirement, workers, weighted, False, batch_elimination)
+
+'''
+    Arguments:  candidates [hash bytes,...], ballots [[hash bytes,...],...],
+                quorum_requirement int, workers int, weighted bool
+
+    Map-reduce version of tally.irv_coombs; see irv.
+
+    Output: same as tally.irv_coombs
+'''
+def irv_coombs (candidates, ballots, quorum_requirement, workers=None, weighted=False):
+    return _first_round_then_sequential(candidates, ballots, quorum_requirement, workers, weighted, True)
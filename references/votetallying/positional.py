@@ -0,0 +1,193 @@
+import math
+import numpy as np
+from ballotmatrix import compile_ranked_ballots, rank_groups, well_formed
+from tally import sort_candidates
+
+# Dowdall weights 1/k are scaled by lcm(1, ..., 16) so they are exact integers
+# for the first 16 positions; later positions are rounded down.
+DOWDALL_SCALE = 720720
+
+'''
+    Argument: n_candidates int
+
+    Output: list [int,...]; n-1 points for first place down to 0 for last place
+'''
+def borda_weights (n_candidates):
+    return list(range(n_candidates - 1, -1, -1))
+
+'''
+    Arguments: n_positions int, scale int
+
+    Output: list [int,...]; scale/k points for k-th place (see DOWDALL_SCALE)
+'''
+def dowdall_weights (n_positions, scale=DOWDALL_SCALE):
+    return [scale // k for k in range(1, n_positions + 1)]
+
+'''
+    Arguments: compiled dict (see ballotmatrix.compile_ranked_ballots), weights [int,...]
+
+    Scores every ballot of the compiled matrix at once: each position gathers
+    its weight from the weight vector and the points are summed per candidate.
+    Positions past the end of weights score 0, as do candidates left off the
+    ballot. Tied candidates share the average of the weights of the positions
+    they occupy; to keep the scores exact, all points are counted in units of
+    1/denominator, where denominator is the least common multiple of the tie
+    sizes on the ballots (1 without ties). If the scores could overflow int64
+    (a large denominator from many different tie sizes, or very many ballots),
+    they are counted in Python ints instead. Ballots that rank nothing, rank a
+    candidate not on the proposal, or rank a candidate twice are invalid.
+
+    Output: dict {
+        scores:ndarray int64 or object (candidates),
+        denominator:int,
+        invalid_ballots:int,
+        invalid_votes:int,
+        valid_ballots:int,
+        valid_votes:int
+    }
+'''
+def positional_scores (compiled, weights):
+    matrix, group_ends = compiled['matrix'], compiled['group_ends']
+    counts, lengths = compiled['counts'], compiled['lengths']
+    n_candidates = len(compiled['candidates'])
+    width = matrix.shape[1]
+
+    # find the invalid ballots
+    filled = matrix >= 0
+    valid = well_formed(compiled)
+
+    # find where the rank group of every position starts
+    group_starts = rank_groups(compiled)[0]
+
+    # sum the weights of each group with a prefix sum over the weight vector
+    padded = np.zeros(width + 1, dtype=np.int64)
+    n_weights = min(width, len(weights))
+    padded[1:n_weights+1] = np.cumsum(np.array(weights[:n_weights], dtype=np.int64))
+    padded[n_weights+1:] = padded[n_weights]
+
+    cells = filled & valid[:, None]
+    ends = group_ends[cells].astype(np.int64)
+    starts = group_starts[cells]
+    sizes = ends - starts
+    denominator = math.lcm(1, *(int(k) for k in np.unique(sizes)))
+
+    # no score can be more than every valid ballot giving all its points to one candidate
+    dtype = np.int64
+    if denominator * max(1, int(padded[width])) * max(1, int(counts[valid].sum())) > np.iinfo(np.int64).max:
+        dtype = object
+
+    # gather and sum
+    points = (padded[ends] - padded[starts]).astype(dtype) * (denominator // sizes.astype(dtype))
+    points *= np.broadcast_to(counts[:, None], matrix.shape)[cells].astype(dtype)
+    scores = np.zeros(n_candidates, dtype=dtype)
+    np.add.at(scores, matrix[cells], points)
+
+    return {
+        'scores': scores,
+        'denominator': denominator,
+        'invalid_ballots': int(counts[~valid].sum()),
+        'invalid_votes': int((lengths[~valid] * counts[~valid]).sum()),
+        'valid_ballots': int(counts[valid].sum()),
+        'valid_votes': int((lengths[valid] * counts[valid]).sum())
+    }
+
+'''
+    Arguments:  number_of_winners int, compiled dict (see ballotmatrix.compile_ranked_ballots),
+                weights [int,...], quorum_requirement int, scale int
+
+    Positional-scoring tally. The number_of_winners candidates with the most
+    points win; candidates tied with the first loser are dropped from the
+    winners and counted in ties, as in tally.plurality.
+
+    weights are in units of 1/scale points (see DOWDALL_SCALE). The tally is
+    in units of 1/denominator points, reduced to lowest terms, so a candidate
+    has tally[c] / denominator points. blockformat has no tally layout for
+    positional methods: pack_plurality_tally has 2-byte votes and no
+    denominator, so it cannot pack this result.
+
+    Output: dict {
+        tally:OrderedDict {candidate_hash:points int},
+        denominator:int,
+        winners:[winner_hash bytes,...],
+        invalid_ballots:int,
+        invalid_votes:int,
+        valid_ballots:int,
+        valid_votes:int,
+        ties:int,
+        meets_quorum:bool
+    }
+'''
+def positional_compiled (number_of_winners, compiled, weights, quorum_requirement, scale=1):
+    candidates = compiled['candidates']
+    counts = positional_scores(compiled, weights)
+    scores = counts['scores']
+
+    # reduce the scores and the denominator, including the scale of the weights
+    denominator = counts['denominator'] * scale
+    divisor = math.gcd(denominator, *(int(s) for s in scores))
+    scores = scores // divisor
+    denominator //= divisor
+
+    # rank candidates; the stable sort keeps candidates order among equals
+    ranked = np.argsort(-scores, kind='stable')
+    tally = sort_candidates({candidates[i]: int(scores[i]) for i in ranked})
+    winners = [int(i) for i in ranked[:number_of_winners]]
+
+    # handle ties
+    n_ties = 0
+    if len(ranked) > number_of_winners:
+        first_loser = scores[ranked[number_of_winners]]
+        while len(winners) > 0 and scores[winners[-1]] == first_loser:
+            winners = winners[:-1]
+            n_ties += 1
+
+    return {
+        'tally': tally,
+        'denominator': denominator,
+        'winners': [candidates[i] for i in winners],
+        'invalid_ballots': counts['invalid_ballots'],
+        'invalid_votes': counts['invalid_votes'],
+        'valid_ballots': counts['valid_ballots'],
+        'valid_votes': counts['valid_votes'],
+        'ties': n_ties,
+        'meets_quorum': counts['valid_ballots'] >= quorum_requirement
+    }
+
+'''
+    Arguments:  number_of_winners int, candidates [hash bytes,...],
+                ballots [[hash bytes or [hash bytes,...],...],...],
+                weights [int,...], quorum_requirement int, weighted bool, scale int
+
+    Compiles the ballots and runs positional_compiled with any weight vector.
+
+    Output: same as positional_compiled
+'''
+def positional (number_of_winners, candidates, ballots, weights, quorum_requirement, weighted=False, scale=1):
+    return positional_compiled(number_of_winners, compile_ranked_ballots(candidates, ballots, weighted), weights, quorum_requirement, scale)
+
+'''
+    Arguments:  number_of_winners int, candidates [hash bytes,...],
+                ballots [[hash bytes or [hash bytes,...],...],...],
+                quorum_requirement int, weighted bool
+
+    Borda count: n-k points for k-th place out of n candidates.
+
+    Output: same as positional_compiled
+'''
+def borda (number_of_winners, candidates, ballots, quorum_requirement, weighted=False):
+    compiled = compile_ranked_ballots(candidates, ballots, weighted)
+    return positional_compiled(number_of_winners, compiled, borda_weights(len(compiled['candidates'])), quorum_requirement)
+
+'''
+    Arguments:  number_of_winners int, candidates [hash bytes,...],
+                ballots [[hash bytes or [hash bytes,...],...],...],
+                quorum_requirement int, weighted bool
+
+    Dowdall (Nauru) count: 1/k points for k-th place. The weights are scaled
+    by DOWDALL_SCALE, which the denominator of the result includes.
+
+    Output: same as positional_compiled
+'''
+def dowdall (number_of_winners, candidates, ballots, quorum_requirement, weighted=False):
+    compiled = compile_ranked_ballots(candidates, ballots, weighted)
+    return positional_compiled(number_of_winners, compiled, dowdall_weights(len(compiled['candidates'])), quorum_requirement, DOWDALL_SCALE)
@@ -0,0 +1,129 @@
+from collections import OrderedDict
+from collections.abc import Sequence
+import math
+import numpy as np
+
+'''
+    A compact replacement for the list of per-round OrderedDicts the IRV
+    engines return as tally. The candidates are kept once, in a fixed order,
+    and every round as one row of int64 votes in that order, with -1 for
+    candidates that are no longer in the round; irv_coombs rounds are two rows,
+    highest- then lowest-preference votes. Votes too large for int64 (e.g. with
+    a large common denominator) are kept as Python ints instead.
+
+    A RoundHistory is also a read-only sequence of the legacy rounds: indexing
+    it builds the OrderedDict (or the [highest, lowest] pair) of a round on
+    demand, sorted as sort_candidates sorts it, so code written for the list of
+    OrderedDicts keeps working.
+'''
+
+'''
+    Arguments:  candidates [hash bytes,...], denominators [int,...] or None,
+                votes ndarray or None
+
+    candidates must hold every candidate of every round, in the order the
+    engine counts them, so ties sort as they do in the engine. denominators
+    may be the engine's own denominators list, which it keeps appending to.
+'''
+class RoundHistory(Sequence):
+    def __init__ (self, candidates, denominators=None, votes=None):
+        self.candidates = list(candidates)
+        self.denominators = denominators
+        self._rows = [] if votes is None else list(votes)
+        self._votes = votes
+
+    '''
+        Arguments: round OrderedDict {candidate_hash:votes int} or [OrderedDict, OrderedDict]
+
+        Adds the next round, as list.append does for the legacy tally. Only
+        its row of votes is kept.
+    '''
+    def append (self, round):
+        if type(round) is list:
+            row = [self._row(t) for t in round]
+            if [r for r in row if r.dtype == object]:
+                row = [r.astype(object) for r in row]
+            self._rows.append(np.stack(row))
+        else:
+            self._rows.append(self._row(round))
+        self._votes = None
+
+    def _row (self, round_tally):
+        values = [round_tally.get(c, -1) for c in self.candidates]
+        try:
+            return np.array(values, dtype=np.int64)
+        except OverflowError:
+            return np.array(values, dtype=object)
+
+    '''
+        Output: ndarray int64 or object (rounds x candidates, or rounds x 2 x
+                candidates for irv_coombs); -1 for candidates out of the round
+    '''
+    @property
+    def votes (self):
+        if self._votes is None:
+            if not self._rows:
+                return np.zeros((0, len(self.candidates)), dtype=np.int64)
+            if [r for r in self._rows if r.dtype == object]:
+                self._votes = np.stack([r.astype(object) for r in self._rows])
+            else:
+                self._votes = np.stack(self._rows)
+        return self._votes
+
+    def __len__ (self):
+        return len(self._rows)
+
+    def __getitem__ (self, r):
+        if type(r) is slice:
+            return [self[i] for i in range(*r.indices(len(self)))]
+        row = self._rows[r]
+        if row.ndim == 2:
+            return [self._round_tally(t) for t in row]
+        return self._round_tally(row)
+
+    def _round_tally (self, row):
+        present = np.flatnonzero(row >= 0)
+        order = present[np.argsort(-row[present], kind='stable')]
+        return OrderedDict((self.candidates[i], int(row[i])) for i in order.tolist())
+
+    '''
+        Output: list; the legacy tally, every round built at once
+    '''
+    def to_list (self):
+        return self[:]
+
+    '''
+        Arguments: candidates [hash bytes,...]
+
+        Output: RoundHistory; the same rounds with every candidate renamed to
+                the candidate at the same position in candidates
+    '''
+    def with_candidates (self, candidates):
+        if len(candidates) != len(self.candidates):
+            raise ValueError('Expected ' + str(len(self.candidates)) + ' candidates, got ' + str(len(candidates)) + '.')
+        return RoundHistory(candidates, self.denominators, self.votes)
+
+    '''
+        The votes each candidate gained (positive) or lost (negative) between
+        every two successive rounds; a candidate eliminated in a round loses
+        all their votes in the next. The two rounds are put in units of the
+        least common multiple of their denominators, which is 1 whenever
+        neither round had tied ranks.
+
+        Output: tuple (deltas ndarray ((rounds - 1) x ... x candidates),
+                denominators [int,...])
+    '''
+    def transfer_deltas (self):
+        votes = self.votes
+        held = np.where(votes < 0, 0, votes)
+        denominators = list(self.denominators) if self.denominators is not None else [1] * len(votes)
+        common = [math.lcm(denominators[r], denominators[r + 1]) for r in range(0, len(votes) - 1)]
+        if not [d for d in denominators if d != 1]:
+            return np.diff(held, axis=0), common
+
+        # scale each pair of rounds to their common denominator exactly
+        shape = (len(common),) + (1,) * (votes.ndim - 1)
+        before = np.array([common[r] // denominators[r] for r in range(0, len(common))], dtype=object).reshape(shape)
+        after = np.array([common[r] // denominators[r + 1] for r in range(0, len(common))], dtype=object).reshape(shape)
+        held = held.astype(object)
+        return held[1:] * after - held[:-1] * before, common
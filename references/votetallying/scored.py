@@ -0,0 +1,225 @@
+from collections import OrderedDict
+from itertools import islice
+import numpy as np
+from tally import sort_candidates
+
+'''
+    Arguments:  candidates [hash bytes,...], ballots [{hash bytes:score int},...],
+                max_score int, weighted bool
+
+    Compiles score ballots into a uint8 matrix with one row per ballot and one
+    column per candidate; candidates left off a ballot score 0. A ballot is
+    invalid if it scores nothing, scores a candidate not on the proposal, or
+    gives a score that is not an int between 0 and max_score. Invalid ballots
+    are left out of the matrix and only counted. If weighted is True, ballots
+    must be a list of (ballot, count) pairs.
+
+    Output: dict {
+        candidates:[hash bytes,...],
+        matrix:ndarray uint8 (ballots x candidates),
+        counts:ndarray int64 (ballots),
+        invalid_ballots:int
+    }
+'''
+def compile_score_ballots (candidates, ballots, max_score=5, weighted=False):
+    candidates = list(OrderedDict.fromkeys(candidates))
+    index = {c: i for i, c in enumerate(candidates)}
+    rows, counts = [], []
+    invalid_ballots = 0
+
+    # treat plain ballots as ballots with a count of 1
+    if not weighted:
+        ballots = ((b, 1) for b in ballots)
+
+    for b, count in ballots:
+        row = [0] * len(candidates)
+        valid = len(b) > 0
+        for c, score in b.items():
+            if c not in index or type(score) is not int or not 0 <= score <= max_score:
+                valid = False
+                break
+            row[index[c]] = score
+
+        if valid:
+            rows.append(row)
+            counts.append(count)
+        else:
+            invalid_ballots += count
+
+    return {
+        'candidates': candidates,
+        'matrix': np.array(rows, dtype=np.uint8).reshape(len(rows), len(candidates)),
+        'counts': np.array(counts, dtype=np.int64),
+        'invalid_ballots': invalid_ballots
+    }
+
+'''
+    Argument: n_candidates int
+
+    Output: int; the number of ballots whose pairwise comparisons (about 2**24)
+            are counted at once
+'''
+def score_chunk_size (n_candidates):
+    return max(1, 2**24 // max(1, n_candidates ** 2))
+
+'''
+    Arguments: compiled dict (see compile_score_ballots), chunk_size int
+
+    Totals the score columns and counts, for every pair of candidates, how many
+    voters scored one strictly above the other, in the same pass. The pairwise
+    counts give the STAR runoff between any two finalists without going back to
+    the ballots. The comparisons are made chunk_size ballots at a time (see
+    score_chunk_size), so memory use is bounded by the chunk and the
+    candidates x candidates counts no matter how many ballots there are.
+
+    Output: dict {
+        candidates:[hash bytes,...],
+        totals:ndarray int64 (candidates),
+        pairwise:ndarray int64 (candidates x candidates),
+        valid_ballots:int,
+        invalid_ballots:int
+    }
+'''
+def count_scores (compiled, chunk_size=None):
+    matrix, counts = compiled['matrix'], compiled['counts']
+    n_candidates = len(compiled['candidates'])
+    if chunk_size is None:
+        chunk_size = score_chunk_size(n_candidates)
+
+    totals = np.zeros(n_candidates, dtype=np.int64)
+    pairwise = np.zeros((n_candidates, n_candidates), dtype=np.int64)
+    for start in range(0, len(counts), chunk_size):
+        chunk, weights = matrix[start:start + chunk_size], counts[start:start + chunk_size]
+        preferred = chunk[:, :, None] > chunk[:, None, :]
+        totals += weights @ chunk.astype(np.int64)
+        pairwise += np.einsum('k,kij->ij', weights, preferred.astype(np.int64))
+
+    return {
+        'candidates': compiled['candidates'],
+        'totals': totals,
+        'pairwise': pairwise,
+        'valid_ballots': int(counts.sum()),
+        'invalid_ballots': compiled['invalid_ballots']
+    }
+
+'''
+    Arguments: totals dict (see count_scores), other dict (see count_scores)
+
+    Adds the counts of other into totals.
+
+    Output: dict (see count_scores)
+'''
+def merge_scores (totals, other):
+    totals['totals'] += other['totals']
+    totals['pairwise'] += other['pairwise']
+    totals['valid_ballots'] += other['valid_ballots']
+    totals['invalid_ballots'] += other['invalid_ballots']
+    return totals
+
+'''
+    Arguments:  candidates [hash bytes,...], ballots iterable of score ballots,
+                max_score int, chunk_size int, weighted bool
+
+    Streaming version of compile_score_ballots followed by count_scores. The
+    ballots are compiled and counted chunk_size at a time (see
+    score_chunk_size), so not even the score matrix of all ballots is kept.
+
+    Output: dict (see count_scores)
+'''
+def count_score_stream (candidates, ballots, max_score=5, chunk_size=None, weighted=False):
+    candidates = list(OrderedDict.fromkeys(candidates))
+    if chunk_size is None:
+        chunk_size = score_chunk_size(len(candidates))
+
+    ballots = iter(ballots)
+    totals = count_scores(compile_score_ballots(candidates, [], max_score))
+    while True:
+        chunk = list(islice(ballots, chunk_size))
+        if not chunk:
+            break
+        merge_scores(totals, count_scores(compile_score_ballots(candidates, chunk, max_score, weighted), chunk_size))
+
+    return totals
+
+'''
+    Arguments: number_of_winners int, totals dict (see count_scores), quorum_requirement int
+
+    Score voting. The number_of_winners candidates with the highest total score
+    win; candidates tied with the first loser are dropped from the winners and
+    counted in ties, as in tally.plurality.
+
+    Output: dict {
+        tally:OrderedDict {candidate_hash:total_score int},
+        winners:[winner_hash bytes,...],
+        invalid_ballots:int,
+        valid_ballots:int,
+        ties:int,
+        meets_quorum:bool
+    }
+'''
+def score (number_of_winners, totals, quorum_requirement):
+    candidates, scores = totals['candidates'], totals['totals']
+
+    # rank candidates; the stable sort keeps candidates order among equals
+    ranked = np.argsort(-scores, kind='stable')
+    winners = [int(i) for i in ranked[:number_of_winners]]
+
+    # handle ties
+    n_ties = 0
+    if len(ranked) > number_of_winners:
+        first_loser = scores[ranked[number_of_winners]]
+        while len(winners) > 0 and scores[winners[-1]] == first_loser:
+            winners = winners[:-1]
+            n_ties += 1
+
+    return {
+        'tally': sort_candidates({candidates[i]: int(scores[i]) for i in ranked}),
+        'winners': [candidates[i] for i in winners],
+        'invalid_ballots': totals['invalid_ballots'],
+        'valid_ballots': totals['valid_ballots'],
+        'ties': n_ties,
+        'meets_quorum': totals['valid_ballots'] >= quorum_requirement
+    }
+
+'''
+    Arguments: totals dict (see count_scores), quorum_requirement int
+
+    Score Then Automatic Runoff. The two candidates with the highest total
+    scores are the finalists (ties go to the earlier candidate), and the one
+    scored higher by more voters wins. A tied runoff goes to the finalist with
+    the higher total score; if that is tied too, there is no winner.
+
+    Output: dict {
+        tally:OrderedDict {candidate_hash:total_score int},
+        runoff:OrderedDict {finalist_hash:voters_preferring int},
+        winner:winner_hash bytes,
+        invalid_ballots:int,
+        valid_ballots:int,
+        meets_quorum:bool
+    }
+'''
+def star (totals, quorum_requirement):
+    candidates, scores, pairwise = totals['candidates'], totals['totals'], totals['pairwise']
+    ranked = np.argsort(-scores, kind='stable')
+    winner = 'b\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'
+    runoff = OrderedDict({})
+
+    if len(ranked) == 1:
+        winner = candidates[ranked[0]]
+        runoff[winner] = totals['valid_ballots']
+    elif len(ranked) > 1:
+        a, b = int(ranked[0]), int(ranked[1])
+        runoff = sort_candidates({candidates[a]: int(pairwise[a, b]), candidates[b]: int(pairwise[b, a])})
+        if pairwise[a, b] != pairwise[b, a]:
+            winner = next(iter(runoff))
+        elif scores[a] != scores[b]:
+            winner = candidates[a]
+
+    return {
+        'tally': sort_candidates({candidates[i]: int(scores[i]) for i in ranked}),
+        'runoff': runoff,
+        'winner': winner,
+        'invalid_ballots': totals['invalid_ballots'],
+        'valid_ballots': totals['valid_ballots'],
+        'meets_quorum': totals['valid_ballots'] >= quorum_requirement
+    }
@@ -0,0 +1,87 @@
+import hashlib
+
+'''
+    Argument: block_hash bytes
+
+    Deterministic keystream seeded by a block hash: sha256(block_hash + counter)
+    for counter = 0, 1, 2, ... as 8-byte big-endian ints, each yielded as one
+    256-bit int. Any node holding the block can reproduce it.
+
+    Output: generator of int
+'''
+def keystream (block_hash):
+    counter = 0
+    while True:
+        digest = hashlib.sha256(block_hash + counter.to_bytes(8, byteorder='big')).digest()
+        yield int.from_bytes(digest, byteorder='big')
+        counter += 1
+
+'''
+    Arguments: stream generator (see keystream), n int
+
+    Draws an unbiased int in [0, n) from the keystream, rejecting the values
+    past the largest multiple of n below 2**256.
+
+    Output: int
+'''
+def random_below (stream, n):
+    limit = 2**256 - 2**256 % n
+    while True:
+        value = next(stream)
+        if value < limit:
+            return value % n
+
+'''
+    Arguments: block_hash bytes, population_size int, k int
+
+    Partial Fisher-Yates shuffle of range(population_size) driven by the
+    keystream of block_hash. Only the first k positions are shuffled, and the
+    swapped positions are kept in a dict instead of a full array, so drawing k
+    out of N costs O(k) time and memory regardless of N.
+
+    Output: list [index int,...]; k distinct indices in draw order
+'''
+def draw_indices (block_hash, population_size, k):
+    if k > population_size:
+        raise ValueError('Cannot draw more winners than there are eligible entries.')
+
+    stream = keystream(block_hash)
+    swapped = {}
+    drawn = []
+    for i in range(0, k):
+        j = i + random_below(stream, population_size - i)
+        drawn.append(swapped.get(j, j))
+        swapped[j] = swapped.get(i, i)
+    return drawn
+
+'''
+    Arguments: block_hash bytes, eligible [address bytes,...], k int
+
+    Draws k winners by lot from eligible using the keystream of the referenced
+    block hash. Every node must list eligible in the same order (e.g. the order
+    of the registrations on chain) to reproduce the draw.
+
+    Output: dict {
+        winners:[address bytes,...],
+        block_hash:bytes,
+        population:int
+    }
+'''
+def sortition (block_hash, eligible, k):
+    return {
+        'winners': [eligible[i] for i in draw_indices(block_hash, len(eligible), k)],
+        'block_hash': block_hash,
+        'population': len(eligible)
+    }
+
+'''
+    Arguments: block_hash bytes, eligible [address bytes,...], winners [address bytes,...]
+
+    Redoes the draw and checks that it produced exactly winners, in order.
+
+    Output: bool
+'''
+def verify_sortition (block_hash, eligible, winners):
+    if len(winners) > len(eligible):
+        return False
+    return sortition(block_hash, eligible, len(winners))['winners'] == list(winners)
@@ -1,6 +1,9 @@
-from collections import OrderedDict
+from collections import Counter, OrderedDict
 import binascii
+import heapq
+import math
 import random
+from instrument import count_entries, count_moved, end_round, start_round
 
 def tohex (text):
     return binascii.hexlify(text)
@@ -29,76 +32,161 @@ def fisheryates(arr):
 '''
     Arguments: ballots list [ballot list,...], candidates list [candidate_hash bytes,...], placeholder bytes
 
-    This goes through each ballot, attaches any write-ins to the candidates list,
-    and replaces the placeholder with a tied rank of unranked candidiates.
+    Returns a new candidates list with every write-in found on the ballots
+    appended in order of first appearance. Membership is checked against a set
+    built once, so this is a single linear pass over the ballots.
 
-    Output: ballots list, candidates list
+    Output: candidates list
 '''
-def normalize_ranked_ballots(ballots, candidates, placeholder = b'Unranked/Write-Ins/Other'):
-    new_ballots = []
+def collect_candidates (ballots, candidates, placeholder = b'Unranked/Write-Ins/Other'):
+    candidates = list(candidates)
+    known = set(candidates)
+    known.add(placeholder)
 
-    # get complete list of all candidates
     for b in ballots:
-        found_ph = False
         for rank in b:
             # handle ties
-            if type(rank) is list:
-                for t in rank:
-                    if t not in candidates and t is not placeholder:
-                        candidates.append(t)
-                    elif t is placeholder:
-                        found_ph = True
-            else:
-                if rank not in candidates and rank is not placeholder:
-                    candidates.append(rank)
-                elif rank is placeholder:
-                    found_ph = True
+            for c in (rank if type(rank) is list else (rank,)):
+                if c not in known:
+                    known.add(c)
+                    candidates.append(c)
 
-        # add write-in candidates in the Unranked/Write-Ins/Other slot
-        if not found_ph:
-            b.append(placeholder)
+    return candidates
+
+'''
+    Arguments: ballots list [ballot list,...], candidates list [candidate_hash bytes,...], placeholder bytes
 
+    Lazily yields each ballot with the placeholder replaced by a tied rank of
+    the candidates it leaves unranked. Ballots without the placeholder get the
+    tie appended at the end. A placeholder inside a tie is replaced by the
+    unranked candidates within that tie. candidates must already hold every
+    candidate on the ballots (see collect_candidates). Each ballot is scanned
+    once while its ranked candidates are collected into a set; the inputs are
+    not modified.
+
+    Output: generator of ballot lists
+'''
+def iter_normalized_ballots (ballots, candidates, placeholder = b'Unranked/Write-Ins/Other'):
     for b in ballots:
+        # note ranked candidates and where the placeholder sits
+        seen = set()
+        slot = None
+        for i in range(0, len(b)):
+            rank = b[i]
+            if type(rank) is list:
+                seen.update(rank)
+                if slot is None and placeholder in rank:
+                    slot = i
+            else:
+                seen.add(rank)
+                if slot is None and rank == placeholder:
+                    slot = i
+
         # compile unranked candidates
-        unranked = []
-        for c in candidates:
-            # handle ties
-            found_c = False
-            for rank in b:
-                if type(rank) is list:
-                    if c in rank:
-                        found_c = True
+        unranked = [c for c in candidates if c not in seen]
+
+        # put unranked candidates on the ballot in place of the placeholder as a tie
+        if slot is None:
+            nb = list(b)
+            nb.append(unranked)
+        elif type(b[slot]) is list:
+            tie = [c for c in b[slot] if c != placeholder] + unranked
+            nb = list(b[0:slot]) + [tie] + list(b[slot+1:])
+        else:
+            nb = list(b[0:slot]) + [unranked] + list(b[slot+1:])
 
-            if not found_c and c not in b:
-                unranked.append(c)
+        yield nb
 
-        # put unranked candidates on the ballot in place of Unranked/Write-Ins/Other as a tie
-        nb = b[0:b.index(placeholder)]
-        nb.append(unranked)
-        nb[len(nb):] = b[b.index(placeholder)+1:]
-        new_ballots.append(nb)
+'''
+    Arguments: ballots list [ballot list,...], candidates list [candidate_hash bytes,...], placeholder bytes
 
-    # return noramlized ballots and candidates list
-    return new_ballots, candidates
+    This goes through each ballot, attaches any write-ins to the candidates list,
+    and replaces the placeholder with a tied rank of unranked candidiates. The
+    candidates are collected in one pass (see collect_candidates) and the
+    normalized ballots are then produced lazily (see iter_normalized_ballots),
+    so ballots must be a list or another collection that can be iterated twice.
+    Neither ballots nor candidates are modified.
+
+    Output: generator of ballot lists, candidates list
+'''
+def normalize_ranked_ballots(ballots, candidates, placeholder = b'Unranked/Write-Ins/Other'):
+    candidates = collect_candidates(ballots, candidates, placeholder)
+    return iter_normalized_ballots(ballots, candidates, placeholder), candidates
+
+'''
+    Argument: ballot bytes or [hash bytes or [hash bytes,...],...] or {hash bytes:score int}
+
+    Output: hashable key that is equal for identical ballots; tied ranks compare
+            equal regardless of the order of the tied candidates (but not of
+            how often each is repeated, which changes the tie size), and score
+            ballots regardless of the order of their entries
+'''
+def ballot_key (ballot):
+    if type(ballot) is dict:
+        return frozenset(ballot.items())
+    if type(ballot) is list or type(ballot) is tuple:
+        return tuple(frozenset(Counter(rank).items()) if type(rank) is list else rank for rank in ballot)
+    return ballot
+
+'''
+    Argument: ballots [ballot bytes or [hash bytes or [hash bytes,...],...] or {hash bytes:score int},...]
+
+    Collapses identical ballots, including identical tie groups, into unique
+    (ballot, count) pairs in order of first appearance. The first occurrence of
+    each ballot is kept as its representative, shared with ballots; the tally
+    functions never change it. The result can be passed to any tally function
+    with weighted=True. If weighted is True, ballots must
+    already be (ballot, count) pairs and their counts are added up.
+
+    Output: list [(ballot, count int), ...]
+'''
+def compress_ballots (ballots, weighted=False):
+    # treat plain ballots as ballots with a count of 1
+    if not weighted:
+        ballots = ((b, 1) for b in ballots)
+
+    unique = {}
+    for b, count in ballots:
+        key = ballot_key(b)
+        if key in unique:
+            unique[key][1] += count
+        else:
+            unique[key] = [b, count]
+
+    return [(b, n) for b, n in unique.values()]
+
+'''
+    Argument: vote
+
+    A plurality ballot is either a single vote or a sequence (list, tuple, ...)
+    of votes. A single vote is a candidate hash (bytes), a candidate name (str)
+    or an interned candidate id (int, see candidateregistry).
+
+    Output: bool
+'''
+def single_vote (vote):
+    return type(vote) is bytes or type(vote) is str or type(vote) is int
 
 '''
     Arguments:  number_of_winners int, candidates [hash bytes,...],
-                ballots [[hash bytes,...],...], quorum_requirement int
+                ballots [[hash bytes,...],...], weighted bool
 
-    This is intended to tally ballots for both FPTP and plurality-at-large/multiple
-    non-transferable vote/bloc voting.
+    Counts plurality/MNTV ballots without picking winners. Partial counts from
+    separate batches of ballots can be added together and ranked afterwards
+    with rank_plurality. A vote is valid if it is for one of candidates, so the
+    candidates can be hashes or interned ids (see candidateregistry); votes for
+    anyone else (e.g. write-ins) are invalid. An MNTV ballot may be any
+    sequence of single votes (see single_vote), e.g. a list or a tuple.
 
     Output: dict {
-        tally:OrderedDict {candidate_hash:votes int},
-        winners:[winner_hash bytes,...],
+        tally:dict {candidate_hash:votes int},
         invalid_ballots:int,
         invalid_votes:int,
         valid_ballots:int,
-        valid_votes:int,
-        meets_quorum:bool
+        valid_votes:int
     }
 '''
-def plurality (number_of_winners, candidates, ballots, quorum_requirement):
+def count_plurality (number_of_winners, candidates, ballots, weighted=False):
     tally = {}
     invalid_ballots = 0
     invalid_votes = 0
@@ -108,12 +196,16 @@ def plurality (number_of_winners, candidates, ballots, quorum_requirement):
     for c in candidates:
         tally[c] = 0
 
+    # treat plain ballots as ballots with a count of 1
+    if not weighted:
+        ballots = ((v, 1) for v in ballots)
+
     # tally ballots
-    for v in ballots:
+    for v, count in ballots:
         # for MNTV
         if number_of_winners > 1:
-            # make sure it is a list
-            if type(v) == type(b's'):
+            # make sure it is a sequence of votes
+            if single_vote(v):
                 v = [v]
 
             # only process valid ballots
@@ -121,32 +213,47 @@ def plurality (number_of_winners, candidates, ballots, quorum_requirement):
                 ballot_valid = True
                 for i in range(0, len(v)):
                     # only process valid votes
-                    if type(v[i]) == type(b's') and v[i] in tally:
-                        tally[v[i]] += 1
-                        valid_votes += 1
+                    if single_vote(v[i]) and v[i] in tally:
+                        tally[v[i]] += count
+                        valid_votes += count
                     else:
-                        invalid_votes += 1
+                        invalid_votes += count
                         ballot_valid = False
 
                 # stats about whether or not ballot was valid
                 if ballot_valid:
-                    valid_ballots += 1
+                    valid_ballots += count
                 else:
-                    invalid_ballots += 1
+                    invalid_ballots += count
             else:
-                invalid_ballots += 1
+                invalid_ballots += count
         # for FPTP
         else:
             # only process valid ballots
-            if type(v) == type(b's'):
-                tally[v] += 1
-                valid_ballots += 1
+            if single_vote(v) and v in tally:
+                tally[v] += count
+                valid_ballots += count
             else:
-                invalid_ballots += 1
+                invalid_ballots += count
+
+    return {
+        'tally': tally,
+        'invalid_ballots': invalid_ballots,
+        'invalid_votes': invalid_votes,
+        'valid_ballots': valid_ballots,
+        'valid_votes': valid_votes
+    }
 
+'''
+    Arguments: number_of_winners int, counts dict (see count_plurality), quorum_requirement int
 
+    Ranks counted candidates and determines the winners and ties.
+
+    Output: same as plurality
+'''
+def rank_plurality (number_of_winners, counts, quorum_requirement):
     # rank candidates
-    tally = sort_candidates(tally)
+    tally = sort_candidates(counts['tally'])
     tally_list = []
 
     # determine winners
@@ -162,17 +269,143 @@ def plurality (number_of_winners, candidates, ballots, quorum_requirement):
     # handle ties
     n_ties = 0
     # print('tally.plurality tally_list', tally_list)
-    a = tally[winners[-1:][0]]
-    b = tally_list[len(winners)][1]
-    while a == b and len(winners) > 0:
+    while len(winners) > 0 and len(winners) < len(tally_list) and tally[winners[-1]] == tally_list[len(winners)][1]:
         winners = winners[:-1]
-        a = tally[winners[-1:][0]]
-        b = tally_list[len(winners)][1]
         n_ties += 1
 
     return {
         'tally': tally,
         'winners': winners,
+        'invalid_ballots': counts['invalid_ballots'],
+        'invalid_votes': counts['invalid_votes'],
+        'valid_ballots': counts['valid_ballots'],
+        'valid_votes': counts['valid_votes'],
+        'ties': n_ties,
+        'meets_quorum': counts['valid_ballots'] >= quorum_requirement
+    }
+
+'''
+    Arguments:  number_of_winners int, candidates [hash bytes,...],
+                ballots [[hash bytes,...],...], quorum_requirement int,
+                weighted bool, observer function
+
+    This is intended to tally ballots for both FPTP and plurality-at-large/multiple
+    non-transferable vote/bloc voting. If weighted is True, ballots must be a list
+    of (ballot, count) pairs (see compress_ballots); all statistics are still
+    reported as true ballot and vote counts. ballots may also be a generator,
+    which is read once. If an observer is given, it is called with the tally's
+    single round (see instrument).
+
+    Output: dict {
+        tally:OrderedDict {candidate_hash:votes int},
+        winners:[winner_hash bytes,...],
+        invalid_ballots:int,
+        invalid_votes:int,
+        valid_ballots:int,
+        valid_votes:int,
+        meets_quorum:bool
+    }
+'''
+def plurality (number_of_winners, candidates, ballots, quorum_requirement, weighted=False, observer=None):
+    if observer is None:
+        return rank_plurality(number_of_winners, count_plurality(number_of_winners, candidates, ballots, weighted), quorum_requirement)
+
+    # count the entries as they are read, since ballots may be a generator
+    touched = [0]
+    started = start_round()
+    result = rank_plurality(number_of_winners, count_plurality(number_of_winners, candidates, count_entries(ballots, touched), weighted), quorum_requirement)
+    end_round(observer, 'PLURALITY', 0, started, touched[0], 0, 0)
+    return result
+
+'''
+    Arguments:  number_of_winners int, candidates [hash bytes,...],
+                ballots iterable of ballots, quorum_requirement int,
+                weighted bool
+
+    Streaming version of plurality. ballots can be any iterable, e.g. a generator
+    reading ballots off disk or off a chain; only a vote count per candidate is
+    kept in memory. Winners are picked with a top-k selection instead of sorting
+    the whole tally. Ballots are judged valid or invalid exactly as in plurality
+    (see count_plurality). Candidates tied with the first loser are dropped from
+    the winners and counted in ties, as in plurality.
+
+    Output: dict {
+        tally:OrderedDict {candidate_hash:votes int} (in candidates order),
+        winners:[winner_hash bytes,...],
+        invalid_ballots:int,
+        invalid_votes:int,
+        valid_ballots:int,
+        valid_votes:int,
+        ties:int,
+        meets_quorum:bool
+    }
+'''
+def plurality_stream (number_of_winners, candidates, ballots, quorum_requirement, weighted=False):
+    index = {}
+    for c in candidates:
+        index.setdefault(c, len(index))
+    votes = [0] * len(index)
+    invalid_ballots = 0
+    invalid_votes = 0
+    valid_ballots = 0
+    valid_votes = 0
+
+    # treat plain ballots as ballots with a count of 1
+    if not weighted:
+        ballots = ((v, 1) for v in ballots)
+
+    # tally ballots
+    for v, count in ballots:
+        # for MNTV
+        if number_of_winners > 1:
+            # make sure it is a sequence of votes
+            if single_vote(v):
+                v = [v]
+
+            # only process valid ballots
+            if not len(v) > number_of_winners:
+                ballot_valid = True
+                for c in v:
+                    # only process valid votes
+                    if single_vote(c) and c in index:
+                        votes[index[c]] += count
+                        valid_votes += count
+                    else:
+                        invalid_votes += count
+                        ballot_valid = False
+
+                # stats about whether or not ballot was valid
+                if ballot_valid:
+                    valid_ballots += count
+                else:
+                    invalid_ballots += count
+            else:
+                invalid_ballots += count
+        # for FPTP
+        else:
+            # only process valid ballots
+            if single_vote(v) and v in index:
+                votes[index[v]] += count
+                valid_ballots += count
+            else:
+                invalid_ballots += count
+
+    # select the winners plus the first loser for the tie check
+    ranked = heapq.nlargest(number_of_winners + 1, range(0, len(votes)), key=lambda i: votes[i])
+    winners = ranked[:number_of_winners]
+
+    # handle ties
+    n_ties = 0
+    if len(ranked) > number_of_winners:
+        first_loser = votes[ranked[number_of_winners]]
+        while len(winners) > 0 and votes[winners[-1]] == first_loser:
+            winners = winners[:-1]
+            n_ties += 1
+
+    names = list(index)
+    return {
+        'tally': OrderedDict((names[i], votes[i]) for i in range(0, len(votes))),
+        'winners': [names[i] for i in winners],
         'invalid_ballots': invalid_ballots,
         'invalid_votes': invalid_votes,
         'valid_ballots': valid_ballots,
@@ -181,18 +414,160 @@ def plurality (number_of_winners, candidates, ballots, quorum_requirement):
         'meets_quorum': valid_ballots >= quorum_requirement
     }
 
+'''
+    Argument: fractions dicts {candidate_hash:{tie_size:int}}, ...
+
+    Finds the common denominator for the tied-rank vote shares of a round: the
+    least common multiple of every tie size that occurs. Counting each whole
+    vote as denominator units makes every share of a tie an exact integer.
+    Without ties the denominator is 1.
+
+    Output: int
+'''
+def common_denominator (*fractions):
+    return math.lcm(1, *{k for f in fractions for c in f for k, n in f[c].items() if n})
+
+'''
+    Arguments:  whole dict {candidate_hash:int},
+                fractions dict {candidate_hash:{tie_size:int}},
+                denominator int
+
+    Combines whole votes and the number of tied votes per tie size into exact
+    vote totals in units of 1/denominator (see common_denominator).
+
+    Output: dict {candidate_hash:votes int}
+'''
+def scale_votes (whole, fractions, denominator):
+    return {c: whole[c] * denominator + sum(n * (denominator // k) for k, n in fractions[c].items()) for c in whole}
+
+'''
+    Arguments: fractions dict {candidate_hash:{tie_size:int}}, candidate hash bytes, count int, tie_size int
+
+    Records count ballots giving candidate a share of a tie of tie_size.
+'''
+def add_fraction (fractions, candidate, count, tie_size):
+    fractions[candidate][tie_size] = fractions[candidate].get(tie_size, 0) + count
+
+'''
+    Argument: round_tally dict {candidate_hash:votes int}
+
+    Finds the largest group of trailing candidates whose combined votes are
+    fewer than the votes of the candidate just above them. Even if all of
+    their votes were transferred to one of them, none of them could overtake
+    that candidate, so eliminating them one by one would eliminate every one
+    of them before anyone else and the group can be eliminated at once.
+
+    Output: list [candidate_hash bytes,...]; empty if there is no such group
+'''
+def defeated_candidates (round_tally):
+    ordered = sorted(round_tally, key=lambda c: round_tally[c])
+    defeated = []
+    combined = 0
+    for i in range(0, len(ordered) - 1):
+        combined += round_tally[ordered[i]]
+        if combined < round_tally[ordered[i + 1]]:
+            defeated = ordered[:i + 1]
+    return defeated
+
+'''
+    Arguments: round_tally OrderedDict {candidate_hash:votes int}, batch_elimination bool
+
+    Output: list [candidate_hash bytes,...]; the candidates irv eliminates after
+            round_tally: those with the fewest votes or, if batch_elimination is
+            True, every defeated candidate (see defeated_candidates)
+'''
+def irv_eliminated (round_tally, batch_elimination=False):
+    fewest = min(round_tally.values())
+    round_eliminated = [c for c in round_tally if round_tally[c] == fewest]
+    if batch_elimination:
+        round_eliminated = defeated_candidates(round_tally) or round_eliminated
+    return round_eliminated
+
+'''
+    Argument: round_tally_lowest_pref OrderedDict {candidate_hash:votes int}
+
+    Output: list [candidate_hash bytes,...]; the candidates irv_coombs
+            eliminates: those with the most lowest-preference votes
+'''
+def coombs_eliminated (round_tally_lowest_pref):
+    worst = max(round_tally_lowest_pref.values(), default=0)
+    return [c for c in round_tally_lowest_pref if round_tally_lowest_pref[c] == worst]
+
+'''
+    Arguments: counted_ballots [(ballot, count int),...], eliminated_candidates [hash bytes,...]
+
+    Removes the eliminated candidates from the ballots counted in a round of
+    irv or irv_coombs. New ballots and tie lists are built, so the counted
+    ballots are never changed. Ballots left empty are exhausted.
+
+    Output: tuple (next_round_ballots [(ballot, count int),...], exhausted_ballots int)
+'''
+def transfer_ballots (counted_ballots, eliminated_candidates):
+    next_round_ballots = []
+    exhausted_ballots = 0
+    for b, count in counted_ballots:
+        ballot = []
+        for rank in b:
+            # traverse ties
+            if type(rank) is list:
+                # remove eliminated candidates from a copy of the rank
+                rank = [c for c in rank if c not in eliminated_candidates]
+                # add to ballot
+                if len(rank) == 1:
+                    ballot.append(rank[0])
+                elif len(rank) > 1:
+                    ballot.append(rank)
+            else:
+                # keep only votes for uneliminated candidates
+                if rank not in eliminated_candidates:
+                    ballot.append(rank)
+
+        # add to next round if the ballot is not exhausted
+        if len(ballot) > 0:
+            next_round_ballots.append((ballot, count))
+        else:
+            exhausted_ballots += count
+
+    return next_round_ballots, exhausted_ballots
+
 '''
     Arguments:  candidates [hash bytes, ...],
                 ballots [[hash bytes, ...], ...],
-                quorum_requirement int
+                quorum_requirement int,
+                weighted bool,
+                batch_elimination bool,
+                observer function,
+                compact bool
 
     The tally will be a list with an OrderedDict for each successive elimination
     round. Candidates with fewest highest-preference votes are eliminated and
     those ballots reassigned until one candidate has a majority of highest-
-    preference votes.
+    preference votes. If weighted is True, ballots must be a list of
+    (ballot, count) pairs (see compress_ballots).
+    Neither candidates nor the ballots are changed, so the ballots of
+    compress_ballots can be counted again.
+
+    Votes split between tied ranks are counted exactly: each round's votes are
+    ints in units of 1/denominator of that round (see common_denominator), so a
+    round without ties is counted in whole votes.
+
+    If batch_elimination is True, each round eliminates every candidate that
+    can no longer overtake the candidates above them (see defeated_candidates)
+    instead of only the last candidate and ties. The winner is the same in far
+    fewer rounds; the statistics can differ where single elimination would have
+    found the winner before every defeated candidate was eliminated. eliminated
+    lists the candidates eliminated in each round.
+
+    If an observer is given, it is called after every round (see instrument);
+    a round's transferred ballots are those leaving the candidates it
+    eliminates. If compact is True, tally is a roundhistory.RoundHistory, which
+    keeps the rounds as one int array and builds a round's OrderedDict only
+    when it is read.
 
     Output: dict {
         tally:list [OrderedDict {candidate_hash:votes int}, ...],
+        denominators:list [int, ...],
+        eliminated:list [[candidate_hash bytes,...], ...],
         winner:winner_hash bytes,
         invalid_ballots:int,
         valid_ballots:int,
@@ -200,82 +575,98 @@ def plurality (number_of_winners, candidates, ballots, quorum_requirement):
         meets_quorum:bool
     }
 '''
-def irv (candidates, ballots, quorum_requirement):
+def irv (candidates, ballots, quorum_requirement, weighted=False, batch_elimination=False, observer=None, compact=False):
+    # eliminations remove candidates from a copy, not the caller's list
+    candidates = list(candidates)
     tally = []
+    denominators = []
+    eliminated = []
+    if compact:
+        # roundhistory needs numpy, which the default tally does not
+        from roundhistory import RoundHistory
+        tally = RoundHistory(candidates, denominators)
     eliminated_candidates = []
-    total_ballots = len(ballots)
+
+    # treat plain ballots as ballots with a count of 1
+    if not weighted:
+        ballots = [(b, 1) for b in ballots]
+    total_ballots = sum(count for b, count in ballots)
     invalid_ballots = 0
     exhausted_ballots = 0
     winner = ''
     winner_found = False
     round = 0
+    if observer is not None:
+        started = start_round()
 
     # until a winner is found
     while not winner_found:
+        # report the previous round
+        if observer is not None:
+            if round > 0:
+                started = end_round(observer, 'IRV', round - 1, started, touched, transferred, exhausted_ballots)
+            touched, transferred = len(ballots), 0
+
         # set up new tally for each round
         round_tally = {}
+        fractions = {}
         counted_ballots = []
         total_votes = 0
         for c in candidates:
             round_tally[c] = 0
+            fractions[c] = {}
 
         # go through each ballot and tally its highest-preference candidates
-        for b in ballots:
+        for b, count in ballots:
             if len(b) < 1:
                 if round == 0:
-                    invalid_ballots += 1
+                    invalid_ballots += count
                 else:
-                    exhausted_ballots += 1
+                    exhausted_ballots += count
             else:
                 if type(b[0]) is list:
                     if len([c for c in b[0] if c not in candidates]):
-                        invalid_ballots += 1
+                        invalid_ballots += count
                     else:
                         for c in b[0]:
-                            # round_tally[c] += 1
-                            round_tally[c] += 1 / len(b[0])
-                        counted_ballots.append(b)
+                            add_fraction(fractions, c, count, len(b[0]))
+                        counted_ballots.append((b, count))
                 elif b[0] not in candidates:
-                    invalid_ballots += 1
+                    invalid_ballots += count
                 else:
-                    counted_ballots.append(b)
-                    round_tally[b[0]] += 1
+                    counted_ballots.append((b, count))
+                    round_tally[b[0]] += count
+
+        # count exactly in units of the round's common denominator
+        denominator = common_denominator(fractions)
+        round_tally = scale_votes(round_tally, fractions, denominator)
 
         # sort candidiates
         round_tally = sort_candidates(round_tally)
 
         # add round_tally to full tally
         tally.append(round_tally)
+        denominators.append(denominator)
 
-        # get total and set up for elimination
+        # get total
         for k in round_tally:
             total_votes += round_tally[k]
-        worst_candidate = ['total', total_votes]
-
 
-        # inspect each candidate's tally
+        # see if someone has a majority of highest-preference votes
         for c in round_tally:
-            # see if someone has a majority of highest-preference votes
-            if round_tally[c] > int(total_votes / 2):
+            if round_tally[c] > total_votes // 2:
                 winner_found = True
                 winner = c
                 break
 
-            # also find the candidate with fewest highest-preference votes
-            if round_tally[c] < worst_candidate[1]:
-                worst_candidate = [c, round_tally[c]]
-
         # stop if winner found
         if winner_found:
             break
 
-        # check for ties for worst_candidate
-        ties_for_worst = []
-        ties_for_worst.extend([c for c in round_tally if round_tally[c] == worst_candidate[1] and c != worst_candidate[0]])
-
-        # eliminate worst_candidate and ties_for_worst
-        eliminated_candidates.append(worst_candidate[0])
-        eliminated_candidates.extend(ties_for_worst)
+        # eliminate the candidates with the fewest votes, or every defeated candidate
+        round_eliminated = irv_eliminated(round_tally, batch_elimination)
+        eliminated.append(round_eliminated)
+        eliminated_candidates.extend(round_eliminated)
 
         # remove eliminated_candidates from candidates
         for c in eliminated_candidates:
@@ -286,38 +677,21 @@ def irv (candidates, ballots, quorum_requirement):
         if len(candidates) == 0:
             break
 
+        # count the ballots leaving the eliminated candidates
+        if observer is not None:
+            transferred = count_moved(counted_ballots, (0,), set(round_eliminated))
+
         # remove eliminated candidiates from ballots
-        # print('eliminated: ', eliminated_candidates)
-        next_round_ballots = []
-        for b in counted_ballots:
-            ballot = []
-            for rank in b:
-                # traverse ties
-                if type(rank) is list:
-                    # remove eliminated candidates from rank
-                    nonrank = [c for c in rank if c in eliminated_candidates]
-                    for n in nonrank:
-                        rank.remove(n)
-                    # add to ballot
-                    if len(rank) == 1:
-                        ballot.append(rank[0])
-                    elif len(rank) > 1:
-                        ballot.append(rank)
-                else:
-                    # keep only votes for uneliminated candidates
-                    if rank not in eliminated_candidates:
-                        ballot.append(rank)
-            # add to next round if the ballot is not exhausted
-            if len(ballot) > 0:
-                # print('\tnewbal: ', ballot)
-                next_round_ballots.append(ballot)
-            else:
-                exhausted_ballots += 1
+        ballots, exhausted = transfer_ballots(counted_ballots, eliminated_candidates)
+        exhausted_ballots += exhausted
 
         # set up for next round
-        ballots = next_round_ballots
         round += 1
 
+    # report the last round
+    if observer is not None:
+        end_round(observer, 'IRV', round, started, touched, transferred, exhausted_ballots)
+
     # final tabulations
     valid_ballots = total_ballots - invalid_ballots
     meets_quorum = valid_ballots - exhausted_ballots > quorum_requirement
@@ -325,20 +699,42 @@ def irv (candidates, ballots, quorum_requirement):
         winner = 'b\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'
 
     # return statement
-    return {'tally': tally, 'winner': winner, 'invalid_ballots': invalid_ballots, 'valid_ballots': valid_ballots, 'exhausted_ballots': exhausted_ballots, 'meets_quorum': meets_quorum}
+    return {'tally': tally, 'denominators': denominators, 'eliminated': eliminated, 'winner': winner, 'invalid_ballots': invalid_ballots, 'valid_ballots': valid_ballots, 'exhausted_ballots': exhausted_ballots, 'meets_quorum': meets_quorum}
 
 '''
     Arguments:  candidates [hash bytes, ...],
                 ballots [[hash bytes, ...], ...],
-                quorum_requirement int
+                quorum_requirement int,
+                weighted bool,
+                observer function,
+                compact bool,
+                checked bool
 
     The tally will be a list with an OrderedDict for each successive elimination
     round. Candidates with most lowest-preference votes are eliminated and
     those ballots reassigned until one candidate has a majority of highest-
-    preference votes.
+    preference votes. If weighted is True, ballots must be a list of
+    (ballot, count) pairs (see compress_ballots).
+    Neither candidates nor the ballots are changed, so the ballots of
+    compress_ballots can be counted again.
+
+    Votes split between tied ranks are counted exactly, as in irv; both tallies
+    of a round share the round's denominator. There is no batch elimination:
+    the lowest preferences of eliminated candidates move on to the remaining
+    candidates, so no group of candidates is ever safe to eliminate at once.
+
+    If an observer is given, it is called after every round (see instrument);
+    a round's transferred ballots are those whose first or last rank leaves
+    with the candidates it eliminates. compact works as in irv; each round of
+    the RoundHistory is the [highest, lowest] pair. If checked is True, the
+    ballots are the transferred ballots of an earlier round (see
+    parallel.irv_coombs), so the first round does not reject ballots for
+    ranking fewer than every candidate.
 
     Output: dict {
         tally:list [[OrderedDict highest_preference_votes {candidate_hash:votes int,...}, OrderedDict lowest_preference_votes {candidate_hash:votes int,...}], ...],
+        denominators:list [int, ...],
+        eliminated:list [[candidate_hash bytes,...], ...],
         winner:winner_hash bytes,
         invalid_ballots:int,
         valid_ballots:int,
@@ -346,29 +742,52 @@ def irv (candidates, ballots, quorum_requirement):
         meets_quorum:bool
     }
 '''
-def irv_coombs (candidates, ballots, quorum_requirement):
+def irv_coombs (candidates, ballots, quorum_requirement, weighted=False, observer=None, compact=False, checked=False):
+    # eliminations remove candidates from a copy, not the caller's list
+    candidates = list(candidates)
     tally = []
+    denominators = []
+    eliminated = []
+    if compact:
+        from roundhistory import RoundHistory
+        tally = RoundHistory(candidates, denominators)
     eliminated_candidates = []
-    total_ballots = len(ballots)
+
+    # treat plain ballots as ballots with a count of 1
+    if not weighted:
+        ballots = [(b, 1) for b in ballots]
+    total_ballots = sum(count for b, count in ballots)
     invalid_ballots = 0
     exhausted_ballots = 0
     winner = ''
     winner_found = False
     round = 0
+    if observer is not None:
+        started = start_round()
 
     # until a winner is found
     while not winner_found:
+        # report the previous round
+        if observer is not None:
+            if round > 0:
+                started = end_round(observer, 'IRV_COOMBS', round - 1, started, touched, transferred, exhausted_ballots)
+            touched, transferred = len(ballots), 0
+
         # set up new tally for each round
         round_tally = {}
         round_tally_lowest_pref = {}
+        fractions = {}
+        fractions_lowest_pref = {}
         counted_ballots = []
         total_votes = 0
         for c in candidates:
             round_tally[c] = 0
             round_tally_lowest_pref[c] = 0
+            fractions[c] = {}
+            fractions_lowest_pref[c] = {}
 
         # go through each ballot and tally its highest- and lowest-preference candidates
-        for b in ballots:
+        for b, count in ballots:
             # count candidates in first round and reject invalid ballots
             counted_candidates = 0
             if round == 0:
@@ -378,8 +797,8 @@ def irv_coombs (candidates, ballots, quorum_requirement):
                     else:
                         counted_candidates += 1
 
-            if round == 0 and counted_candidates < len(candidates):
-                invalid_ballots += 1
+            if round == 0 and not checked and counted_candidates < len(candidates):
+                invalid_ballots += count
             else:
                 # handle ties
                 first_choices_valid = True
@@ -399,22 +818,25 @@ def irv_coombs (candidates, ballots, quorum_requirement):
                     last_choices_valid = False
 
                 if not first_choices_valid or not last_choices_valid:
-                    invalid_ballots += 1
+                    invalid_ballots += count
                 else:
-                    counted_ballots.append(b)
+                    counted_ballots.append((b, count))
                     if type(b[0]) is list:
                         for c in b[0]:
-                            # round_tally[c] += 1
-                            round_tally[c] += 1 / len(b[0])
+                            add_fraction(fractions, c, count, len(b[0]))
                     else:
-                        round_tally[b[0]] += 1
+                        round_tally[b[0]] += count
 
                     if type(b[-1]) is list:
                         for c in b[-1]:
-                            # round_tally_lowest_pref[c] += 1
-                            round_tally_lowest_pref[c] += 1 / len(b[-1])
+                            add_fraction(fractions_lowest_pref, c, count, len(b[-1]))
                     else:
-                        round_tally_lowest_pref[b[-1]] += 1
+                        round_tally_lowest_pref[b[-1]] += count
+
+        # count exactly in units of the round's common denominator
+        denominator = common_denominator(fractions, fractions_lowest_pref)
+        round_tally = scale_votes(round_tally, fractions, denominator)
+        round_tally_lowest_pref = scale_votes(round_tally_lowest_pref, fractions_lowest_pref, denominator)
 
         # sort candidiates
         round_tally = sort_candidates(round_tally)
@@ -422,38 +844,27 @@ def irv_coombs (candidates, ballots, quorum_requirement):
 
         # add round_tally to full tally
         tally.append([round_tally, round_tally_lowest_pref])
+        denominators.append(denominator)
 
-        # get total and set up for elimination
+        # get total
         for k in round_tally:
             total_votes += round_tally[k]
-        worst_candidate = ['none', 0]
-
 
-        # inspect each candidate's tally
+        # see if someone has a majority of highest-preference votes
         for c in round_tally:
-            # see if someone has a majority of highest-preference votes
-            if round_tally[c] > int(total_votes / 2):
+            if round_tally[c] > total_votes // 2:
                 winner_found = True
                 winner = c
                 break
 
-            # also find the candidate with greatest lowest-preference votes
-            if round_tally_lowest_pref[c] > worst_candidate[1]:
-                worst_candidate = [c, round_tally_lowest_pref[c]]
-
         # stop if winner found
         if winner_found:
             break
 
-        # check for ties for worst_candidate
-        ties_for_worst = []
-        for c in round_tally_lowest_pref:
-            if c != worst_candidate[0] and round_tally_lowest_pref[c] == worst_candidate[1]:
-                ties_for_worst.append(c)
-
-        # eliminate worst_candidate and ties_for_worst
-        eliminated_candidates.append(worst_candidate[0])
-        eliminated_candidates.extend(ties_for_worst)
+        # eliminate the candidates with the most lowest-preference votes
+        round_eliminated = coombs_eliminated(round_tally_lowest_pref)
+        eliminated.append(round_eliminated)
+        eliminated_candidates.extend(round_eliminated)
 
         # remove eliminated_candidates from candidates
         # print('eliminated: ', eliminated_candidates)
@@ -465,38 +876,21 @@ def irv_coombs (candidates, ballots, quorum_requirement):
         if len(candidates) == 0:
             break
 
+        # count the ballots leaving the eliminated candidates
+        if observer is not None:
+            transferred = count_moved(counted_ballots, (0, -1), set(eliminated[-1]))
+
         # remove eliminated candidates from ballots
-        next_round_ballots = []
-        for b in counted_ballots:
-            ballot = []
-            for rank in b:
-                # traverse ties
-                if type(rank) is list:
-                    # remove eliminated candidates from rank
-                    nonrank = [c for c in rank if c in eliminated_candidates]
-                    for n in nonrank:
-                        rank.remove(n)
-                    # add to ballot
-                    if len(rank) == 1:
-                        ballot.append(rank[0])
-                    elif len(rank) > 1:
-                        ballot.append(rank)
-                else:
-                    # keep only votes for uneliminated candidates
-                    if rank not in eliminated_candidates:
-                        ballot.append(rank)
-
-            # add to next round if the ballot is not exhausted
-            if len(ballot) > 0:
-                next_round_ballots.append(ballot)
-                # print('\tballot: ', ballot)
-            else:
-                exhausted_ballots += 1
+        ballots, exhausted = transfer_ballots(counted_ballots, eliminated_candidates)
+        exhausted_ballots += exhausted
 
         # set up for next round
-        ballots = next_round_ballots
         round += 1
 
+    # report the last round
+    if observer is not None:
+        end_round(observer, 'IRV_COOMBS', round, started, touched, transferred, exhausted_ballots)
+
     # final tabulations
     valid_ballots = total_ballots - invalid_ballots
     meets_quorum = valid_ballots - exhausted_ballots > quorum_requirement
@@ -504,69 +898,577 @@ def irv_coombs (candidates, ballots, quorum_requirement):
         winner = 'b\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'
 
     # return statement
-    return {'tally': tally, 'winner': winner, 'invalid_ballots': invalid_ballots, 'valid_ballots': valid_ballots, 'exhausted_ballots': exhausted_ballots, 'meets_quorum': meets_quorum}
+    return {'tally': tally, 'denominators': denominators, 'eliminated': eliminated, 'winner': winner, 'invalid_ballots': invalid_ballots, 'valid_ballots': valid_ballots, 'exhausted_ballots': exhausted_ballots, 'meets_quorum': meets_quorum}
+
+'''
+    Argument: ballots [[hash bytes or [hash bytes,...],...],...]
+
+    Converts each ranked ballot into a list of rank groups so that ties and
+    single ranks can be handled the same way. Empty ties are dropped.
+
+    Output: list [[(hash bytes,...), ...], ...]
+'''
+def compile_rank_groups (ballots):
+    compiled = []
+    for b in ballots:
+        groups = []
+        for rank in b:
+            if type(rank) is list:
+                if len(rank):
+                    groups.append(tuple(rank))
+            else:
+                groups.append((rank,))
+        compiled.append(groups)
+    return compiled
+
+'''
+    Argument: candidates [hash bytes,...]
+
+    Sets up one empty pile of ballots per candidate. Each pile maps a ballot
+    index to the number of candidates sharing that ballot's vote, and keeps a
+    running count of whole votes and of fractional shares per tie size.
+
+    Output: dict {
+        ballots:{candidate_hash:{ballot_index:tie_size int}},
+        whole:{candidate_hash:int},
+        fractions:{candidate_hash:{tie_size:int}}
+    }
+'''
+def new_piles (candidates):
+    return {
+        'ballots': {c: {} for c in candidates},
+        'whole': {c: 0 for c in candidates},
+        'fractions': {c: {} for c in candidates}
+    }
+
+'''
+    Arguments: piles dict (see new_piles), b int, group (hash bytes,...), count int
+
+    Places ballot b, standing for count identical ballots, onto the pile of every
+    candidate in group, splitting the vote evenly between them.
+'''
+def pile_ballot (piles, b, group, count=1):
+    k = len(group)
+    for c in group:
+        piles['ballots'][c][b] = k
+        if k == 1:
+            piles['whole'][c] += count
+        else:
+            piles['fractions'][c][k] = piles['fractions'][c].get(k, 0) + count
+
+'''
+    Arguments: piles dict (see new_piles), b int, group (hash bytes,...), count int
+
+    Takes ballot b, standing for count identical ballots, back off the piles of
+    every candidate in group.
+'''
+def unpile_ballot (piles, b, group, count=1):
+    for c in group:
+        k = piles['ballots'][c].pop(b)
+        if k == 1:
+            piles['whole'][c] -= count
+        else:
+            piles['fractions'][c][k] -= count
+
+'''
+    Arguments: piles dict (see new_piles), candidates [hash bytes,...]
+
+    Totals the piles of candidates exactly (see common_denominator).
+
+    Output: (dict {candidate_hash:votes int}, denominator int)
+'''
+def pile_votes (piles, candidates):
+    fractions = {c: piles['fractions'][c] for c in candidates}
+    denominator = common_denominator(fractions)
+    return scale_votes({c: piles['whole'][c] for c in candidates}, fractions, denominator), denominator
+
+'''
+    Arguments:  groups [(hash bytes,...),...], position int, step int,
+                live set, piles dict (see new_piles)
+
+    Walks from position in the direction of step until it finds a rank group
+    that still holds a live candidate. Candidates that were never on the
+    proposal count as present so that the ballot can be rejected.
+
+    Output: (position int, live group (hash bytes,...))
+'''
+def _next_live_group (groups, position, step, live, piles):
+    while 0 <= position < len(groups):
+        group = tuple(c for c in groups[position] if c in live or c not in piles['ballots'])
+        if group:
+            return position, group
+        position += step
+    return position, ()
 
 '''
     Arguments:  candidates [hash bytes, ...],
                 ballots [[hash bytes, ...], ...],
-                seats_available int,
-                quorum_requirement int
+                quorum_requirement int,
+                weighted bool,
+                batch_elimination bool,
+                compact bool
+
+    Same rules and output as irv, but counted like a hand count: each candidate
+    keeps a pile of the ballots currently counting for them. Eliminating a
+    candidate only touches that candidate's pile, moving each ballot on to its
+    next live preference, so the work done is proportional to the number of
+    transfers rather than ballots x rounds. Fractional votes from tied ranks are
+    kept as counts per tie size, so the totals are exact and match irv.
+    batch_elimination and compact work as in irv. Neither candidates nor
+    ballots are modified.
+
+    Output: same as irv
+'''
+def irv_piles (candidates, ballots, quorum_requirement, weighted=False, batch_elimination=False, compact=False):
+    tally = []
+    denominators = []
+    eliminated = []
+    if compact:
+        from roundhistory import RoundHistory
+        tally = RoundHistory(candidates, denominators)
+
+    # treat plain ballots as ballots with a count of 1
+    if weighted:
+        counts = [count for b, count in ballots]
+        groups = compile_rank_groups([b for b, count in ballots])
+    else:
+        groups = compile_rank_groups(ballots)
+        counts = [1] * len(groups)
+    total_ballots = sum(counts)
+    live = set(candidates)
+    remaining = [c for c in candidates]
+    piles = new_piles(candidates)
+    pointer = [0] * len(groups)
+    placed = [()] * len(groups)
+    invalid_ballots = 0
+    exhausted_ballots = 0
+    winner = ''
+    winner_found = False
 
-    This uses the Droop quota rather than Hare:
-        total_votes / (seats_available+1) + 1
-    Similar to irv, except surplus votes are distributed before eliminations using
-    the Gergory method (Irish Senatorial rules).
+    # move a ballot to its next live preference; returns False if it left the count
+    def place (b):
+        nonlocal invalid_ballots, exhausted_ballots
+        pointer[b], group = _next_live_group(groups[b], pointer[b], 1, live, piles)
+        if not group:
+            exhausted_ballots += counts[b]
+            return False
+        if [c for c in group if c not in live]:
+            invalid_ballots += counts[b]
+            return False
+        pile_ballot(piles, b, group, counts[b])
+        placed[b] = group
+        return True
+
+    # deal the ballots onto the piles of their highest preferences
+    for b in range(0, len(groups)):
+        if len(groups[b]) < 1:
+            invalid_ballots += counts[b]
+        else:
+            place(b)
+
+    # until a winner is found
+    while not winner_found:
+        # sort candidates
+        round_tally, denominator = pile_votes(piles, remaining)
+        round_tally = sort_candidates(round_tally)
+
+        # add round_tally to full tally
+        tally.append(round_tally)
+        denominators.append(denominator)
+
+        # get total and set up for elimination
+        total_votes = 0
+        for k in round_tally:
+            total_votes += round_tally[k]
+        worst_candidate = ['total', total_votes]
+
+        # inspect each candidate's tally
+        for c in round_tally:
+            # see if someone has a majority of highest-preference votes
+            if round_tally[c] > total_votes // 2:
+                winner_found = True
+                winner = c
+                break
+
+            # also find the candidate with fewest highest-preference votes
+            if round_tally[c] < worst_candidate[1]:
+                worst_candidate = [c, round_tally[c]]
+
+        # stop if winner found
+        if winner_found:
+            break
+
+        # eliminate worst_candidate and ties_for_worst, or every defeated candidate
+        eliminated_candidates = [c for c in round_tally if round_tally[c] == worst_candidate[1]]
+        if batch_elimination:
+            eliminated_candidates = defeated_candidates(round_tally) or eliminated_candidates
+        eliminated.append(eliminated_candidates)
+        for c in eliminated_candidates:
+            live.discard(c)
+        remaining = [c for c in remaining if c in live]
+
+        # stop if all candidates eliminated due to tie
+        if len(remaining) == 0:
+            break
+
+        # transfer only the ballots on the eliminated candidates' piles
+        transfers = {}
+        for c in eliminated_candidates:
+            transfers.update(piles['ballots'][c])
+        for b in transfers:
+            unpile_ballot(piles, b, placed[b], counts[b])
+            place(b)
+
+    # final tabulations
+    valid_ballots = total_ballots - invalid_ballots
+    meets_quorum = valid_ballots - exhausted_ballots > quorum_requirement
+    if not winner_found:
+        winner = 'b\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'
+
+    # return statement
+    return {'tally': tally, 'denominators': denominators, 'eliminated': eliminated, 'winner': winner, 'invalid_ballots': invalid_ballots, 'valid_ballots': valid_ballots, 'exhausted_ballots': exhausted_ballots, 'meets_quorum': meets_quorum}
+
+'''
+    Arguments:  candidates [hash bytes, ...],
+                ballots [[hash bytes, ...], ...],
+                quorum_requirement int,
+                weighted bool,
+                compact bool
+
+    Same rules and output as irv_coombs, but counted from piles: every candidate
+    keeps one pile of ballots ranking them highest and one of ballots ranking
+    them lowest. Eliminating a candidate only moves the ballots on that
+    candidate's two piles. compact works as in irv_coombs. Neither candidates
+    nor ballots are modified.
+
+    Output: same as irv_coombs
+'''
+def irv_coombs_piles (candidates, ballots, quorum_requirement, weighted=False, compact=False):
+    tally = []
+    denominators = []
+    eliminated = []
+    if compact:
+        from roundhistory import RoundHistory
+        tally = RoundHistory(candidates, denominators)
+
+    # treat plain ballots as ballots with a count of 1
+    if weighted:
+        counts = [count for b, count in ballots]
+        groups = compile_rank_groups([b for b, count in ballots])
+    else:
+        groups = compile_rank_groups(ballots)
+        counts = [1] * len(groups)
+    total_ballots = sum(counts)
+    live = set(candidates)
+    remaining = [c for c in candidates]
+    highest, lowest = new_piles(candidates), new_piles(candidates)
+    front = [0] * len(groups)
+    back = [len(g) - 1 for g in groups]
+    placed_highest = [()] * len(groups)
+    placed_lowest = [()] * len(groups)
+    invalid_ballots = 0
+    exhausted_ballots = 0
+    winner = ''
+    winner_found = False
+
+    # move both ends of a ballot to live preferences; returns False if it left the count
+    def place (b):
+        nonlocal invalid_ballots, exhausted_ballots
+        front[b], first = _next_live_group(groups[b], front[b], 1, live, highest)
+        back[b], last = _next_live_group(groups[b], back[b], -1, live, highest)
+        if not first or front[b] > back[b]:
+            exhausted_ballots += counts[b]
+            return False
+        if [c for c in first + last if c not in live]:
+            invalid_ballots += counts[b]
+            return False
+        pile_ballot(highest, b, first, counts[b])
+        pile_ballot(lowest, b, last, counts[b])
+        placed_highest[b], placed_lowest[b] = first, last
+        return True
+
+    # reject incomplete ballots and deal the rest onto the piles
+    for b in range(0, len(groups)):
+        if sum(len(g) for g in groups[b]) < len(candidates):
+            invalid_ballots += counts[b]
+        else:
+            place(b)
+
+    # until a winner is found
+    while not winner_found:
+        # count exactly in units of the round's common denominator
+        denominator = common_denominator(
+            {c: highest['fractions'][c] for c in remaining},
+            {c: lowest['fractions'][c] for c in remaining})
+        round_tally = scale_votes({c: highest['whole'][c] for c in remaining}, highest['fractions'], denominator)
+        round_tally_lowest_pref = scale_votes({c: lowest['whole'][c] for c in remaining}, lowest['fractions'], denominator)
+
+        # sort candidates
+        round_tally = sort_candidates(round_tally)
+        round_tally_lowest_pref = sort_candidates(round_tally_lowest_pref)
+
+        # add round_tally to full tally
+        tally.append([round_tally, round_tally_lowest_pref])
+        denominators.append(denominator)
+
+        # get total and set up for elimination
+        total_votes = 0
+        for k in round_tally:
+            total_votes += round_tally[k]
+        worst_candidate = ['none', 0]
+
+        # inspect each candidate's tally
+        for c in round_tally:
+            # see if someone has a majority of highest-preference votes
+            if round_tally[c] > total_votes // 2:
+                winner_found = True
+                winner = c
+                break
+
+            # also find the candidate with greatest lowest-preference votes
+            if round_tally_lowest_pref[c] > worst_candidate[1]:
+                worst_candidate = [c, round_tally_lowest_pref[c]]
+
+        # stop if winner found
+        if winner_found:
+            break
+
+        # eliminate worst_candidate and ties_for_worst
+        eliminated_candidates = [c for c in round_tally_lowest_pref if round_tally_lowest_pref[c] == worst_candidate[1]]
+        eliminated.append(eliminated_candidates)
+        for c in eliminated_candidates:
+            live.discard(c)
+        remaining = [c for c in remaining if c in live]
+
+        # stop if all candidates eliminated due to tie
+        if len(remaining) == 0:
+            break
+
+        # transfer only the ballots on the eliminated candidates' piles
+        transfers = {}
+        for c in eliminated_candidates:
+            transfers.update(highest['ballots'][c])
+            transfers.update(lowest['ballots'][c])
+        for b in transfers:
+            unpile_ballot(highest, b, placed_highest[b], counts[b])
+            unpile_ballot(lowest, b, placed_lowest[b], counts[b])
+            place(b)
+
+    # final tabulations
+    valid_ballots = total_ballots - invalid_ballots
+    meets_quorum = valid_ballots - exhausted_ballots > quorum_requirement
+    if not winner_found:
+        winner = 'b\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'
+
+    # return statement
+    return {'tally': tally, 'denominators': denominators, 'eliminated': eliminated, 'winner': winner, 'invalid_ballots': invalid_ballots, 'valid_ballots': valid_ballots, 'exhausted_ballots': exhausted_ballots, 'meets_quorum': meets_quorum}
+
+# ballot weights in stv are fixed-point integers: a whole vote is worth
+# STV_WEIGHT_SCALE units, so surplus transfers never need floats
+STV_WEIGHT_SCALE = 10**9
+
+'''
+    Arguments:  candidates [hash bytes, ...],
+                ballots [[hash bytes, ...], ...],
+                seats_available int,
+                quorum_requirement int,
+                quota_type str ('DROOP' or 'HARE'),
+                weighted bool,
+                observer function
+
+    Single transferable vote using the Gregory method with integer fixed-point
+    weights. Every candidate keeps a pile of parcels; a parcel is a ballot (or a
+    share of one, for tied ranks) with a pointer to its current preference and
+    the weight of a single copy of the ballot in STV_WEIGHT_SCALE units, so it
+    is worth count * weight. Each round, all candidates reaching the quota are
+    elected and each one's surplus is transferred, largest first, by moving
+    every parcel on their pile to its next continuing preference at weight *
+    surplus // votes. A tie splits the weight evenly and the rounding
+    remainder goes to the tied candidate first in candidates. Since all
+    rounding is done per copy and in a fixed order, merging identical ballots
+    (see compress_ballots) or reordering them never changes the result.
+    If nobody reaches the quota, the candidate with
+    the fewest votes is excluded and their pile is transferred at full value;
+    ties for fewest are broken by the most recent round in which the tied
+    candidates differed, then by the later position in candidates. Only the
+    piles of elected or excluded candidates are ever touched.
+
+    The quota is floor(valid_ballots / (seats_available + 1)) + 1 whole votes
+    for Droop and valid_ballots / seats_available for Hare. Ballots that are
+    empty or whose first preference is not on the proposal are invalid; later
+    preferences not on the proposal are skipped. A ballot is exhausted if any
+    of its parcels runs out of continuing preferences. If weighted is True,
+    ballots must be a list of (ballot, count) pairs (see compress_ballots).
+
+    If an observer is given, it is called after every round (see instrument);
+    the first round includes dealing the ballots, and a round's transferred
+    ballots are the parcels moved off the piles it elects or excludes.
 
     Output: dict {
-        tally:list [OrderedDict {candidate_hash:votes int}, ...],
-        winner:winner_hash bytes,
+        tally:list [OrderedDict {candidate_hash:votes int (STV_WEIGHT_SCALE units)}, ...],
+        winners:[winner_hash bytes,...],
+        quota:int (STV_WEIGHT_SCALE units),
         invalid_ballots:int,
         valid_ballots:int,
         exhausted_ballots:int,
         meets_quorum:bool
     }
 '''
-def stv_droop (candidates, ballots, seats_available, quorum_requirement):
+def stv (candidates, ballots, seats_available, quorum_requirement, quota_type='DROOP', weighted=False, observer=None):
     tally = []
     elected_candidates = []
-    eliminated_candidates = []
-    total_ballots = len(ballots)
-    quota = int(total_ballots / (seats_available + 1)) + 1
+
+    # treat plain ballots as ballots with a count of 1
+    if weighted:
+        counts = [count for b, count in ballots]
+        groups = compile_rank_groups([b for b, count in ballots])
+    else:
+        groups = compile_rank_groups(ballots)
+        counts = [1] * len(groups)
+    total_ballots = sum(counts)
+
+    hopeful = set(candidates)
+    known = set(candidates)
+    piles = {c: [] for c in candidates}
+    votes = {c: 0 for c in candidates}
+    exhausted = set()
     invalid_ballots = 0
-    exhausted_ballots = 0
-    round = 0
+    if observer is not None:
+        started = start_round()
+
+    order = {candidates[i]: i for i in range(0, len(candidates))}
+
+    # move a parcel [ballot, position, weight] on to its next continuing preference
+    def transfer (b, position, weight):
+        position += 1
+        while position < len(groups[b]):
+            group = sorted([c for c in groups[b][position] if c in hopeful], key=order.get)
+            if group:
+                # split tied ranks evenly; the first candidate keeps the rounding remainder
+                share = weight // len(group)
+                for i in range(0, len(group)):
+                    parcel = share + (weight - share * len(group) if i == 0 else 0)
+                    piles[group[i]].append((b, position, parcel))
+                    votes[group[i]] += counts[b] * parcel
+                return
+            position += 1
+        exhausted.add(b)
+
+    # deal valid ballots onto the piles of their first preferences
+    for b in range(0, len(groups)):
+        if len(groups[b]) < 1 or [c for c in groups[b][0] if c not in known]:
+            invalid_ballots += counts[b]
+        else:
+            transfer(b, -1, STV_WEIGHT_SCALE)
 
-    while len(elected_candidates) < seats_available:
-        # set up round
-        round_tally = {}
-        counted_ballots = []
-        for c in candidates:
-            round_tally[c] = 0
+    valid_ballots = total_ballots - invalid_ballots
+    touched, moved = len(groups), 0
+    if quota_type == 'HARE':
+        quota = valid_ballots * STV_WEIGHT_SCALE // max(1, seats_available)
+    else:
+        quota = (valid_ballots // (seats_available + 1) + 1) * STV_WEIGHT_SCALE
+
+    while len(elected_candidates) < seats_available and hopeful:
+        # report the previous round
+        if observer is not None and tally:
+            started = end_round(observer, 'STV_' + quota_type, len(tally) - 1, started, touched, moved, sum(counts[b] for b in exhausted))
+            touched, moved = 0, 0
+
+        # record the round
+        round_tally = sort_candidates({c: votes[c] for c in candidates if c in hopeful or c in elected_candidates})
+        tally.append(round_tally)
 
-        # go through each ballot and count highest preference votes
-        for b in ballots:
-            if len(b) < 1:
-                if round == 0:
-                    invalid_ballots += 1
-                else:
-                    exhausted_ballots += 1
-            else:
-                if type(b[0]) is list:
-                    if len([c for c in b[0] if c not in candidates]):
-                        invalid_ballots += 1
-                    else:
-                        for c in b[0]:
-                            # round_tally[c] += 1
-                            round_tally[c] += 1 / len(b[0])
-                        counted_ballots.append(b)
-                elif b[0] not in candidates:
-                    invalid_ballots += 1
-                else:
-                    counted_ballots.append(b)
-                    round_tally[b[0]] += 1
+        # elect everyone left if there are no more hopefuls than open seats
+        if len(hopeful) <= seats_available - len(elected_candidates):
+            elected_candidates.extend([c for c in round_tally if c in hopeful])
+            hopeful.clear()
+            break
+
+        # elect everyone who reached the quota
+        reached = [c for c in round_tally if c in hopeful and votes[c] >= quota]
+        if reached:
+            for c in reached:
+                hopeful.discard(c)
+                elected_candidates.append(c)
+
+            # transfer surpluses, largest first, touching only the elected piles
+            for c in reached:
+                surplus = votes[c] - quota
+                if surplus <= 0:
+                    continue
+                pile, total = piles[c], votes[c]
+                piles[c], votes[c] = [], quota
+                # with no hopefuls left the surplus has nowhere to go
+                if not hopeful:
+                    continue
+                touched, moved = touched + len(pile), moved + len(pile)
+                for b, position, weight in pile:
+                    transfer(b, position, weight * surplus // total)
+            continue
+
+        # otherwise exclude the candidate with the fewest votes
+        lowest = min(votes[c] for c in hopeful)
+        tied = [c for c in candidates if c in hopeful and votes[c] == lowest]
+        for earlier in reversed(tally[:-1]):
+            if len(tied) < 2:
+                break
+            fewest = min(earlier[c] for c in tied)
+            tied = [c for c in tied if earlier[c] == fewest]
+        excluded = tied[-1]
 
-        # determine which candidates have been seated
-        elected_candidates.extend([c for c in candidates if round_tally[c] >= quota])
+        hopeful.discard(excluded)
+        pile = piles[excluded]
+        piles[excluded], votes[excluded] = [], 0
+        touched, moved = touched + len(pile), moved + len(pile)
+        for b, position, weight in pile:
+            transfer(b, position, weight)
 
-        # reapportion ballots for candidiates elected in this round
-        candidates_to_reapportion = [c for c in elected_candidates if c in candidiates]
+    exhausted_ballots = sum(counts[b] for b in exhausted)
+
+    # report the last round
+    if observer is not None and tally:
+        end_round(observer, 'STV_' + quota_type, len(tally) - 1, started, touched, moved, exhausted_ballots)
+
+    return {
+        'tally': tally,
+        'winners': elected_candidates,
+        'quota': quota,
+        'invalid_ballots': invalid_ballots,
+        'valid_ballots': valid_ballots,
+        'exhausted_ballots': exhausted_ballots,
+        'meets_quorum': valid_ballots - exhausted_ballots > quorum_requirement
+    }
+
+'''
+    Arguments:  candidates [hash bytes, ...],
+                ballots [[hash bytes, ...], ...],
+                seats_available int,
+                quorum_requirement int,
+                weighted bool,
+                observer function
+
+    This uses the Droop quota rather than Hare:
+        valid_ballots / (seats_available+1) + 1
+    Similar to irv, except surplus votes are distributed before eliminations using
+    the Gregory method. See stv.
+
+    Output: same as stv
+'''
+def stv_droop (candidates, ballots, seats_available, quorum_requirement, weighted=False, observer=None):
+    return stv(candidates, ballots, seats_available, quorum_requirement, 'DROOP', weighted, observer)
+
+'''
+    Arguments:  candidates [hash bytes, ...],
+                ballots [[hash bytes, ...], ...],
+                seats_available int,
+                quorum_requirement int,
+                weighted bool,
+                observer function
+
+    Same as stv_droop, but with the Hare quota:
+        valid_ballots / seats_available
+
+    Output: same as stv
+'''
+def stv_hare (candidates, ballots, seats_available, quorum_requirement, weighted=False, observer=None):
+    return stv(candidates, ballots, seats_available, quorum_requirement, 'HARE', weighted, observer)
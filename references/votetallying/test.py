@@ -1,5 +1,5 @@
 import random
-from tally import irv, irv_coombs
+from tally import irv, irv_coombs, normalize_ranked_ballots
 import copy
 
 def fisheryates(arr):
@@ -89,54 +89,6 @@ def normalize_ranked_ballots_coombs_no_ties(ballots, candidates):
     # return noramlized ballots and candidates list
     return ballots, candidates
 
-def normalize_ranked_ballots(ballots, candidates, placeholder = b'Unranked/Write-Ins/Other'):
-    new_ballots = []
-
-    # get complete list of all candidates
-    for b in ballots:
-        found_ph = False
-        for rank in b:
-            # handle ties
-            if type(rank) is list:
-                for t in rank:
-                    if t not in candidates and t is not placeholder:
-                        candidates.append(t)
-                    elif t is placeholder:
-                        found_ph = True
-            else:
-                if rank not in candidates and rank is not placeholder:
-                    candidates.append(rank)
-                elif rank is placeholder:
-                    found_ph = True
-
-        # add write-in candidates in the Unranked/Write-Ins/Other slot
-        if not found_ph:
-            b.append(placeholder)
-
-    for b in ballots:
-        # compile unranked candidates
-        unranked = []
-        for c in candidates:
-            # handle ties
-            found_c = False
-            for rank in b:
-                if type(rank) is list:
-                    if c in rank:
-                        found_c = True
-
-            if not found_c and c not in b:
-                unranked.append(c)
-
-        # put unranked candidates on the ballot in place of Unranked/Write-Ins/Other as a tie
-        nb = b[0:b.index(placeholder)]
-        nb.append(unranked)
-        nb[len(nb):] = b[b.index(placeholder)+1:]
-        new_ballots.append(nb)
-
-    # return noramlized ballots and candidates list
-    return new_ballots, candidates
-
-
 original_candidates = ['Albert', 'Billy', 'Cindy']
 original_ballots = [
     ['Albert', 'Cindy', 'Billy'],
@@ -185,6 +137,7 @@ ballots, candidates = normalize_ranked_ballots(ballots, candidates)
 
 ballots = copy.deepcopy(original_ballots)
 ballots, candidates = normalize_ranked_ballots(ballots, candidates)
+ballots = list(ballots)
 print('ballots: ')
 for b in ballots:
     print('\t', b)
@@ -0,0 +1,19 @@
+import apportionment
+
+# the example of the Wikipedia article on the D'Hondt method, 8 seats
+votes = {'A': 100000, 'B': 80000, 'C': 30000, 'D': 20000}
+seats = apportionment.apportion(votes, 8, 'JEFFERSON')
+print('D\'Hondt seats: ', dict(seats))
+assert list(seats.values()) == [4, 3, 1, 0]
+for method in ('WEBSTER', 'HUNTINGTON', 'ADAM', 'HAMILTON', 'LOWNDES'):
+    assert list(apportionment.apportion(votes, 8, method).values()) == [3, 3, 1, 1], method
+
+# A's list seats top up its two constituencies; D keeps its constituency
+# as an overhang seat
+lists = {p: [p + str(i) for i in range(1, 5)] for p in votes}
+result = apportionment.mmp(votes, [('A1', 'A'), ('A3', 'A'), ('D1', 'D')], 8, lists, 'JEFFERSON')
+print('MMP elected: ', result['elected'])
+assert list(result['seats'].values()) == [4, 3, 1, 1]
+assert list(result['list_seats'].values()) == [2, 3, 1, 0]
+assert result['overhang'] == 1
+assert result['elected'] == ['A1', 'A3', 'D1', 'A2', 'A4', 'B1', 'B2', 'B3', 'C1']
@@ -0,0 +1,33 @@
+import approval
+
+# Tennessee voters approving the cities they score 3 or more
+cities = ['Memphis', 'Nashville', 'Chattanooga', 'Knoxville']
+ballots = [
+    (['Memphis'], 42),
+    (['Nashville', 'Chattanooga', 'Knoxville'], 26),
+    (['Nashville', 'Chattanooga', 'Knoxville'], 15),
+    (['Chattanooga', 'Knoxville'], 17)
+]
+
+compiled = approval.compile_approval_ballots(cities, ballots + [(['Edmund'], 1), ([], 1)], weighted=True)
+assert compiled['invalid_ballots'] == 2
+result = approval.approval(2, compiled, 0)
+print('approval tally: ', dict(result['tally']))
+assert dict(result['tally']) == {'Memphis': 42, 'Nashville': 41, 'Chattanooga': 58, 'Knoxville': 58}
+assert result['winners'] == ['Chattanooga', 'Knoxville']
+
+# a tie for the last seat leaves it empty
+result = approval.approval(1, compiled, 0)
+assert result['winners'] == [] and result['ties'] == 1
+
+# candidates past the first 64-bit word
+candidates = [str(i) for i in range(0, 70)]
+result = approval.approval(1, approval.compile_approval_ballots(candidates, [['69', '3'], ['69'], ['0']]), 0)
+assert result['winners'] == ['69'] and result['tally']['3'] == 1
+
+# combined approval: approvals minus disapprovals
+ballots = [{'A': 1, 'B': -1}, {'A': 1, 'C': 1}, {'A': -1, 'B': 1, 'C': 1}, {'C': 0, 'B': 2}]
+result = approval.cav(1, approval.compile_cav_ballots(['A', 'B', 'C'], ballots), 0)
+print('CAV tally: ', dict(result['tally']))
+assert dict(result['tally']) == {'A': 1, 'B': 0, 'C': 2}
+assert result['winners'] == ['C'] and result['invalid_ballots'] == 1
@@ -0,0 +1,29 @@
+import ballotgen
+import ballotmatrix
+import tally
+
+candidates = [bytes([i]) * 32 for i in range(1, 6)]
+
+for model, parameter in (('IMPARTIAL_CULTURE', None), ('MALLOWS', 0.5), ('SPATIAL', 2), ('POLYA_URN', 1.0)):
+    # the same seed generates the same ballots
+    generated = ballotgen.generate_ballots(model, candidates, 300, 3, parameter, 0.2, 0.3, 0.1)
+    again = ballotgen.generate_ballots(model, candidates, 300, 3, parameter, 0.2, 0.3, 0.1)
+    assert (generated['matrix'] == again['matrix']).all(), model
+
+    # the generated matrix is what compiling the converted ballots gives
+    ballots = ballotgen.python_ballots(generated)
+    compiled = ballotmatrix.compile_ranked_ballots(candidates, ballots)
+    for k in ('matrix', 'group_ends', 'lengths'):
+        assert (compiled[k] == generated[k]).all(), (model, k)
+    assert ballotgen.WRITE_IN in [c for b in ballots for rank in b for c in (rank if type(rank) is list else [rank])]
+
+    result = ballotmatrix.irv_compiled(generated, 0)
+    expected = tally.irv(candidates, ballots, 0)
+    print(model, 'rounds: ', len(result['tally']))
+    assert result['winner'] == expected['winner'] and result['tally'] == expected['tally'], model
+
+try:
+    ballotgen.generate_ballots('MALLOWS', candidates, 10, 0, 0.0)
+    assert False
+except ValueError:
+    pass
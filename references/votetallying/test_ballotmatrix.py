@@ -0,0 +1,45 @@
+import copy
+import ballotmatrix
+import parallel
+import tally
+
+# Tennessee capital election: 100 voters in 4 cities, each ranking by distance
+cities = ['Memphis', 'Nashville', 'Chattanooga', 'Knoxville']
+tennessee_ballots = [
+    (['Memphis', 'Nashville', 'Chattanooga', 'Knoxville'], 42),
+    (['Nashville', 'Chattanooga', 'Knoxville', 'Memphis'], 26),
+    (['Chattanooga', 'Knoxville', 'Nashville', 'Memphis'], 15),
+    (['Knoxville', 'Chattanooga', 'Nashville', 'Memphis'], 17)
+]
+
+# ballots with ties, truncations and a write-in
+mixed = ['Albert', 'Billy', 'Cindy', 'Dilbert']
+mixed_ballots = [
+    (['Albert', 'Cindy', 'Billy'], 3),
+    (['Billy', ['Albert', 'Dilbert']], 4),
+    ([['Cindy', 'Dilbert'], 'Albert'], 2),
+    (['Dilbert', 'Billy'], 3),
+    (['Cindy'], 2),
+    (['Edmund', 'Cindy'], 1),
+    ([], 1)
+]
+
+def expand (ballots):
+    return [copy.deepcopy(b) for b, count in ballots for i in range(0, count)]
+
+result = ballotmatrix.irv(cities, expand(tennessee_ballots), 0)
+print('IRV winner: ', result['winner'], 'eliminated: ', result['eliminated'])
+assert result['winner'] == 'Knoxville'
+assert result['eliminated'] == [['Chattanooga'], ['Nashville']]
+
+# every IRV engine finds the same rounds
+for candidates, ballots in ((cities, tennessee_ballots), (mixed, mixed_ballots)):
+    expected = tally.irv(candidates, expand(ballots), 0)
+    for engine in (tally.irv_piles, ballotmatrix.irv, parallel.irv):
+        result = engine(candidates, expand(ballots), 0)
+        for k in ('winner', 'eliminated', 'tally', 'denominators', 'invalid_ballots', 'exhausted_ballots'):
+            assert result[k] == expected[k], (engine.__module__ + '.' + engine.__name__, k)
+
+    # and so does the compiled matrix, counted twice
+    compiled = ballotmatrix.compile_ranked_ballots(candidates, ballots, weighted=True)
+    assert ballotmatrix.irv_compiled(compiled, 0)['tally'] == ballotmatrix.irv_compiled(compiled, 0)['tally'] == expected['tally']
@@ -0,0 +1,64 @@
+import copy
+import ballotset
+import positional
+import tally
+
+# Tennessee capital election: 100 voters in 4 cities, each ranking by distance
+cities = ['Memphis', 'Nashville', 'Chattanooga', 'Knoxville']
+ranked_ballots = [
+    (['Memphis', 'Nashville', 'Chattanooga', 'Knoxville'], 42),
+    (['Nashville', 'Chattanooga', 'Knoxville', 'Memphis'], 26),
+    (['Chattanooga', 'Knoxville', 'Nashville', 'Memphis'], 15),
+    (['Knoxville', 'Chattanooga', 'Nashville', 'Memphis'], 17)
+]
+score_ballots = [
+    ({'Memphis': 5, 'Nashville': 2, 'Chattanooga': 1, 'Knoxville': 0}, 42),
+    ({'Memphis': 0, 'Nashville': 5, 'Chattanooga': 4, 'Knoxville': 3}, 26),
+    ({'Memphis': 0, 'Nashville': 3, 'Chattanooga': 5, 'Knoxville': 4}, 15),
+    ({'Memphis': 0, 'Nashville': 2, 'Chattanooga': 4, 'Knoxville': 5}, 17)
+]
+
+# ballots with ties, truncations and a write-in
+mixed = ['Albert', 'Billy', 'Cindy', 'Dilbert']
+mixed_ballots = [
+    (['Albert', 'Cindy', 'Billy'], 3),
+    (['Billy', ['Albert', 'Dilbert']], 4),
+    ([['Cindy', 'Dilbert'], 'Albert'], 2),
+    (['Dilbert', 'Billy'], 3),
+    (['Cindy'], 2),
+    (['Edmund', 'Cindy'], 1),
+    ([], 1)
+]
+ballots = [copy.deepcopy(b) for b, count in mixed_ballots for i in range(0, count)]
+
+# one compiled set re-tallied under every ranked method
+ballot_set = ballotset.compile_ballot_set('RANKED', cities, ranked_ballots, weighted=True)
+winners = {}
+for method in ballotset.BALLOT_METHODS['RANKED']:
+    result = ballotset.tally_ballot_set(method, ballot_set, 1, 0)
+    winners[method] = result['winners'] if 'winners' in result else [result['winner']]
+print('ranked winners: ', winners)
+assert winners.pop('IRV') == winners.pop('STV_DROOP') == winners.pop('STV_HARE') == ['Knoxville']
+assert set(map(tuple, winners.values())) == {('Nashville',)}
+
+# the set counts the ballots the way the engines on the raw ballots do
+ballot_set = ballotset.compile_ballot_set('RANKED', mixed, copy.deepcopy(ballots))
+for method, expected in (
+    ('IRV', tally.irv(mixed, copy.deepcopy(ballots), 0)),
+    ('STV_DROOP', tally.stv_droop(mixed, copy.deepcopy(ballots), 2, 0)),
+    ('BORDA', positional.borda(2, mixed, copy.deepcopy(ballots), 0))
+):
+    result = ballotset.tally_ballot_set(method, ballot_set, 2, 0)
+    for k in ('winner', 'winners', 'tally', 'invalid_ballots', 'valid_ballots', 'exhausted_ballots'):
+        assert result.get(k) == expected.get(k), (method, k)
+
+# and tallying again gives the same result
+assert ballotset.tally_ballot_set('IRV_COOMBS', ballot_set, 1, 0) == ballotset.tally_ballot_set('IRV_COOMBS', ballot_set, 1, 0)
+
+ballot_set = ballotset.compile_ballot_set('SCORE', cities, score_ballots, weighted=True)
+assert ballotset.tally_ballot_set('STAR', ballot_set, 1, 0)['winner'] == 'Nashville'
+try:
+    ballotset.tally_ballot_set('IRV', ballot_set, 1, 0)
+    assert False
+except ValueError:
+    pass
@@ -0,0 +1,23 @@
+import copy
+import ballotmatrix
+import parallel
+import tally
+
+engines = (tally.irv, tally.irv_piles, ballotmatrix.irv, parallel.irv)
+
+# C and D together have fewer votes than B, so all three trailing
+# candidates go at once; E has no votes at all
+candidates = ['A', 'B', 'C', 'D', 'E']
+weighted_ballots = [(['A'], 10), (['B'], 8), (['C', 'B'], 1), (['D', 'A'], 2)]
+ballots = [copy.deepcopy(b) for b, count in weighted_ballots for i in range(0, count)]
+assert tally.irv(candidates, copy.deepcopy(ballots), 0)['eliminated'] == [['E'], ['C'], ['D']]
+assert tally.defeated_candidates({'A': 10, 'B': 8, 'D': 2, 'C': 1, 'E': 0}) == ['E', 'C', 'D']
+for engine in engines:
+    result = engine(candidates, copy.deepcopy(ballots), 0, batch_elimination=True)
+    assert result['eliminated'] == [['E', 'C', 'D']] and result['winner'] == 'A', engine.__module__
+print('batch eliminated: ', result['eliminated'])
+
+# when no ballot counts, every candidate is tied on 0 and eliminated
+for engine in engines:
+    result = engine(['A', 'B'], [['Edmund', 'A'], []], 0)
+    assert result['eliminated'] == [['A', 'B']] and result['winner'] not in ('A', 'B'), engine.__module__
@@ -0,0 +1,16 @@
+import copy
+import benchmark
+
+# a tiny suite, with write-ins, compared with itself and with a run that
+# found another winner
+report = benchmark.run_suite(ballot_counts=(200,), candidate_counts=(3,), repeat=1, memory=False, write_in_rate=0.1)
+print('benchmarked methods: ', [case['method'] for case in report['results']])
+assert [case['method'] for case in report['results']] == list(benchmark.METHODS)
+assert benchmark.compare_reports(report, report)['passed']
+
+changed = copy.deepcopy(report)
+changed['results'][0]['winners'] = ['00']
+del changed['results'][-1]
+comparison = benchmark.compare_reports(report, changed)
+assert not comparison['passed']
+assert sorted(r['metric'] for r in comparison['regressions']) == ['missing', 'winners']
@@ -0,0 +1,77 @@
+from collections import OrderedDict
+from fractions import Fraction
+import copy
+import blockformat
+import candidateregistry
+import tally
+
+a, b, c, d = [bytes([i]) * 32 for i in range(1, 5)]
+collection_ref_hash = b'\x42' * 32
+
+def shares (round_tally, denominator):
+    return {h: Fraction(v, denominator) for h, v in round_tally.items()}
+
+# varints round trip and leave the rest of the body alone
+for n in [0, 1, 127, 128, 300, 2**32, 5354228880, 2**70]:
+    assert blockformat.unpack_varint(blockformat.pack_varint(n) + b'rest') == (n, b'rest')
+assert len(blockformat.pack_varint(127)) == 1 and len(blockformat.pack_varint(128)) == 2
+
+# integer rounds keep the 2-byte layout
+ballots = [[a, b, c]] * 4 + [[b, c, a]] * 3 + [[c, b, a]] * 2
+result = tally.irv([a, b, c], copy.deepcopy(ballots), 0)
+packed = blockformat.pack_irv_tally(collection_ref_hash, result)
+assert packed[:2] == blockformat.const.TALLY_OF_VOTES + blockformat.const.PROPOSAL_IRV
+assert len(packed) == 2 + 32 + 1 + 6 + 32 + 1 + sum(2 + len(r) * 34 for r in result['tally'])
+unpacked = blockformat.unpack_irv_tally(packed[2:])
+print('IRV tally: ', [list(r.values()) for r in unpacked['tally']])
+assert unpacked['tally'] == result['tally'] and unpacked['denominators'] == [1] * len(result['tally'])
+assert unpacked['winner'] == result['winner'] == b
+
+# tied ranks give fractional rounds, which keep their shares
+ballots = [[[a, b, c], d]] * 2 + [[a, [b, c]]] * 3 + [[d, [a, b]]] * 2 + [[c]] * 2
+result = tally.irv([a, b, c, d], copy.deepcopy(ballots), 0)
+assert max(result['denominators']) > 1
+unpacked = blockformat.unpack_irv_tally(blockformat.pack_irv_tally(collection_ref_hash, result)[2:])
+print('fractional IRV denominators: ', result['denominators'], '->', unpacked['denominators'])
+for i in range(0, len(result['tally'])):
+    assert shares(unpacked['tally'][i], unpacked['denominators'][i]) == shares(result['tally'][i], result['denominators'][i])
+assert unpacked['winner'] == result['winner']
+
+# scaled votes and denominators past 4 bytes are reduced and packed in full
+big = {
+    'tally': [
+        OrderedDict([(a, 60000 * 720720), (b, 5000 * 720720 + 360360), (c, 240240)]),
+        OrderedDict([(a, 5354228880 * 3), (b, 5354228880 + 1)]),
+    ],
+    'denominators': [720720, 5354228880],
+    'winner': a,
+    'valid_ballots': 65001,
+    'invalid_ballots': 0,
+    'exhausted_ballots': 0,
+    'meets_quorum': True,
+}
+unpacked = blockformat.unpack_irv_tally(blockformat.pack_irv_tally(collection_ref_hash, big)[2:])
+print('large IRV denominators: ', big['denominators'], '->', unpacked['denominators'])
+assert unpacked['denominators'] == [6, 5354228880]
+assert list(unpacked['tally'][0].values()) == [360000, 30003, 2]
+for i in range(0, len(big['tally'])):
+    assert shares(unpacked['tally'][i], unpacked['denominators'][i]) == shares(big['tally'][i], big['denominators'][i])
+assert unpacked['valid_ballots'] == 65001 and unpacked['meets_quorum']
+
+# Coombs tallies share the layout
+unpacked = blockformat.unpack_irv_coombs_tally(blockformat.pack_irv_coombs_tally(collection_ref_hash, big)[2:])
+assert unpacked['denominators'] == [6, 5354228880]
+
+# ballots decode straight into ids; write-ins never touch the proposal's registry
+registry = candidateregistry.new_registry([a, b, c])
+proposal_ref_hash = b'\x24' * 32
+write_in, other = b'\xff' * 32, b'\xee' * 32
+ranked = [blockformat.pack_ranked_ballot(proposal_ref_hash, h) for h in ([b, write_in, a], [other, c, write_in], [c, a])]
+first = [blockformat.unpack_ranked_ballot(r[1:], registry)['candidate_ids'] for r in ranked]
+last = [blockformat.unpack_ranked_ballot(r[1:], registry)['candidate_ids'] for r in reversed(ranked)]
+print('decoded ballots: ', first)
+assert first == [[1, 3, 0], [3, 2, 4], [2, 0]] and first == last[::-1]
+assert registry['hashes'] == [a, b, c] and registry['proposed'] == 3
+ballot = blockformat.unpack_plurality_ballot(blockformat.pack_plurality_ballot(proposal_ref_hash, [c, a])[1:], registry)
+assert ballot['candidate_ids'] == [2, 0] and ballot['proposal_ref_hash'] == proposal_ref_hash
+assert blockformat.unpack_ranked_ballot(ranked[0][1:])['candidate_hashes'] == [b, write_in, a]
@@ -0,0 +1,23 @@
+import copy
+import bucklin
+
+# Tennessee capital election: 100 voters in 4 cities, each ranking by distance
+cities = ['Memphis', 'Nashville', 'Chattanooga', 'Knoxville']
+ballots = [
+    (['Memphis', 'Nashville', 'Chattanooga', 'Knoxville'], 42),
+    (['Nashville', 'Chattanooga', 'Knoxville', 'Memphis'], 26),
+    (['Chattanooga', 'Knoxville', 'Nashville', 'Memphis'], 15),
+    (['Knoxville', 'Chattanooga', 'Nashville', 'Memphis'], 17)
+]
+
+# nobody has a majority of first choices; Nashville has 68 of the first
+# and second choices
+result = bucklin.bucklin(cities, ballots, 0, weighted=True)
+print('Bucklin rounds: ', [dict(t) for t in result['tally']])
+assert result['winner'] == 'Nashville'
+assert [dict(t) for t in result['tally']] == [
+    {'Memphis': 42, 'Nashville': 26, 'Knoxville': 17, 'Chattanooga': 15},
+    {'Nashville': 68, 'Chattanooga': 58, 'Memphis': 42, 'Knoxville': 32}
+]
+expanded = [copy.deepcopy(b) for b, count in ballots for i in range(0, count)]
+assert bucklin.bucklin(cities, expanded, 0)['tally'] == result['tally']
@@ -0,0 +1,49 @@
+import copy
+import candidateregistry
+import tally
+
+a, b, c, d = [bytes([i]) * 32 for i in range(1, 5)]
+write_in = b'\xff' * 32
+
+registry = candidateregistry.new_registry([a, b, c, d, a])
+ids = candidateregistry.candidate_ids(registry)
+print('candidate ids: ', ids)
+assert ids == [0, 1, 2, 3]
+
+# bare FPTP votes intern to single ids; write-ins get ids past the proposal
+votes = candidateregistry.intern_ballots(registry, [b, b, a, write_in])
+print('FPTP votes: ', votes)
+assert votes == [1, 1, 0, 4]
+result = candidateregistry.resolve_result(registry, tally.plurality(1, ids, votes, 0))
+assert result['winners'] == [b] and result['invalid_ballots'] == 1
+
+# write-in ids are local to each ballot, so decoding leaves the registry alone
+# and gives the same ids whatever order the ballots come in
+other = b'\xee' * 32
+assert candidateregistry.intern_ballot(registry, [other, a, write_in, other]) == [4, 0, 5, 4]
+assert candidateregistry.intern_ballot(registry, [write_in, a]) == [4, 0]
+assert candidateregistry.intern_ballot(registry, [other, a, write_in, other]) == [4, 0, 5, 4]
+assert registry['hashes'] == [a, b, c, d] and len(registry['ids']) == 4
+assert candidateregistry.resolve_candidate(registry, 4) == 4
+
+# tuple MNTV ballots (as in main.py) count the same as hashes and as interned ids
+mntv_ballots = [(a, b), (a, b), (a, c), (b, c), (d, a), (a, write_in), (a, b, c)]
+expected = tally.plurality(2, [a, b, c, d], mntv_ballots, 0)
+print('MNTV on tuples: ', expected['valid_ballots'], 'valid ballots,', expected['valid_votes'], 'valid votes')
+assert (expected['valid_ballots'], expected['valid_votes'], expected['invalid_ballots']) == (5, 11, 2)
+assert expected['winners'] == [a, b]
+result = tally.plurality(2, ids, candidateregistry.intern_ballots(registry, mntv_ballots), 0)
+result = candidateregistry.resolve_result(registry, result)
+for k in ('winners', 'tally', 'valid_ballots', 'valid_votes', 'invalid_ballots', 'invalid_votes'):
+    assert result[k] == expected[k], k
+result = tally.plurality_stream(2, [a, b, c, d], iter(mntv_ballots), 0)
+assert result['winners'] == expected['winners'] and result['valid_votes'] == 11
+
+# tuple and list ranked ballots resolve back to the same result as counting the hashes
+ranked_ballots = [(a, b), [b, [c, d]], (c, a), (d, c), (d,)]
+expected = tally.irv([a, b, c, d], copy.deepcopy(ranked_ballots), 0)
+result = tally.irv(ids, candidateregistry.intern_ballots(registry, ranked_ballots), 0)
+result = candidateregistry.resolve_result(registry, result)
+print('IRV winner: ', tally.tohex(result['winner']))
+for k in ('winner', 'eliminated', 'tally'):
+    assert result[k] == expected[k], k
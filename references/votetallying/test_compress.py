@@ -0,0 +1,42 @@
+import copy
+import tally
+
+candidates = ['Albert', 'Billy', 'Cindy', 'Dilbert']
+weighted_ballots = [
+    (['Albert', 'Cindy', 'Billy'], 3),
+    (['Billy', ['Albert', 'Dilbert']], 4),
+    ([['Cindy', 'Dilbert'], 'Albert'], 2),
+    (['Dilbert', 'Billy'], 3),
+    (['Cindy'], 2),
+    (['Edmund', 'Cindy'], 1),
+    ([], 1)
+]
+ballots = [copy.deepcopy(b) for b, count in weighted_ballots for i in range(0, count)]
+
+compressed = tally.compress_ballots(ballots)
+print('compressed counts: ', [count for b, count in compressed])
+assert [count for b, count in compressed] == [count for b, count in weighted_ballots]
+assert tally.compress_ballots(weighted_ballots + weighted_ballots[:1], weighted=True)[0][1] == 6
+
+# merged ballots count the same as the ballots one by one
+for engine in (tally.irv, tally.irv_coombs):
+    expected = engine(candidates, copy.deepcopy(ballots), 0)
+    original, original_candidates = copy.deepcopy(compressed), candidates[:]
+    for i in range(0, 2):
+        # counting twice gives the same answer: neither the candidates nor the
+        # shared tie lists of the compressed ballots are changed
+        result = engine(candidates, compressed, 0, weighted=True)
+        for k in ('winner', 'eliminated', 'tally', 'valid_ballots', 'invalid_ballots', 'exhausted_ballots'):
+            assert result[k] == expected[k], engine.__name__ + ' ' + k
+    assert compressed == original and candidates == original_candidates
+    assert ballots[3][1] is compressed[1][0][1]
+
+# a candidate repeated in a tie changes the tie size, so those ballots stay apart
+repeated = [['Albert', ['Billy', 'Cindy']], ['Albert', ['Cindy', 'Billy', 'Cindy']], ['Albert', ['Cindy', 'Billy']]] * 2 + [['Billy'], ['Cindy']]
+compressed = tally.compress_ballots(repeated)
+assert [count for b, count in compressed] == [4, 2, 1, 1]
+for engine in (tally.irv, tally.irv_coombs):
+    expected = engine(candidates, copy.deepcopy(repeated), 0)
+    result = engine(candidates, compressed, 0, weighted=True)
+    for k in ('winner', 'eliminated', 'tally', 'denominators'):
+        assert result[k] == expected[k], engine.__name__ + ' ' + k
@@ -0,0 +1,37 @@
+import ballotmatrix
+import condorcet
+
+# the example of the Wikipedia article on the Schulze method
+candidates = ['A', 'B', 'C', 'D', 'E']
+ballots = [
+    (list('ACBED'), 5), (list('ADECB'), 5), (list('BEDAC'), 8), (list('CABED'), 3),
+    (list('CAEBD'), 7), (list('CBADE'), 2), (list('DCEBA'), 7), (list('EBADC'), 8)
+]
+
+pairwise = condorcet.pairwise_matrix(ballotmatrix.compile_ranked_ballots(candidates, ballots, weighted=True))
+assert pairwise['pairwise'].tolist() == [
+    [0, 20, 26, 30, 22],
+    [25, 0, 16, 33, 18],
+    [19, 29, 0, 17, 24],
+    [15, 12, 28, 0, 14],
+    [23, 27, 21, 31, 0]
+]
+assert pairwise['valid_ballots'] == 45
+
+result = condorcet.schulze(pairwise, 0)
+print('Schulze ranking: ', list(result['tally']))
+assert result['winners'] == ['E']
+assert list(result['tally']) == ['E', 'A', 'C', 'B', 'D']
+assert result['strongest_paths'].tolist() == [
+    [0, 28, 28, 30, 24],
+    [25, 0, 28, 33, 24],
+    [25, 29, 0, 29, 24],
+    [25, 28, 28, 0, 24],
+    [25, 28, 28, 31, 0]
+]
+
+# E also wins the most pairwise contests (2 points a win)
+result = condorcet.copeland(pairwise, 0)
+print('Copeland tally: ', dict(result['tally']))
+assert result['winners'] == ['E']
+assert dict(result['tally']) == {'E': 6, 'A': 4, 'B': 4, 'C': 4, 'D': 2}
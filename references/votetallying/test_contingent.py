@@ -0,0 +1,37 @@
+import contingent
+
+# Tennessee capital election: 100 voters in 4 cities, each ranking by distance
+cities = ['Memphis', 'Nashville', 'Chattanooga', 'Knoxville']
+ballots = [
+    (['Memphis', 'Nashville', 'Chattanooga', 'Knoxville'], 42),
+    (['Nashville', 'Chattanooga', 'Knoxville', 'Memphis'], 26),
+    (['Chattanooga', 'Knoxville', 'Nashville', 'Memphis'], 15),
+    (['Knoxville', 'Chattanooga', 'Nashville', 'Memphis'], 17)
+]
+
+# Memphis and Nashville go to the run-off, unlike under IRV where
+# Knoxville wins
+result = contingent.contingent(cities, ballots, 0, weighted=True)
+print('run-off: ', dict(result['tally'][1]))
+assert result['winner'] == 'Nashville'
+assert result['eliminated'] == [['Knoxville', 'Chattanooga']]
+assert dict(result['tally'][1]) == {'Nashville': 58, 'Memphis': 42}
+
+# tied ranks split the first round; ballots ranking neither finalist are
+# exhausted
+mixed = ['Albert', 'Billy', 'Cindy', 'Dilbert']
+mixed_ballots = [
+    (['Albert', 'Cindy', 'Billy'], 3),
+    (['Billy', ['Albert', 'Dilbert']], 4),
+    ([['Cindy', 'Dilbert'], 'Albert'], 2),
+    (['Dilbert', 'Billy'], 3),
+    (['Cindy'], 2),
+    (['Edmund', 'Cindy'], 1),
+    ([], 1)
+]
+result = contingent.contingent(mixed, mixed_ballots, 0, weighted=True)
+assert result['denominators'] == [2, 1]
+assert dict(result['tally'][0]) == {'Billy': 8, 'Dilbert': 8, 'Albert': 6, 'Cindy': 6}
+assert dict(result['tally'][1]) == {'Billy': 7, 'Dilbert': 5}
+assert result['winner'] == 'Billy'
+assert (result['invalid_ballots'], result['exhausted_ballots']) == (2, 2)
@@ -0,0 +1,44 @@
+import copy
+import instrument
+import tally
+
+# Tennessee capital election: 100 voters in 4 cities, each ranking by distance
+cities = ['Memphis', 'Nashville', 'Chattanooga', 'Knoxville']
+rankings = [
+    (['Memphis', 'Nashville', 'Chattanooga', 'Knoxville'], 42),
+    (['Nashville', 'Chattanooga', 'Knoxville', 'Memphis'], 26),
+    (['Chattanooga', 'Knoxville', 'Nashville', 'Memphis'], 15),
+    (['Knoxville', 'Chattanooga', 'Nashville', 'Memphis'], 17)
+]
+ballots = [copy.deepcopy(b) for b, count in rankings for i in range(0, count)]
+
+# the food example of the Wikipedia article on STV, for 3 seats
+food = ['Oranges', 'Pears', 'Chocolate', 'Strawberries', 'Hamburgers']
+food_ballots = [
+    (['Oranges'], 4),
+    (['Pears', 'Oranges'], 2),
+    (['Chocolate', 'Strawberries'], 8),
+    (['Chocolate', 'Hamburgers'], 4),
+    (['Strawberries'], 1),
+    (['Hamburgers'], 1)
+]
+
+aggregator = instrument.new_aggregator()
+observer = instrument.aggregator_observer(aggregator)
+events = []
+both = instrument.fan_out(observer, events.append)
+
+# one event per round; the observer never changes the result
+result = tally.irv(cities, copy.deepcopy(ballots), 0, observer=both)
+assert result == tally.irv(cities, copy.deepcopy(ballots), 0)
+print('IRV rounds observed: ', [e['round'] for e in events])
+assert [e['round'] for e in events] == list(range(0, len(result['tally'])))
+assert events[0]['ballots_touched'] == 100 and events[0]['ballots_transferred'] == 15
+
+# a generator of plurality ballots is counted as it is read
+tally.plurality(1, cities, (b[0] for b in ballots), 0, observer=both)
+assert events[-1]['method'] == 'PLURALITY' and events[-1]['ballots_touched'] == 100
+
+result = tally.stv(food, food_ballots, 3, 0, weighted=True, observer=both)
+assert aggregator['methods']['STV_DROOP']['rounds'] == len(result['tally'])
+assert [aggregator['methods'][m]['tallies'] for m in ('IRV', 'PLURALITY', 'STV_DROOP')] == [1, 1, 1]
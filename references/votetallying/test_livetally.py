@@ -0,0 +1,63 @@
+import copy
+import livetally
+import tally
+
+# ballots with ties, truncations and a write-in
+mixed = ['Albert', 'Billy', 'Cindy', 'Dilbert']
+mixed_ballots = [
+    (['Albert', 'Cindy', 'Billy'], 3),
+    (['Billy', ['Albert', 'Dilbert']], 4),
+    ([['Cindy', 'Dilbert'], 'Albert'], 2),
+    (['Dilbert', 'Billy'], 3),
+    (['Cindy'], 2),
+    (['Edmund', 'Cindy'], 1),
+    ([], 1)
+]
+ballots = [copy.deepcopy(b) for b, count in mixed_ballots for i in range(0, count)]
+
+# Tennessee capital election, as rankings and as STAR scores
+cities = ['Memphis', 'Nashville', 'Chattanooga', 'Knoxville']
+rankings = [
+    (['Memphis', 'Nashville', 'Chattanooga', 'Knoxville'], 42),
+    (['Nashville', 'Chattanooga', 'Knoxville', 'Memphis'], 26),
+    (['Chattanooga', 'Knoxville', 'Nashville', 'Memphis'], 15),
+    (['Knoxville', 'Chattanooga', 'Nashville', 'Memphis'], 17)
+]
+scores = [
+    ({'Memphis': 5, 'Nashville': 2, 'Chattanooga': 1, 'Knoxville': 0}, 42),
+    ({'Memphis': 0, 'Nashville': 5, 'Chattanooga': 4, 'Knoxville': 3}, 26),
+    ({'Memphis': 0, 'Nashville': 3, 'Chattanooga': 5, 'Knoxville': 4}, 15),
+    ({'Memphis': 0, 'Nashville': 2, 'Chattanooga': 4, 'Knoxville': 5}, 17)
+]
+
+# ballots arriving one by one, with one retracted, give the full tally of
+# the ballots that remain
+live = livetally.new_live_tally('IRV', mixed)
+for b in copy.deepcopy(ballots):
+    livetally.add_ballot(live, b)
+    livetally.live_result(live, 0)
+livetally.add_ballot(live, ['Dilbert', 'Albert'])
+livetally.live_result(live, 0)
+livetally.retract_ballot(live, ['Dilbert', 'Albert'])
+result = livetally.live_result(live, 0)
+print('live IRV winner: ', result['winner'])
+expected = tally.irv(mixed, copy.deepcopy(ballots), 0)
+for k in ('winner', 'eliminated', 'tally', 'invalid_ballots', 'valid_ballots', 'exhausted_ballots'):
+    assert result[k] == expected[k], k
+
+live = livetally.new_live_tally('STAR', cities)
+for b, count in scores:
+    livetally.add_ballot(live, b, count)
+assert livetally.live_result(live, 0)['winner'] == 'Nashville'
+
+live = livetally.new_live_tally('PLURALITY', cities)
+for b, count in rankings:
+    livetally.add_ballot(live, b[0], count)
+livetally.retract_ballot(live, 'Memphis', 20)
+assert livetally.live_result(live, 0)['winners'] == ['Nashville']
+
+try:
+    livetally.retract_ballot(live, 'Edmund')
+    assert False
+except ValueError:
+    pass
@@ -0,0 +1,27 @@
+import copy
+import meek
+
+# the food example of the Wikipedia article on STV, for 3 seats
+food = ['Oranges', 'Pears', 'Chocolate', 'Strawberries', 'Hamburgers']
+ballots = [
+    (['Oranges'], 4),
+    (['Pears', 'Oranges'], 2),
+    (['Chocolate', 'Strawberries'], 8),
+    (['Chocolate', 'Hamburgers'], 4),
+    (['Strawberries'], 1),
+    (['Hamburgers'], 1)
+]
+
+# Meek elects the same three as Gregory STV in the food example, though
+# Strawberries reach the shrinking quota before Oranges
+result = meek.meek(food, ballots, 3, 0, weighted=True)
+print('Meek winners: ', result['winners'])
+assert result['winners'] == ['Chocolate', 'Strawberries', 'Oranges']
+assert result['converged'] and result['quota'][0] == 5
+assert abs(sum(result['tally'][-1].values()) + result['excess'] - 20) < 1e-6
+expanded = [copy.deepcopy(b) for b, count in ballots for i in range(0, count)]
+assert meek.meek(food, expanded, 3, 0)['winners'] == result['winners']
+
+# running out of iterations is reported, not passed off as a result
+result = meek.meek(food, ballots, 3, 0, weighted=True, max_iterations=3)
+assert not result['converged']
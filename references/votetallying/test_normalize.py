@@ -0,0 +1,25 @@
+import copy
+import tally
+
+placeholder = b'Unranked/Write-Ins/Other'
+ballots = [
+    ['Billy', placeholder, 'Albert'],
+    ['Cindy', ['Albert', placeholder]],
+    ['Edmund']
+]
+original = copy.deepcopy(ballots)
+
+# write-ins join the candidates; the placeholder stands for every unranked candidate
+normalized, candidates = tally.normalize_ranked_ballots(ballots, ['Albert', 'Billy', 'Cindy'])
+normalized = list(normalized)
+print('candidates: ', candidates)
+print('normalized ballots: ', normalized)
+assert candidates == ['Albert', 'Billy', 'Cindy', 'Edmund']
+assert normalized == [
+    ['Billy', ['Cindy', 'Edmund'], 'Albert'],
+    ['Cindy', ['Albert', 'Billy', 'Edmund']],
+    ['Edmund', ['Albert', 'Billy', 'Cindy']]
+]
+
+# the inputs are left as they were
+assert ballots == original
@@ -0,0 +1,46 @@
+import copy
+import parallel
+import tally
+
+# Tennessee capital election: 100 voters in 4 cities, each ranking by distance
+cities = ['Memphis', 'Nashville', 'Chattanooga', 'Knoxville']
+weighted_ballots = [
+    (['Memphis', 'Nashville', 'Chattanooga', 'Knoxville'], 42),
+    (['Nashville', 'Chattanooga', 'Knoxville', 'Memphis'], 26),
+    (['Chattanooga', 'Knoxville', 'Nashville', 'Memphis'], 15),
+    (['Knoxville', 'Chattanooga', 'Nashville', 'Memphis'], 17)
+]
+ballots = [copy.deepcopy(b) for b, count in weighted_ballots for i in range(0, count)]
+
+# sharded counts add up to the sequential tally
+plurality_ballots = [b[:2] for b in ballots] + [['Edmund']]
+expected = tally.plurality(2, cities, plurality_ballots, 0)
+result = parallel.plurality(2, cities, plurality_ballots, 0, workers=3)
+print('plurality winners: ', result['winners'])
+for k in ('winners', 'tally', 'valid_ballots', 'invalid_ballots', 'valid_votes', 'invalid_votes'):
+    assert result[k] == expected[k], k
+
+# ties, write-ins, exhausted ballots and a repeated candidate, over several rounds
+mixed = ['Albert', 'Billy', 'Cindy', 'Dilbert']
+mixed_ballots = [
+    ['Albert', 'Cindy', 'Billy', 'Dilbert'], ['Billy', ['Albert', 'Dilbert'], 'Cindy'],
+    [['Cindy', 'Dilbert'], 'Albert', 'Billy'], ['Dilbert', 'Billy', 'Billy', 'Albert'],
+    ['Cindy'], ['Edmund', 'Cindy'], [], ['Billy', 'Cindy', 'Albert', 'Dilbert']
+] * 3
+for engine, sharded in ((tally.irv, parallel.irv), (tally.irv_coombs, parallel.irv_coombs)):
+    for b in (ballots, mixed_ballots):
+        candidates = cities if b is ballots else mixed
+        expected = engine(candidates, copy.deepcopy(b), 0)
+        result = sharded(candidates, copy.deepcopy(b), 0, workers=3)
+        for k in ('winner', 'eliminated', 'tally', 'denominators', 'invalid_ballots', 'valid_ballots', 'exhausted_ballots'):
+            assert result[k] == expected[k], engine.__name__ + ' ' + k
+        assert len(result['tally']) > 1
+
+# the sequential tally only counts the rounds after the merged first round
+counted = []
+irv = tally.irv
+tally.irv = lambda candidates, *args, **kwargs: counted.append(list(candidates)) or irv(candidates, *args, **kwargs)
+result = parallel.irv(cities, copy.deepcopy(ballots), 0, workers=1)
+tally.irv = irv
+print('IRV winner: ', result['winner'], 'eliminated: ', result['eliminated'])
+assert counted == [['Memphis', 'Nashville', 'Knoxville']] and result['eliminated'][0] == ['Chattanooga']
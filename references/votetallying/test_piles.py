@@ -0,0 +1,43 @@
+import copy
+import tally
+
+# Tennessee capital election: 100 voters in 4 cities, each ranking by distance
+cities = ['Memphis', 'Nashville', 'Chattanooga', 'Knoxville']
+tennessee_ballots = [
+    (['Memphis', 'Nashville', 'Chattanooga', 'Knoxville'], 42),
+    (['Nashville', 'Chattanooga', 'Knoxville', 'Memphis'], 26),
+    (['Chattanooga', 'Knoxville', 'Nashville', 'Memphis'], 15),
+    (['Knoxville', 'Chattanooga', 'Nashville', 'Memphis'], 17)
+]
+
+# Coombs needs complete ballots; these have ties at either end
+candidates = ['Albert', 'Billy', 'Cindy', 'Dilbert']
+coombs_ballots = [
+    (['Albert', 'Billy', 'Cindy', 'Dilbert'], 3),
+    ([['Billy', 'Cindy'], 'Albert', 'Dilbert'], 4),
+    (['Cindy', 'Dilbert', ['Albert', 'Billy']], 3),
+    (['Dilbert', 'Albert', 'Cindy', 'Billy'], 5),
+    (['Cindy', 'Billy', 'Dilbert', 'Albert'], 4)
+]
+
+def expand (ballots):
+    return [copy.deepcopy(b) for b, count in ballots for i in range(0, count)]
+
+result = tally.irv_coombs_piles(cities, expand(tennessee_ballots), 0)
+print('Coombs winner: ', result['winner'], 'eliminated: ', result['eliminated'])
+assert result['winner'] == 'Nashville' and result['eliminated'] == [['Memphis']]
+assert result['tally'] == tally.irv_coombs(cities, expand(tennessee_ballots), 0)['tally']
+
+expected = tally.irv_coombs(candidates, expand(coombs_ballots), 0)
+assert expected['winner'] == 'Cindy' and expected['eliminated'] == [['Dilbert'], ['Albert']]
+for ballots, weighted in ((expand(coombs_ballots), False), (copy.deepcopy(coombs_ballots), True)):
+    result = tally.irv_coombs_piles(candidates, ballots, 0, weighted=weighted)
+    for k in ('winner', 'eliminated', 'tally', 'denominators', 'invalid_ballots', 'exhausted_ballots'):
+        assert result[k] == expected[k], k
+
+# IRV piles move only the ballots of the eliminated candidates
+expected = tally.irv(cities, expand(tennessee_ballots), 0)
+result = tally.irv_piles(cities, copy.deepcopy(tennessee_ballots), 0, weighted=True)
+print('IRV winner: ', result['winner'])
+for k in ('winner', 'eliminated', 'tally', 'denominators', 'invalid_ballots', 'exhausted_ballots'):
+    assert result[k] == expected[k], k
@@ -0,0 +1,52 @@
+from tally import plurality, plurality_stream
+
+a, b, c = b'a' * 32, b'b' * 32, b'c' * 32
+
+# a tie for the last seat leaves it empty
+result = plurality(1, [a, b, c], [a, a, b, b, c], 0)
+print('tied for 1 seat: ', result['winners'], result['ties'])
+assert result['winners'] == [] and result['ties'] == 1
+
+# a tie between every candidate leaves every seat empty
+result = plurality(2, [a, b, c], [a, b, c], 0)
+print('all tied for 2 seats: ', result['winners'], result['ties'])
+assert result['winners'] == [] and result['ties'] == 2
+
+# as many seats as candidates: everyone wins, whatever their votes
+result = plurality(3, [a, b, c], [[a, b], [a, c], [a]], 0)
+print('3 seats, 3 candidates: ', result['winners'], result['ties'])
+assert result['winners'] == [a, b, c] and result['ties'] == 0
+
+
+# tuple MNTV ballots (as in main.py) are sequences of votes, not single write-ins
+d = b'd' * 32
+mntv_ballots = [(d, a), (d, a), (d, b), (d, b), (d, b), (a, b), (a, b), (a, c), (b, c), (b, a), (b, d), (c, a), (c, d), (c, d)]
+result = plurality(2, [a, b, c, d], mntv_ballots, 10)
+print('tuple ballots: ', result['valid_ballots'], 'valid ballots,', result['valid_votes'], 'valid votes')
+assert (result['valid_ballots'], result['valid_votes'], result['invalid_ballots'], result['invalid_votes']) == (14, 28, 0, 0)
+assert result['winners'] == [b, d] and result['meets_quorum']
+result = plurality_stream(2, [a, b, c, d], iter(mntv_ballots), 10)
+assert (result['valid_ballots'], result['valid_votes'], result['winners']) == (14, 28, [b, d])
+
+# streamed FPTP votes, including a write-in, count like the list of votes
+cities = ['Memphis', 'Nashville', 'Chattanooga', 'Knoxville']
+rankings = [
+    (['Memphis', 'Nashville', 'Chattanooga', 'Knoxville'], 42),
+    (['Nashville', 'Chattanooga', 'Knoxville', 'Memphis'], 26),
+    (['Chattanooga', 'Knoxville', 'Nashville', 'Memphis'], 15),
+    (['Knoxville', 'Chattanooga', 'Nashville', 'Memphis'], 17)
+]
+votes = [b[0] for b, count in rankings for i in range(0, count)] + ['Edmund']
+expected = plurality(1, cities, votes, 0)
+assert expected['winners'] == ['Memphis'] and expected['invalid_ballots'] == 1
+result = plurality_stream(1, cities, (v for v in votes), 0)
+print('streamed FPTP: ', dict(result['tally']))
+assert dict(result['tally']) == dict(expected['tally'])
+for k in ('winners', 'valid_ballots', 'invalid_ballots', 'valid_votes', 'invalid_votes'):
+    assert result[k] == expected[k], k
+
+# the first two preferences as MNTV ballots for two seats
+ballots = [b[:2] for b, count in rankings for i in range(0, count)]
+result = plurality_stream(2, cities, iter(ballots), 0)
+assert result['winners'] == ['Nashville', 'Chattanooga']
+assert result['winners'] == plurality(2, cities, ballots, 0)['winners']
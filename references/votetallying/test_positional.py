@@ -0,0 +1,33 @@
+from fractions import Fraction
+import positional
+
+# Tennessee capital election: 100 voters in 4 cities, each ranking by distance
+cities = ['Memphis', 'Nashville', 'Chattanooga', 'Knoxville']
+ballots = [
+    (['Memphis', 'Nashville', 'Chattanooga', 'Knoxville'], 42),
+    (['Nashville', 'Chattanooga', 'Knoxville', 'Memphis'], 26),
+    (['Chattanooga', 'Knoxville', 'Nashville', 'Memphis'], 15),
+    (['Knoxville', 'Chattanooga', 'Nashville', 'Memphis'], 17)
+]
+
+result = positional.borda(1, cities, ballots, 0, weighted=True)
+print('Borda: ', dict(result['tally']))
+assert dict(result['tally']) == {'Nashville': 194, 'Chattanooga': 173, 'Memphis': 126, 'Knoxville': 107}
+assert result['winners'] == ['Nashville'] and result['denominator'] == 1
+
+# Dowdall: Nashville has 42/2 + 26 + 15/3 + 17/3 points, Memphis 42 + 58/4
+result = positional.dowdall(1, cities, ballots, 0, weighted=True)
+print('Dowdall: ', dict(result['tally']), '/', result['denominator'])
+assert result['winners'] == ['Nashville'] and result['denominator'] == 6
+assert Fraction(result['tally']['Nashville'], result['denominator']) == Fraction(173, 3)
+assert Fraction(result['tally']['Memphis'], result['denominator']) == Fraction(113, 2)
+
+# tied candidates share the average weight of their positions
+result = positional.borda(1, ['A', 'B', 'C'], [[['A', 'B'], 'C'], ['C', ['A', 'B']]], 0)
+assert result['denominator'] == 1 and dict(result['tally']) == {'A': 2, 'B': 2, 'C': 2}
+result = positional.borda(1, ['A', 'B', 'C'], [[['A', 'B'], 'C'], ['C', 'A', 'B']], 0)
+assert result['denominator'] == 2 and dict(result['tally']) == {'A': 5, 'C': 4, 'B': 3}
+
+# scores past int64 are counted exactly
+result = positional.positional(1, ['A', 'B'], [(['A', 'B'], 3), (['B'], 1)], [2**62, 1], 0, weighted=True)
+assert dict(result['tally']) == {'A': 3 * 2**62, 'B': 2**62 + 3}
@@ -0,0 +1,62 @@
+import copy
+import os
+import subprocess
+import sys
+import ballotmatrix
+import tally
+
+# Tennessee capital election: 100 voters in 4 cities, each ranking by distance
+cities = ['Memphis', 'Nashville', 'Chattanooga', 'Knoxville']
+rankings = [
+    (['Memphis', 'Nashville', 'Chattanooga', 'Knoxville'], 42),
+    (['Nashville', 'Chattanooga', 'Knoxville', 'Memphis'], 26),
+    (['Chattanooga', 'Knoxville', 'Nashville', 'Memphis'], 15),
+    (['Knoxville', 'Chattanooga', 'Nashville', 'Memphis'], 17)
+]
+
+# ballots with ties, truncations and a write-in
+mixed = ['Albert', 'Billy', 'Cindy', 'Dilbert']
+mixed_ballots = [
+    (['Albert', 'Cindy', 'Billy'], 3),
+    (['Billy', ['Albert', 'Dilbert']], 4),
+    ([['Cindy', 'Dilbert'], 'Albert'], 2),
+    (['Dilbert', 'Billy'], 3),
+    (['Cindy'], 2),
+    (['Edmund', 'Cindy'], 1),
+    ([], 1)
+]
+
+# counts an IRV tally in a Python that cannot import numpy
+without_numpy = """
+import sys
+
+class NoNumpy:
+    def find_spec (self, name, path=None, target=None):
+        if name.split('.')[0] == 'numpy':
+            raise ImportError(name)
+
+sys.meta_path.insert(0, NoNumpy())
+import candidateregistry
+import tally
+assert tally.irv(['A', 'B'], [['A'], ['A'], ['B']], 0)['winner'] == 'A'
+"""
+
+def expand (ballots):
+    return [copy.deepcopy(b) for b, count in ballots for i in range(0, count)]
+
+# one row of votes per round, -1 once a candidate is out
+result = tally.irv(cities, expand(rankings), 0, compact=True)
+print('compact history: ', result['tally'].votes.tolist())
+assert result['tally'].votes.tolist() == [[42, 26, 15, 17], [42, 26, -1, 32], [42, -1, -1, 58]]
+deltas, denominators = result['tally'].transfer_deltas()
+assert deltas.tolist() == [[0, 0, -15, 15], [0, -26, 0, 26]] and denominators == [1, 1]
+
+# the history reads back as the legacy list of rounds for every engine
+for engine in (tally.irv, tally.irv_piles, ballotmatrix.irv, tally.irv_coombs, tally.irv_coombs_piles):
+    expected = engine(mixed, expand(mixed_ballots), 0)
+    result = engine(mixed, expand(mixed_ballots), 0, compact=True)
+    assert len(result['tally']) == len(expected['tally'])
+    assert result['tally'].to_list() == expected['tally'], engine.__module__ + '.' + engine.__name__
+
+# tally only needs numpy for compact histories
+subprocess.run([sys.executable, '-c', without_numpy], cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
@@ -0,0 +1,31 @@
+import scored
+
+# Tennessee scores from the Wikipedia article on STAR voting
+cities = ['Memphis', 'Nashville', 'Chattanooga', 'Knoxville']
+score_ballots = [
+    ({'Memphis': 5, 'Nashville': 2, 'Chattanooga': 1, 'Knoxville': 0}, 42),
+    ({'Memphis': 0, 'Nashville': 5, 'Chattanooga': 4, 'Knoxville': 3}, 26),
+    ({'Memphis': 0, 'Nashville': 3, 'Chattanooga': 5, 'Knoxville': 4}, 15),
+    ({'Memphis': 0, 'Nashville': 2, 'Chattanooga': 4, 'Knoxville': 5}, 17)
+]
+
+totals = scored.count_scores(scored.compile_score_ballots(cities, score_ballots, weighted=True))
+print('score totals: ', totals['totals'].tolist())
+assert totals['totals'].tolist() == [210, 293, 289, 223]
+
+result = scored.score(1, totals, 0)
+assert result['winners'] == ['Nashville']
+
+# Nashville and Chattanooga go to the runoff, where 68 voters prefer Nashville
+result = scored.star(totals, 0)
+print('STAR runoff: ', dict(result['runoff']))
+assert result['winner'] == 'Nashville'
+assert dict(result['runoff']) == {'Nashville': 68, 'Chattanooga': 32}
+
+# chunked and streamed counts match the count in one go, and invalid
+# ballots are left out
+ballots = [b for b, count in score_ballots for i in range(0, count)] + [{'Memphis': 6}, {}]
+for other in (scored.count_scores(scored.compile_score_ballots(cities, ballots), chunk_size=7), scored.count_score_stream(cities, iter(ballots), chunk_size=7)):
+    assert other['totals'].tolist() == totals['totals'].tolist()
+    assert other['pairwise'].tolist() == totals['pairwise'].tolist()
+    assert other['invalid_ballots'] == 2
@@ -0,0 +1,16 @@
+import hashlib
+import sortition
+
+# every node must draw the same winners from the same block, so the draw
+# itself is pinned
+block_hash = hashlib.sha256(b'block').digest()
+print('drawn indices: ', sortition.draw_indices(block_hash, 10, 4))
+assert sortition.draw_indices(block_hash, 10, 4) == [4, 2, 7, 5]
+assert sortition.draw_indices(block_hash, 10**12, 3) == [724123865904, 268131076193, 315243776931]
+
+eligible = [bytes([i]) * 20 for i in range(0, 10)]
+result = sortition.sortition(block_hash, eligible, 4)
+assert result['winners'] == [eligible[i] for i in (4, 2, 7, 5)]
+assert sortition.verify_sortition(block_hash, eligible, result['winners'])
+assert not sortition.verify_sortition(block_hash, eligible, result['winners'][::-1])
+assert sorted(sortition.draw_indices(block_hash, 10, 10)) == list(range(0, 10))
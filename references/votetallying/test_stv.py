@@ -0,0 +1,55 @@
+import copy
+import random
+import tally
+
+# the food example of the Wikipedia article on STV, for 3 seats
+food = ['Oranges', 'Pears', 'Chocolate', 'Strawberries', 'Hamburgers']
+food_ballots = [
+    (['Oranges'], 4),
+    (['Pears', 'Oranges'], 2),
+    (['Chocolate', 'Strawberries'], 8),
+    (['Chocolate', 'Hamburgers'], 4),
+    (['Strawberries'], 1),
+    (['Hamburgers'], 1)
+]
+
+# ballots with ties, truncations and a write-in
+mixed = ['Albert', 'Billy', 'Cindy', 'Dilbert']
+mixed_ballots = [
+    (['Albert', 'Cindy', 'Billy'], 3),
+    (['Billy', ['Albert', 'Dilbert']], 4),
+    ([['Cindy', 'Dilbert'], 'Albert'], 2),
+    (['Dilbert', 'Billy'], 3),
+    (['Cindy'], 2),
+    (['Edmund', 'Cindy'], 1),
+    ([], 1)
+]
+
+def expand (ballots):
+    return [copy.deepcopy(b) for b, count in ballots for i in range(0, count)]
+
+result = tally.stv_droop(food, expand(food_ballots), 3, 0)
+print('STV winners: ', result['winners'])
+assert result['winners'] == ['Chocolate', 'Oranges', 'Strawberries']
+assert result['quota'] == 6 * tally.STV_WEIGHT_SCALE
+votes = [{c: v // tally.STV_WEIGHT_SCALE for c, v in t.items()} for t in result['tally'][:2]]
+assert votes == [
+    {'Chocolate': 12, 'Oranges': 4, 'Pears': 2, 'Strawberries': 1, 'Hamburgers': 1},
+    {'Chocolate': 6, 'Strawberries': 5, 'Oranges': 4, 'Hamburgers': 3, 'Pears': 2}
+]
+
+# elected candidates keep exactly the quota once their surplus has moved on
+for t in result['tally'][1:]:
+    assert t['Chocolate'] == result['quota']
+
+assert tally.stv_hare(food, expand(food_ballots), 3, 0)['winners'] == ['Chocolate', 'Oranges', 'Strawberries']
+
+# neither merging nor reordering the ballots changes the count, even
+# when surpluses and tied ranks do not divide evenly
+for candidates, ballots, seats in ((food, food_ballots, 3), (mixed, mixed_ballots, 2)):
+    expected = tally.stv_droop(candidates, expand(ballots), seats, 0)
+    shuffled = expand(ballots)
+    random.Random(7).shuffle(shuffled)
+    for b, weighted in ((shuffled, False), (copy.deepcopy(ballots[::-1]), True)):
+        result = tally.stv_droop(candidates, b, seats, 0, weighted=weighted)
+        assert result['winners'] == expected['winners'] and result['tally'] == expected['tally']
@@ -0,0 +1,23 @@
+import copy
+import tally
+
+# votes split between tied candidates are counted exactly, in units of
+# each round's common denominator
+ballots = [['A'], [['A', 'B']], [['A', 'B', 'C']], ['D'], ['D'], ['C']]
+result = tally.irv(['A', 'B', 'C', 'D'], copy.deepcopy(ballots), 0)
+print('denominators: ', result['denominators'])
+assert result['denominators'] == [6, 2, 1]
+assert [dict(t) for t in result['tally']] == [
+    {'D': 12, 'A': 11, 'C': 8, 'B': 5},
+    {'A': 5, 'D': 4, 'C': 3},
+    {'A': 3, 'D': 2}
+]
+assert result['winner'] == 'A'
+
+# the same split, counted as weighted ballots, gives the same rounds
+weighted = tally.irv(['A', 'B', 'C', 'D'], tally.compress_ballots(copy.deepcopy(ballots)), 0, weighted=True)
+assert weighted['tally'] == result['tally'] and weighted['denominators'] == result['denominators']
+
+# a common denominator covers the tie sizes of both tallies of a round
+assert tally.common_denominator({'A': {2: 1}, 'B': {}}, {'A': {3: 2}}) == 6
+assert tally.common_denominator({'A': {}}) == 1